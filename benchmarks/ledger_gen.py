@@ -0,0 +1,124 @@
+"""Seeded generator for synthetic finman ledgers.
+
+Usage:
+    python benchmarks/ledger_gen.py OUTPUT [--size small|medium|large] [--seed N]
+                                           [--budgets N] [--tags N] [--subtags N]
+                                           [--transactions N] [--churn P]
+
+The same seed and sizes always produce the same ledger, so benchmark runs
+on different machines or commits measure identical data.
+"""
+import argparse
+import json
+import random
+
+# Named presets used by the benchmark suite: budgets x tags x subtags x transactions
+SIZES = {
+    "small": {"budgets": 12, "tags": 8, "subtags": 4, "transactions": 2000},
+    "medium": {"budgets": 60, "tags": 12, "subtags": 5, "transactions": 20000},
+    "large": {"budgets": 120, "tags": 15, "subtags": 6, "transactions": 100000},
+}
+
+WORDS = [
+    "grocery", "store", "electric", "bill", "payment", "dinner", "restaurant", "gas",
+    "station", "fill-up", "internet", "netflix", "subscription", "water", "movie",
+    "tickets", "doctor", "checkup", "coffee", "shop", "rent", "parking", "pharmacy",
+    "bakery", "market", "online", "order", "gym", "membership", "insurance",
+]
+
+
+def generate_ledger(seed=0, budgets=12, tags=8, subtags=4, transactions=2000, start_year=2015, churn=0.1):
+    """Build a ledger dict with the same layout as budget_data.json.
+
+    Budgets carry over from month to month, each amount changes with
+    probability churn like a real ledger that is only adjusted occasionally.
+    """
+    rng = random.Random(seed)
+
+    tag_tree = []
+    for t in range(tags):
+        tag_tree.append({
+            "id": f"tag{t:02d}",
+            "name": f"Tag {t:02d}",
+            "subTags": [{"id": f"tag{t:02d}_sub{s}", "name": f"Subtag {t:02d}.{s}"} for s in range(subtags)]
+        })
+
+    amounts = {}
+    ledger_budgets = []
+    periods = []
+    for b in range(budgets):
+        year, month = start_year + b // 12, b % 12 + 1
+        periods.append((year, month))
+        for tag in tag_tree:
+            if tag["id"] not in amounts or rng.random() < churn:
+                amounts[tag["id"]] = float(rng.randrange(100, 2000, 10))
+            for st in tag["subTags"]:
+                if st["id"] not in amounts or rng.random() < churn:
+                    amounts[st["id"]] = float(rng.randrange(50, 1000, 10))
+        ledger_budgets.append({
+            "year": year,
+            "month": month,
+            "tags": [
+                {
+                    "id": tag["id"],
+                    "name": tag["name"],
+                    "maxAmount": amounts[tag["id"]],
+                    "subTags": [
+                        {"id": st["id"], "name": st["name"], "maxAmount": amounts[st["id"]]}
+                        for st in tag["subTags"]
+                    ]
+                }
+                for tag in tag_tree
+            ]
+        })
+
+    ledger_transactions = []
+    for i in range(transactions):
+        year, month = rng.choice(periods)
+        tag = rng.choice(tag_tree)
+        subtag = rng.choice(tag["subTags"]) if tag["subTags"] and rng.random() < 0.8 else None
+        ledger_transactions.append({
+            "id": f"txn_{i + 1:06d}",
+            "year": year,
+            "month": month,
+            "day": rng.randint(1, 28),
+            "amount": round(rng.uniform(1, 500), 2),
+            "description": " ".join(rng.sample(WORDS, rng.randint(2, 4))),
+            "tagId": tag["id"],
+            "subtagId": subtag["id"] if subtag else None
+        })
+
+    return {"budgets": ledger_budgets, "transactions": ledger_transactions}
+
+
+def write_ledger(path, **kwargs):
+    """Generate a ledger and write it to path in the format FinancialData saves."""
+    ledger = generate_ledger(**kwargs)
+    with open(path, "w") as f:
+        json.dump(ledger, f, indent=2)
+    return ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="ledger file to write")
+    parser.add_argument("--size", choices=sorted(SIZES), help="preset sizes, individual options override it")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budgets", type=int)
+    parser.add_argument("--tags", type=int)
+    parser.add_argument("--subtags", type=int)
+    parser.add_argument("--transactions", type=int)
+    parser.add_argument("--churn", type=float, default=0.1,
+                        help="chance that a budget amount changes from one month to the next (default: 0.1)")
+    args = parser.parse_args()
+
+    sizes = dict(SIZES[args.size or "small"])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+
+    write_ledger(args.output, seed=args.seed, churn=args.churn, **sizes)
+
+
+if __name__ == "__main__":
+    main()
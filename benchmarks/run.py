@@ -0,0 +1,222 @@
+"""Benchmark suite: timings and peak memory of the ledger and query code paths.
+
+Usage:
+    python benchmarks/run.py [--size small|medium|large ...] [--repeat N] [--seed N]
+                             [--save baseline.json] [--compare baseline.json]
+                             [--threshold 0.2] [--only NAME ...]
+
+Each size generates a seeded ledger with ledger_gen.py, so two runs with the
+same options always measure the same data. Times are medians over
+``--repeat`` runs, peak memory is measured on a separate run under
+tracemalloc so its overhead does not skew the timings.
+
+``--save`` writes the results as a JSON baseline. ``--compare`` checks the
+current results against a baseline and exits with status 1 when any
+benchmark got slower, or used more memory, by more than ``--threshold``
+(0.2 = 20%).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from ledger_gen import SIZES, write_ledger  # noqa: E402
+from finman.logic.archive import summarize_year  # noqa: E402
+from finman.logic.categorizer import Categorizer  # noqa: E402
+from finman.logic.consolidated import summarize_ledger  # noqa: E402
+from finman.logic.date_index import DateIndex  # noqa: E402
+from finman.logic.duplicates import DuplicateIndex  # noqa: E402
+from finman.logic.financial_data import FinancialData  # noqa: E402
+from finman.logic.integrity import ReferenceIndex  # noqa: E402
+from finman.logic.spend_index import SpendIndex  # noqa: E402
+from finman.logic.transaction_query import (  # noqa: E402
+    WINDOW_MONTHS, filter_transactions, format_transaction, shift_period, sort_transactions
+)
+from finman.logic.usage import get_budget_periods, get_usage_groups  # noqa: E402
+
+
+def open_ledger(path):
+    """Open path as a fresh FinancialData, dropping an instance already loaded from it."""
+    FinancialData.close(path)
+    return FinancialData(path)
+
+
+def measure(fn, setup=None, repeat=5):
+    """Return (median seconds, peak bytes) of fn(state), state = setup() run untimed."""
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        fn(state)
+        times.append(time.perf_counter() - start)
+
+    state = setup() if setup else None
+    tracemalloc.start()
+    try:
+        fn(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def build_benchmarks(path):
+    """Named (fn, setup) pairs over the ledger at path.
+
+    Mutating benchmarks restore a scratch copy of the ledger in setup so every
+    run starts from the same data, the mutation itself includes the save
+    FinancialData does.
+    """
+    scratch = path + ".scratch"
+    findata = open_ledger(path)
+    transactions = findata.get_all_transactions()
+    last_period = get_budget_periods(findata)[-1]
+    sample = transactions[len(transactions) // 2]
+    search = sample["description"].split()[0]
+    tag_search = f"#{sample['tagId']}"
+    sorted_transactions = sort_transactions(transactions, 0)
+    categorizer = Categorizer(transactions)
+
+    def reopen():
+        shutil.copyfile(path, scratch)
+        return open_ledger(scratch)
+
+    def edit(data):
+        data.edit_transaction(sample["id"], amount=sample["amount"] + 1, description="edited")
+
+    return {
+        "ledger.load": (lambda _: open_ledger(path), None),
+        "ledger.save": (lambda data: data._save_data(), reopen),
+        "ledger.add_transaction": (
+            lambda data: data.add_transaction("bench_txn", last_period[0], last_period[1], 1, 12.5,
+                                              "bench transaction", sample["tagId"], sample["subtagId"]),
+            reopen
+        ),
+        "ledger.edit_transaction": (edit, reopen),
+        "ledger.remove_transaction": (lambda data: data.remove_transaction(sample["id"]), reopen),
+        "integrity.build": (lambda _: ReferenceIndex(transactions), None),
+        "integrity.find_orphans": (lambda _: findata.find_orphans(), None),
+        "overview.usage_groups": (lambda _: get_usage_groups(findata, *last_period), None),
+        "overview.all_periods": (
+            lambda _: [get_usage_groups(findata, y, m) for y, m in get_budget_periods(findata)],
+            None
+        ),
+        "archive.summarize_year": (lambda _: summarize_year(transactions), None),
+        "categorizer.build": (lambda _: Categorizer(transactions), None),
+        "categorizer.suggest_all": (
+            lambda _: [categorizer.suggestions(t["description"]) for t in transactions],
+            None
+        ),
+        "consolidated.summarize_ledger": (lambda _: summarize_ledger(path), None),
+        "date_index.build": (lambda _: DateIndex(transactions), None),
+        "date_index.window": (
+            lambda _: findata.get_transactions_between(shift_period(last_period, 1 - WINDOW_MONTHS), last_period),
+            None
+        ),
+        "duplicates.build": (lambda _: DuplicateIndex(transactions), None),
+        "duplicates.groups": (lambda _: findata.get_duplicate_groups(), None),
+        "spend_index.build": (lambda _: SpendIndex(transactions), None),
+        "spend_index.ytd_totals": (
+            lambda _: [findata.get_spend_total((y, 1, 1), (y, m, 31), sample["tagId"], sample["subtagId"])
+                       for y, m in get_budget_periods(findata)],
+            None
+        ),
+        "transactions.sort_date": (lambda _: sort_transactions(transactions, 1), None),
+        "transactions.sort_amount": (lambda _: sort_transactions(transactions, 2), None),
+        "transactions.search_text": (lambda _: filter_transactions(transactions, search), None),
+        "transactions.search_tag": (lambda _: filter_transactions(transactions, tag_search), None),
+        "transactions.format": (lambda _: [format_transaction(t) for t in sorted_transactions], None),
+    }
+
+
+def run_size(size, seed, repeat, only=None):
+    """Run every benchmark on a generated ledger of the given preset size."""
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, "budget_data.json")
+        write_ledger(path, seed=seed, **SIZES[size])
+        results = {}
+        for name, (fn, setup) in build_benchmarks(path).items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            seconds, peak = measure(fn, setup, repeat)
+            results[name] = {"seconds": seconds, "peak_bytes": peak}
+            print(f"  {name:<30} {seconds * 1000:10.3f} ms  {peak / 1024:10.1f} KiB")
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(results, baseline, threshold):
+    """Return a list of regression messages for results against baseline."""
+    regressions = []
+    for size, benchmarks in results.items():
+        for name, current in benchmarks.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            for metric in ("seconds", "peak_bytes"):
+                if previous[metric] <= 0:
+                    continue
+                change = current[metric] / previous[metric] - 1
+                if change > threshold:
+                    regressions.append(f"{size}/{name} {metric}: {previous[metric]:.6g} -> "
+                                       f"{current[metric]:.6g} (+{change * 100:.1f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", nargs="+", choices=list(SIZES), default=["small"],
+                        help="ledger sizes to benchmark (default: small)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated ledgers")
+    parser.add_argument("--only", nargs="+", help="only run benchmarks whose name starts with one of these")
+    parser.add_argument("--save", help="write the results as a JSON baseline to this file")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative slowdown before a benchmark is a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.size:
+        print(f"{size}: " + " x ".join(f"{value} {name}" for name, value in SIZES[size].items()))
+        results[size] = run_size(size, args.seed, args.repeat, args.only)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {
+                    "seed": args.seed,
+                    "repeat": args.repeat,
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                },
+                "results": results
+            }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold * 100:.0f}%:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"\nNo regressions over {args.threshold * 100:.0f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Scene benchmark: update and render cost of scripted sessions on a virtual terminal.
+
+Usage:
+    python benchmarks/scenes.py [--size small|medium|large ...] [--repeat N] [--seed N]
+                                [--rows 40] [--cols 140] [--only NAME ...]
+                                [--frames] [--save scenes.json]
+
+Each session starts on the main menu and feeds the same keys to the scenes
+as a user would, on a VirtualScreen instead of a terminal, so it runs in CI
+and draws the same cells on every run. Times are medians over ``--repeat``
+runs, cells written to windows and cells drawn to the terminal are exact.
+Every run starts with empty scene query caches, so each one is cold; the
+ledger itself is loaded once per size. ``--frames`` prints every frame of
+the last run.
+"""
+import argparse
+import curses
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from ledger_gen import SIZES, write_ledger  # noqa: E402
+from finman.logic.financial_data import FinancialData  # noqa: E402
+from finman.util.lru import CACHES  # noqa: E402
+from finman.util.tasks import TASKS  # noqa: E402
+from finman.util.virtual_screen import SceneDriver, virtual_terminal  # noqa: E402
+
+# Waits for background jobs in a session, like a user watching "Computing…"
+SETTLE = "settle"
+DOWN, UP, RIGHT, LEFT = curses.KEY_DOWN, curses.KEY_UP, curses.KEY_RIGHT, curses.KEY_LEFT
+ENTER, TAB, PAGE_DOWN = 10, 9, curses.KEY_NPAGE
+
+# Keys of each session, starting on the main menu. Searches end with Enter
+# so they do not wait for the typing pause
+SESSIONS = {
+    "main_menu": [DOWN, DOWN, DOWN, UP, UP, UP],
+    "overview": [ENTER, SETTLE] + [DOWN] * 10 + [RIGHT, SETTLE, LEFT, SETTLE, "sub1", ENTER, SETTLE, TAB, SETTLE],
+    "transactions": [DOWN, ENTER, SETTLE] + [DOWN] * 20
+                    + [PAGE_DOWN, "grocery", ENTER, SETTLE, TAB, SETTLE, 23, SETTLE],
+    "budget": [DOWN, DOWN, ENTER, SETTLE] + [DOWN] * 10 + [RIGHT, SETTLE, TAB],
+    "duplicates": [DOWN, DOWN, DOWN, ENTER, SETTLE] + [DOWN] * 10,
+    "help": [UP, ENTER] + [DOWN] * 10 + [PAGE_DOWN, PAGE_DOWN],
+}
+
+
+def run_session(steps, rows, cols):
+    """Frames recorded while feeding steps to a fresh main menu, with cold query caches."""
+    for cache in CACHES:
+        cache.clear()
+    with virtual_terminal(rows, cols) as screen:
+        driver = SceneDriver(screen)
+        try:
+            for step in steps:
+                if step == SETTLE:
+                    driver.settle()
+                else:
+                    driver.press(step)
+            driver.settle()
+        finally:
+            driver.close()
+    return driver.frames
+
+
+def summarize(runs):
+    """Median times over the runs and the cell counts of the last one."""
+    frames = runs[-1]
+    return {
+        "frames": len(frames),
+        "update_seconds": statistics.median(sum(f["update"] for f in run) for run in runs),
+        "render_seconds": statistics.median(sum(f["render"] for f in run) for run in runs),
+        "slowest_frame_seconds": statistics.median(max(f["update"] + f["render"] for f in run) for run in runs),
+        "draw_calls": sum(f["draw_calls"] for f in frames),
+        "cells_written": sum(f["cells_written"] for f in frames),
+        "cells_drawn": sum(f["cells_drawn"] for f in frames),
+        "max_cells_drawn": max(f["cells_drawn"] for f in frames),
+    }
+
+
+def print_frames(frames):
+    for f in frames:
+        key = chr(f["key"]) if 32 < f["key"] < 127 else str(f["key"])
+        print(f"      {key:>5} {f['scene']:<18} update {f['update'] * 1000:8.3f} ms  "
+              f"render {f['render'] * 1000:7.3f} ms  {f['draw_calls']:5} calls  "
+              f"{f['cells_written']:6} written  {f['cells_drawn']:5} drawn")
+
+
+def run_size(size, seed, repeat, rows, cols, only=None, frames=False):
+    """Run every session on a generated ledger of the given preset size."""
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, "budget_data.json")
+        write_ledger(path, seed=seed, **SIZES[size])
+        FinancialData.close(path)
+        FinancialData.default_file_path = path
+        FinancialData.ledger_paths = [path]
+        FinancialData(path)  # Loaded once up front, the sessions measure the scenes
+        results = {}
+        for name, steps in SESSIONS.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            runs = [run_session(steps, rows, cols) for _ in range(repeat)]
+            results[name] = summarize(runs)
+            r = results[name]
+            print(f"  {name:<14} {r['frames']:4} frames  update {r['update_seconds'] * 1000:9.3f} ms  "
+                  f"render {r['render_seconds'] * 1000:8.3f} ms  slowest {r['slowest_frame_seconds'] * 1000:9.3f} ms  "
+                  f"{r['cells_drawn']:7} cells drawn (max {r['max_cells_drawn']}/frame)")
+            if frames:
+                print_frames(runs[-1])
+        return results
+    finally:
+        FinancialData.close(path)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", nargs="+", choices=list(SIZES), default=["small"],
+                        help="ledger sizes to benchmark (default: small)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per session")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated ledgers")
+    parser.add_argument("--rows", type=int, default=40, help="terminal rows (default: 40)")
+    parser.add_argument("--cols", type=int, default=140, help="terminal columns (default: 140)")
+    parser.add_argument("--only", nargs="+", help="only run sessions whose name starts with one of these")
+    parser.add_argument("--frames", action="store_true", help="print every frame of the last run")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    try:
+        for size in args.size:
+            print(f"{size}: " + " x ".join(f"{value} {name}" for name, value in SIZES[size].items()))
+            results[size] = run_size(size, args.seed, args.repeat, args.rows, args.cols, args.only, args.frames)
+    finally:
+        TASKS.shutdown()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {
+                    "seed": args.seed,
+                    "repeat": args.repeat,
+                    "terminal": [args.rows, args.cols],
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                },
+                "results": results
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
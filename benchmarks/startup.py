@@ -0,0 +1,133 @@
+"""Startup benchmark: import time of finman.main and time to the first painted frame.
+
+Usage:
+    python benchmarks/startup.py [--runs N] [--ledger budget_data.json] [--output startup.json]
+
+Import time is read from ``python -X importtime``. Time to first frame
+starts finman in a pseudo terminal and measures how long it takes until the
+main menu title has been written to it. Both are reported as medians over
+``--runs`` fresh interpreters.
+"""
+import argparse
+import json
+import os
+import select
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+FIRST_FRAME_MARKER = b"The Financial Management App"
+
+
+def _env():
+    """Environment that finds finman even when it is not installed."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in [os.path.abspath(SRC_DIR), env.get("PYTHONPATH")] if p)
+    return env
+
+
+def measure_import_time(module="finman.main"):
+    """Return (cumulative microseconds for module, {module: self microseconds})."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=_env(), capture_output=True, text=True, check=True
+    )
+    total = 0
+    self_times = {}
+    for line in result.stderr.splitlines():
+        # Lines look like: "import time:       123 |        456 |   finman.main"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # Header line
+        name = parts[2].strip()
+        self_times[name] = self_us
+        if name == module:
+            total = cumulative_us
+    return total, self_times
+
+
+def measure_first_frame(ledger=None, timeout=10.0):
+    """Seconds from starting finman in a pty until the main menu is painted."""
+    import pty
+
+    workdir = tempfile.mkdtemp()
+    try:
+        if ledger:
+            shutil.copy(ledger, os.path.join(workdir, "budget_data.json"))
+        start = time.perf_counter()
+        pid, fd = pty.fork()
+        if pid == 0:
+            os.chdir(workdir)
+            os.environ.update(_env())
+            os.environ.setdefault("TERM", "xterm")
+            os.execv(sys.executable, [sys.executable, "-m", "finman.main"])
+
+        output = b""
+        elapsed = None
+        while time.perf_counter() - start < timeout:
+            ready, _, _ = select.select([fd], [], [], 0.01)
+            if not ready:
+                continue
+            try:
+                output += os.read(fd, 65536)
+            except OSError:
+                break
+            if FIRST_FRAME_MARKER in output:
+                elapsed = time.perf_counter() - start
+                break
+
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+        os.close(fd)
+        if elapsed is None:
+            raise RuntimeError("finman did not paint its first frame within the timeout")
+        return elapsed
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh interpreters to measure")
+    parser.add_argument("--ledger", help="ledger file to start with, defaults to an empty ledger")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest modules to list")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    import_totals = []
+    first_frames = []
+    self_times = {}
+    for _ in range(args.runs):
+        total, self_times = measure_import_time()
+        import_totals.append(total)
+        first_frames.append(measure_first_frame(args.ledger))
+
+    slowest = sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    results = {
+        "runs": args.runs,
+        "import_finman_main_us": statistics.median(import_totals),
+        "first_frame_ms": round(statistics.median(first_frames) * 1000, 2),
+        "slowest_imports_us": dict(slowest),
+    }
+
+    print(f"import finman.main: {results['import_finman_main_us'] / 1000:.2f} ms (median of {args.runs})")
+    print(f"time to first frame: {results['first_frame_ms']:.2f} ms (median of {args.runs})")
+    print("slowest imports (self time):")
+    for name, us in slowest:
+        print(f"  {us / 1000:8.2f} ms  {name}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
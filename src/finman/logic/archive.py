@@ -0,0 +1,64 @@
+import importlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Compression of archive files: file suffix and module, imported when a file is opened
+ARCHIVE_FORMATS = {
+    "gzip": (".json.gz", "gzip"),
+    "lzma": (".json.xz", "lzma"),
+}
+
+
+def archive_file_name(ledger_path: str, year: int, fmt: str) -> str:
+    """Name of a year's archive, next to the ledger: budget_data.json -> budget_data.2015.json.gz."""
+    stem = os.path.splitext(os.path.basename(ledger_path))[0]
+    return f"{stem}.{year}{ARCHIVE_FORMATS[fmt][0]}"
+
+
+def summarize_year(transactions: Iterable[Dict]) -> List[List]:
+    """Spending of archived transactions as [month, day, tag id, subtag id, amount] rows.
+
+    One row per day and (tag, subtag), which is all the Overview, the
+    reports and range totals need to know about a closed year.
+    """
+    totals: Dict[Tuple[int, int, str, Optional[str]], float] = {}
+    for transaction in transactions:
+        key = (transaction["month"], transaction["day"], transaction["tagId"], transaction.get("subtagId") or None)
+        totals[key] = totals.get(key, 0.0) + transaction["amount"]
+    rows = sorted(totals.items(), key=lambda item: (item[0][0], item[0][1], item[0][2], item[0][3] or ""))
+    return [[month, day, tag_id, subtag_id, amount] for (month, day, tag_id, subtag_id), amount in rows]
+
+
+def is_daily_summary(archive: Dict) -> bool:
+    """False for archives written before summaries were kept per day, their rows have no day."""
+    return all(len(row) == 5 for row in archive["totals"])
+
+
+def summary_entries(archive: Dict) -> List[Dict]:
+    """Summary rows of an archive entry as transactions on their day.
+
+    The spend index counts them like any other transaction, so range totals
+    over an archived year stay exact down to the day.
+    """
+    return [
+        {"year": archive["year"], "month": month, "day": day, "amount": amount,
+         "tagId": tag_id, "subtagId": subtag_id}
+        for month, day, tag_id, subtag_id, amount in archive["totals"]
+    ]
+
+
+def write_archive(path: str, fmt: str, transactions: List[Dict]) -> None:
+    """Write transactions to a compressed archive file, replacing it only once complete."""
+    opener = importlib.import_module(ARCHIVE_FORMATS[fmt][1]).open
+    partial = path + ".tmp"
+    with opener(partial, "wt", encoding="utf-8") as f:
+        json.dump(transactions, f)
+    os.replace(partial, path)
+
+
+def read_archive(path: str, fmt: str) -> List[Dict]:
+    """Transactions of a compressed archive file."""
+    opener = importlib.import_module(ARCHIVE_FORMATS[fmt][1]).open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,89 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from finman.logic.duplicates import normalize_description
+from finman.logic.financial_data import ChangeEvent, ChangeKind
+
+# (tag id, subtag id) a transaction is booked under
+Category = Tuple[str, Optional[str]]
+
+
+class Categorizer:
+    """Suggests a tag and subtag for a description from how earlier ones were tagged.
+
+    Counts how often each description word, and each whole description, was
+    booked under each category. A suggestion only looks at the words of the
+    description it is asked about, each with a count per category, so its
+    cost does not grow with the ledger. Suggestions are memoized until the
+    counts change, which makes tagging an import with repeating descriptions
+    mostly lookups.
+    """
+
+    def __init__(self, transactions: Iterable[Dict] = ()):
+        self.words: Dict[str, Counter] = {}
+        self.descriptions: Dict[str, Counter] = {}
+        self._memo: Dict[str, Optional[Category]] = {}
+        for transaction in transactions:
+            self.add(transaction)
+
+    @staticmethod
+    def _category(transaction: Dict) -> Category:
+        return (transaction["tagId"], transaction.get("subtagId") or None)
+
+    def _count(self, transaction: Dict, delta: int) -> None:
+        category = self._category(transaction)
+        description = normalize_description(transaction["description"])
+        for table, keys in ((self.descriptions, [description]), (self.words, set(description.split()))):
+            for key in keys:
+                counts = table.setdefault(key, Counter())
+                counts[category] += delta
+                if counts[category] <= 0:
+                    del counts[category]
+                    if not counts:
+                        del table[key]
+        self._memo.clear()
+
+    def add(self, transaction: Dict) -> None:
+        self._count(transaction, 1)
+
+    def remove(self, transaction: Dict) -> None:
+        self._count(transaction, -1)
+
+    def apply(self, event: ChangeEvent) -> None:
+        """Update the counts for a FinancialData change."""
+        if event.kind == ChangeKind.TRANSACTION_ADDED:
+            self.add(event.item)
+        elif event.kind == ChangeKind.TRANSACTION_REMOVED:
+            self.remove(event.item)
+        elif event.kind == ChangeKind.TRANSACTION_EDITED:
+            self.remove(event.previous)
+            self.add(event.item)
+
+    def suggestions(self, description: str) -> List[Category]:
+        """Categories for a description, most likely first.
+
+        A description booked before suggests what it was booked under most.
+        Otherwise every word votes with the share of its bookings under each
+        category, so words seen everywhere count for little.
+        """
+        normalized = normalize_description(description)
+        exact = self.descriptions.get(normalized)
+        if exact:
+            return [category for category, _ in exact.most_common()]
+
+        scores = Counter()
+        for word in set(normalized.split()):
+            counts = self.words.get(word)
+            if counts:
+                total = sum(counts.values())
+                for category, count in counts.items():
+                    scores[category] += count / total
+        return [category for category, _ in scores.most_common()]
+
+    def suggest(self, description: str) -> Optional[Category]:
+        """The most likely category for a description, None if none of its words were seen."""
+        normalized = normalize_description(description)
+        if normalized not in self._memo:
+            suggestions = self.suggestions(normalized)
+            self._memo[normalized] = suggestions[0] if suggestions else None
+        return self._memo[normalized]
@@ -0,0 +1,94 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+from finman.logic.financial_data import FinancialData
+from finman.logic.usage import get_budget_periods
+
+# (st_mtime_ns, st_size) of a ledger file, None if it does not exist
+Stamp = Optional[Tuple[int, int]]
+
+
+def ledger_stamp(path: str) -> Stamp:
+    """Cheap fingerprint of a ledger file, every save changes it."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def summarize_ledger(path: str) -> Dict[Tuple[int, int], Dict[str, float]]:
+    """Budget, spending and year-to-date spending of every budget period in a ledger.
+
+    Runs in a worker process. Workers are reused between jobs, so the ledger
+    is read again on every call instead of from a shared instance a previous
+    job left behind. The budget of a period is the sum of its tags' limits,
+    which include their subtags, the spending covers every transaction in
+    the period.
+    """
+    findata = FinancialData.load(path)
+    summary = {}
+    for year, month in get_budget_periods(findata):
+        budget = findata.get_budget(year, month)
+        summary[(year, month)] = {
+            "budget": sum(tag["maxAmount"] for tag in budget["tags"]),
+            "spent": findata.get_spend_total((year, month, 1), (year, month, 31)),
+            "ytd": findata.get_spend_total((year, 1, 1), (year, month, 31)),
+        }
+    return summary
+
+
+class SummaryCache:
+    """Ledger summaries keyed by path, valid while the file's stamp is unchanged.
+
+    Only ledgers that were saved since their summary was taken need to be
+    summarized again, the others are reused as they are.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[Stamp, Dict]] = {}
+
+    def stale(self, paths: List[str]) -> List[Tuple[str, Stamp]]:
+        """(path, current stamp) of every ledger without an up to date summary."""
+        stale = []
+        for path in paths:
+            stamp = ledger_stamp(path)
+            entry = self.entries.get(path)
+            if entry is None or entry[0] != stamp:
+                stale.append((path, stamp))
+        return stale
+
+    def store(self, path: str, stamp: Stamp, summary: Dict) -> None:
+        """Keep a summary, stamp must be taken before summarizing so a save meanwhile makes it stale."""
+        self.entries[path] = (stamp, summary)
+
+    def get(self, path: str) -> Optional[Dict]:
+        entry = self.entries.get(path)
+        return entry[1] if entry else None
+
+
+def consolidate(summaries: Dict[str, Dict], year: int, month: int) -> List[Dict]:
+    """One row per ledger for a period followed by a "Total" row.
+
+    Ledgers without a budget for the period show zeros, so the total is
+    always the sum of the rows above it.
+    """
+    rows = []
+    for path, summary in summaries.items():
+        period = summary.get((year, month), {"budget": 0.0, "spent": 0.0, "ytd": 0.0})
+        rows.append({"name": path, **period})
+
+    total = {key: sum(row[key] for row in rows) for key in ("budget", "spent", "ytd")}
+    rows.append({"name": "Total", **total})
+    for row in rows:
+        row["percentage"] = (row["spent"] / row["budget"] * 100) if row["budget"] > 0 else 0
+    return rows
+
+
+def consolidated_periods(summaries: Dict[str, Dict]) -> List[Tuple[int, int]]:
+    """Every period budgeted in any of the ledgers, sorted by date."""
+    return sorted({period for summary in summaries.values() for period in summary})
+
+
+# Shared by every Consolidated scene, so reopening it only summarizes changed ledgers
+SUMMARY_CACHE = SummaryCache()
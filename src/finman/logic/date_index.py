@@ -0,0 +1,66 @@
+import bisect
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from finman.logic.financial_data import ChangeEvent, ChangeKind
+from finman.logic.spend_index import day_ordinal
+
+
+class DateIndex:
+    """Transactions sorted by date, so a range of days is read with two binary searches.
+
+    Keys are (day ordinal, id) pairs kept in a list next to the
+    transactions, in the same order. Adding or removing one transaction
+    shifts the lists once instead of sorting the ledger again.
+    """
+
+    def __init__(self, transactions: Iterable[Dict] = ()):
+        pairs = sorted(((self._key(t), t) for t in transactions), key=lambda pair: pair[0])
+        self.keys: List[Tuple[int, str]] = [key for key, _ in pairs]
+        self.transactions: List[Dict] = [transaction for _, transaction in pairs]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @staticmethod
+    def _key(transaction: Dict) -> Tuple[int, str]:
+        return day_ordinal(transaction["year"], transaction["month"], transaction["day"]), transaction["id"]
+
+    def add(self, transaction: Dict) -> None:
+        key = self._key(transaction)
+        position = bisect.bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self.transactions.insert(position, transaction)
+
+    def remove(self, transaction: Dict) -> None:
+        key = self._key(transaction)
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+            del self.transactions[position]
+
+    def apply(self, event: ChangeEvent) -> None:
+        """Update the index for a FinancialData change."""
+        if event.kind == ChangeKind.TRANSACTION_ADDED:
+            self.add(event.item)
+        elif event.kind == ChangeKind.TRANSACTION_REMOVED:
+            self.remove(event.item)
+        elif event.kind == ChangeKind.TRANSACTION_EDITED:
+            self.remove(event.previous)
+            self.add(event.item)
+
+    def between(self, start: Tuple[int, int, int], end: Tuple[int, int, int]) -> List[Dict]:
+        """Transactions from start to end (year, month, day), both inclusive, oldest first."""
+        first = bisect.bisect_left(self.keys, (day_ordinal(*start),))
+        last = bisect.bisect_left(self.keys, (day_ordinal(*end) + 1,))
+        return self.transactions[first:last]
+
+    def span(self) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """(year, month) of the oldest and the newest transaction, None when empty."""
+        if not self.keys:
+            return None
+        return _period(self.keys[0][0]), _period(self.keys[-1][0])
+
+
+def _period(ordinal: int) -> Tuple[int, int]:
+    """(year, month) of a day ordinal, see day_ordinal."""
+    return ordinal // 372, ordinal % 372 // 31 + 1
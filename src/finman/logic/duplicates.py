@@ -0,0 +1,70 @@
+import re
+from typing import Dict, Iterable, List, Tuple
+
+from finman.logic.financial_data import ChangeEvent, ChangeKind
+
+# (year, month, day, amount in cents, normalized description)
+Fingerprint = Tuple[int, int, int, int, str]
+
+_NOT_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_description(description: str) -> str:
+    """Lowercase words of a description, so "Coffee  Shop!" and "coffee shop" compare equal."""
+    return " ".join(_NOT_WORD.split(description.lower())).strip()
+
+
+def fingerprint(year: int, month: int, day: int, amount: float, description: str) -> Fingerprint:
+    return (year, month, day, round(amount * 100), normalize_description(description))
+
+
+def transaction_fingerprint(transaction: Dict) -> Fingerprint:
+    return fingerprint(transaction["year"], transaction["month"], transaction["day"],
+                       transaction["amount"], transaction["description"])
+
+
+class DuplicateIndex:
+    """Transaction ids by fingerprint, so spotting a duplicate is a dict lookup.
+
+    Transactions on the same day with the same amount and description are
+    likely the same purchase entered twice or imported from overlapping
+    statements. Recurring occurrences are indexed too, so a bill entered by
+    hand is caught next to the rule that already books it.
+    """
+
+    def __init__(self, transactions: Iterable[Dict] = ()):
+        self.ids: Dict[Fingerprint, List[str]] = {}
+        for transaction in transactions:
+            self.add(transaction)
+
+    def add(self, transaction: Dict) -> None:
+        self.ids.setdefault(transaction_fingerprint(transaction), []).append(transaction["id"])
+
+    def remove(self, transaction: Dict) -> None:
+        key = transaction_fingerprint(transaction)
+        ids = self.ids.get(key)
+        if ids and transaction["id"] in ids:
+            ids.remove(transaction["id"])
+            if not ids:
+                del self.ids[key]
+
+    def apply(self, event: ChangeEvent) -> None:
+        """Update the index for a FinancialData change."""
+        if event.kind == ChangeKind.TRANSACTION_ADDED:
+            self.add(event.item)
+        elif event.kind == ChangeKind.TRANSACTION_REMOVED:
+            self.remove(event.item)
+        elif event.kind == ChangeKind.TRANSACTION_EDITED:
+            self.remove(event.previous)
+            self.add(event.item)
+
+    def matches(self, key: Fingerprint) -> List[str]:
+        """Ids of the transactions with a fingerprint."""
+        return list(self.ids.get(key, ()))
+
+    def groups(self) -> List[List[str]]:
+        """Ids of every set of suspected duplicates, ordered by date."""
+        return [ids for key, ids in sorted(self.ids.items()) if len(ids) > 1]
+
+    def __len__(self) -> int:
+        return len(self.ids)
@@ -1,55 +1,340 @@
+import calendar
+import functools
 import json
 import os
-from typing import Optional, Dict, List, Any
+import threading
+import time
+import weakref
+from datetime import date
+from enum import Enum
+from typing import Optional, Dict, Iterable, List, Any, Callable, Set, Tuple, TYPE_CHECKING
+
+from finman.logic.history import Delta, History
+from finman.logic.recurring import SCHEDULES, expand_rule, parse_date, split_occurrence_id
+from finman.util.lru import cache_stats
+from finman.util.profiler import PROFILER
+
+if TYPE_CHECKING:
+    from finman.logic.categorizer import Categorizer
+    from finman.logic.date_index import DateIndex
+    from finman.logic.duplicates import DuplicateIndex
+    from finman.logic.integrity import ReferenceIndex
+    from finman.logic.spend_index import SpendIndex
+
+
+def _locked(method: Callable) -> Callable:
+    """Run a FinancialData mutator while holding the ledger lock.
+
+    Background tasks read the ledger under the same lock, so they never see
+    a change half applied or cache state that a mutation just invalidated.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with FinancialData._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ChangeKind(Enum):
+    TRANSACTION_ADDED = 1
+    TRANSACTION_EDITED = 2
+    TRANSACTION_REMOVED = 3
+    BUDGET_ADDED = 4
+    BUDGET_EDITED = 5
+    BUDGET_REMOVED = 6
+    TAG_ADDED = 7
+    TAG_EDITED = 8
+    TAG_REMOVED = 9
+    RULE_ADDED = 10
+    RULE_EDITED = 11
+    RULE_REMOVED = 12
+    YEAR_ARCHIVED = 13
+    YEAR_RESTORED = 14
+
+
+class ChangeEvent:
+    """Describes a single mutation of FinancialData, passed to subscribers."""
+
+    def __init__(self, kind: ChangeKind, generation: int, period: Tuple[int, int],
+                 item: Optional[Dict] = None, previous: Optional[Dict] = None,
+                 tag_id: Optional[str] = None, subtag_id: Optional[str] = None):
+        self.kind = kind
+        self.generation = generation
+        self.period = period  # (year, month) the change applies to
+        self.item = item  # The added/edited/removed transaction, budget, tag or subtag
+        self.previous = previous  # Copy of an edited transaction before the edit
+        self.tag_id = tag_id
+        self.subtag_id = subtag_id
+
+    def affected_periods(self) -> Set[Tuple[int, int]]:
+        """Periods whose data changed, an edit may move a transaction between periods."""
+        if self.is_archive_change():
+            return {(self.period[0], month) for month in range(1, 13)}
+        periods = {self.period}
+        if self.previous is not None and "year" in self.previous:
+            periods.add((self.previous["year"], self.previous["month"]))
+        return periods
+
+    def is_transaction_change(self) -> bool:
+        return self.kind in (ChangeKind.TRANSACTION_ADDED, ChangeKind.TRANSACTION_EDITED,
+                             ChangeKind.TRANSACTION_REMOVED)
+
+    def is_rule_change(self) -> bool:
+        """A recurring rule changed, which can affect transactions in any period."""
+        return self.kind in (ChangeKind.RULE_ADDED, ChangeKind.RULE_EDITED, ChangeKind.RULE_REMOVED)
+
+    def is_archive_change(self) -> bool:
+        """A year's transactions moved between the ledger and its archive, period is (year, 1)."""
+        return self.kind in (ChangeKind.YEAR_ARCHIVED, ChangeKind.YEAR_RESTORED)
 
 
 class FinancialData:
-    """Singleton class for managing budget and transaction data from JSON file."""
+    """Budget and transaction data of a JSON ledger file, one shared instance per file."""
 
-    _instance: Optional['FinancialData'] = None
-    _initialized: bool = False
+    # Loaded ledgers by absolute path, FinancialData(path) returns the same instance
+    _instances: Dict[str, 'FinancialData'] = {}
+    # Ledger opened when no file path is given, set from the command line
+    default_file_path: str = "budget_data.json"
+    # Every ledger given on the command line, the default ledger first
+    ledger_paths: List[str] = []
+    # Held while the ledger loads, so FinancialData() waits for a preload() in
+    # progress, and by every mutation and background task reading the ledger
+    _lock = threading.RLock()
+    # Indexes derived from the transactions, each built on first use and
+    # updated by every change event. Reset when a change affects any number
+    # of recurring occurrences
+    _DERIVED_INDEXES = ("_spend_index", "_duplicate_index", "_categorizer", "_reference_index", "_date_index")
 
-    def __new__(cls, file_path: str = "budget_data.json"):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    def __new__(cls, file_path: Optional[str] = None):
+        key = os.path.abspath(file_path or cls.default_file_path)
+        with cls._lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = cls._instances[key] = super().__new__(cls)
+                instance._initialized = False
+        return instance
 
-    def __init__(self, file_path: str = "budget_data.json"):
-        if not FinancialData._initialized:
-            self.file_path = file_path
-            self.data = self._load_data()
-            FinancialData._initialized = True
+    def __init__(self, file_path: Optional[str] = None):
+        with FinancialData._lock:
+            if not self._initialized:
+                self.file_path = file_path or FinancialData.default_file_path
+                self.stats = {
+                    "load_seconds": 0.0,
+                    "save_count": 0,
+                    "save_seconds_total": 0.0,
+                    "save_seconds_last": 0.0,
+                    "save_seconds_max": 0.0,
+                    "bytes_written_total": 0,
+                    "bytes_written_last": 0,
+                }
+                start = time.perf_counter()
+                self.data = self._load_data()
+                self.data.setdefault("recurring", [])
+                self.data.setdefault("archives", [])  # Summaries of archived years, see archive_year
+                self._expanded = None  # (generation, end date, transactions), see _live_transactions
+                self._with_archives = None  # The same with archived transactions, see get_all_transactions
+                self._archive_cache = {}  # Transactions of archived years by year, once decompressed
+                self._budget_cache = None  # Resolved budgets by period, see _resolved_budgets
+                self._compact_budgets()
+                self._tag_catalog = {}  # Tags and subtags of all periods, see get_tag_catalog
+                for budget in self._resolved_budgets().values():
+                    self._update_tag_catalog((budget["year"], budget["month"]), budget["tags"])
+                self.stats["load_seconds"] = time.perf_counter() - start
+                # Bumped on every mutation so callers can tell if their view is stale
+                self.generation = 0
+                self._subscribers = []
+                self._spend_index = None  # Built on first use by get_spend_index
+                self._duplicate_index = None  # Built on first use by get_duplicate_index
+                self._categorizer = None  # Built on first use by get_categorizer
+                self._reference_index = None  # Built on first use by get_reference_index
+                self._date_index = None  # Built on first use by get_date_index
+                self.history = History()
+                self._deltas: List[Delta] = []  # Recorded by the mutation in progress, see _record
+                self._replaying = False  # Set while undo/redo restores entities
+                self._replayed: List[ChangeEvent] = []  # Events of the entities restored so far
+                self._initialized = True
+
+    @classmethod
+    def close(cls, file_path: Optional[str] = None) -> None:
+        """Forget a ledger's instance, the next FinancialData(file_path) loads it from disk again."""
+        with cls._lock:
+            cls._instances.pop(os.path.abspath(file_path or cls.default_file_path), None)
+
+    @classmethod
+    def load(cls, file_path: str) -> 'FinancialData':
+        """A private instance read from file_path now, FinancialData(file_path) does not return it."""
+        instance = super().__new__(cls)
+        instance._initialized = False
+        instance.__init__(file_path)
+        return instance
+
+    @classmethod
+    def preload(cls, file_path: Optional[str] = None) -> threading.Thread:
+        """Load the ledger on a background thread.
+
+        Constructing FinancialData while the load is running blocks until it
+        has finished, so callers never see a partially loaded ledger.
+        """
+        thread = threading.Thread(target=cls, args=(file_path,), daemon=True)
+        thread.start()
+        return thread
 
     def _load_data(self) -> Dict:
         """Load JSON data from file."""
         if os.path.exists(self.file_path):
             with open(self.file_path, 'r') as f:
                 return json.load(f)
-        return {"budgets": [], "transactions": []}
+        return {"budgets": [], "transactions": [], "recurring": []}
 
     def _save_data(self) -> None:
         """Save current data to JSON file."""
-        with open(self.file_path, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        start = time.perf_counter()
+        with PROFILER.phase("save"):
+            with open(self.file_path, 'w') as f:
+                json.dump(self.data, f, indent=2)
+                bytes_written = f.tell()
+        elapsed = time.perf_counter() - start
+
+        self.stats["save_count"] += 1
+        self.stats["save_seconds_total"] += elapsed
+        self.stats["save_seconds_last"] = elapsed
+        self.stats["save_seconds_max"] = max(self.stats["save_seconds_max"], elapsed)
+        self.stats["bytes_written_total"] += bytes_written
+        self.stats["bytes_written_last"] = bytes_written
+        if PROFILER.enabled:
+            PROFILER.record_save(bytes_written)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Storage metrics: load and save timings, bytes written, file and index sizes."""
+        try:
+            file_size = os.path.getsize(self.file_path)
+        except OSError:
+            file_size = 0
+        stats = dict(self.stats)
+        stats["generation"] = self.generation
+        stats["file_size"] = file_size
+        stats["index_sizes"] = self._index_sizes()
+        return stats
+
+    def _index_sizes(self) -> Dict[str, int]:
+        """Number of entries in each collection lookups scan."""
+        sizes = {
+            "budgets": len(self.data["budgets"]),
+            "transactions": len(self.data["transactions"]),
+            "recurring": len(self.data["recurring"]),
+            "tag_catalog": len(self._tag_catalog),
+            "archived_years": len(self.data["archives"]),
+        }
+        if self._spend_index is not None:
+            sizes["spend_index_nodes"] = self._spend_index.node_count()
+        if self._duplicate_index is not None:
+            sizes["duplicate_fingerprints"] = len(self._duplicate_index)
+        if self._categorizer is not None:
+            sizes["categorizer_words"] = len(self._categorizer.words)
+        if self._reference_index is not None:
+            sizes["reference_periods"] = len(self._reference_index.counts)
+        if self._date_index is not None:
+            sizes["date_index"] = len(self._date_index)
+        return sizes
+
+    def write_metrics(self, path: str) -> None:
+        """Append the current stats as one timestamped JSON line to path."""
+        record = {"timestamp": time.time(), "file_path": self.file_path}
+        record.update(self.get_stats())
+        # Scene query caches are shared by the whole process, not per ledger
+        record["query_caches"] = cache_stats()
+        with open(path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+
+    @classmethod
+    def export_metrics(cls, path: str, interval: float = 60.0) -> threading.Event:
+        """Append stats to a JSONL file every interval seconds on a background thread.
+
+        Returns an event that stops the export when set.
+        """
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                cls().write_metrics(path)  # Waits for a preload in progress
+
+        threading.Thread(target=run, daemon=True).start()
+        return stop
 
+    def subscribe(self, callback: Callable[[ChangeEvent], None]) -> None:
+        """Call callback with a ChangeEvent after every mutation.
+
+        Bound methods are held weakly so a subscribed scene can still be
+        garbage collected once it is no longer shown.
+        """
+        if hasattr(callback, "__self__"):
+            self._subscribers.append(weakref.WeakMethod(callback))
+        else:
+            self._subscribers.append(lambda: callback)
+
+    def unsubscribe(self, callback: Callable[[ChangeEvent], None]) -> None:
+        """Stop calling a callback registered with subscribe."""
+        self._subscribers = [ref for ref in self._subscribers if ref() not in (None, callback)]
+
+    def _commit(self, kind: ChangeKind, period: Tuple[int, int], item: Optional[Dict] = None,
+                previous: Optional[Dict] = None, tag_id: Optional[str] = None,
+                subtag_id: Optional[str] = None) -> None:
+        """Persist a mutation, bump the generation and notify subscribers."""
+        event = ChangeEvent(kind, 0, period, item, previous, tag_id, subtag_id)
+        if self._replaying:
+            # Committed together once every entity of the change is restored
+            self._replayed.append(event)
+        else:
+            self._commit_events([event])
+
+    def _commit_events(self, events: List[ChangeEvent]) -> None:
+        """Persist several mutations as one change with a single save, generation and history entry.
+
+        Subscribers are still notified of every event.
+        """
+        if self._deltas and not self._replaying:
+            self.history.record(self._deltas)
+        self._deltas = []
+        self._save_data()
+        self.generation += 1
+        for event in events:
+            event.generation = self.generation
+            # Rules and the expansion horizon affect any number of occurrences,
+            # archiving moves a whole year
+            reset = (event.is_rule_change() or event.is_archive_change()
+                     or event.kind in (ChangeKind.BUDGET_ADDED, ChangeKind.BUDGET_REMOVED))
+            for name in self._DERIVED_INDEXES:
+                index = getattr(self, name)
+                if reset:
+                    setattr(self, name, None)
+                elif index is not None:
+                    index.apply(event)
+            for ref in list(self._subscribers):
+                callback = ref()
+                if callback is None:
+                    self._subscribers.remove(ref)
+                else:
+                    callback(event)
+
+    @_locked
     def add_budget(self, year: int, month: int, tags: List[Dict] = None) -> None:
         """Add a new budget for a specific month/year."""
         if tags is None:
             tags = []
 
         # Check if budget already exists
-        for budget in self.data["budgets"]:
-            if budget["year"] == year and budget["month"] == month:
-                raise ValueError(f"Budget for {year}-{month} already exists")
+        if self._get_budget(year, month) is not None:
+            raise ValueError(f"Budget for {year}-{month} already exists")
 
         new_budget = {
             "year": year,
             "month": month,
             "tags": tags
         }
-        self.data["budgets"].append(new_budget)
-        self._save_data()
+        self._store_budget(year, month, tags)
+        self._commit(ChangeKind.BUDGET_ADDED, (year, month), new_budget)
 
+    @_locked
     def add_tag(self, year: int, month: int, tag_id: str, name: str,
                 max_amount: float, sub_tags: List[Dict] = None) -> None:
         """Add a new tag to a specific budget."""
@@ -72,8 +357,10 @@ class FinancialData:
             "subTags": sub_tags
         }
         budget["tags"].append(new_tag)
-        self._save_data()
+        self._store_budget(year, month, budget["tags"], tag_id=tag_id)
+        self._commit(ChangeKind.TAG_ADDED, (year, month), new_tag, tag_id=tag_id)
 
+    @_locked
     def add_subtag(self, year: int, month: int, parent_tag_id: str,
                    subtag_id: str, name: str, max_amount: float) -> None:
         """Add a subtag to a parent tag."""
@@ -96,28 +383,48 @@ class FinancialData:
             "maxAmount": max_amount
         }
         parent_tag["subTags"].append(new_subtag)
-        self._save_data()
+        self._store_budget(year, month, budget["tags"], tag_id=parent_tag_id)
+        self._commit(ChangeKind.TAG_ADDED, (year, month), new_subtag,
+                     tag_id=parent_tag_id, subtag_id=subtag_id)
 
+    @_locked
     def remove_budget(self, year: int, month: int) -> None:
         """Remove a budget for a specific month/year."""
-        self.data["budgets"] = [
-            b for b in self.data["budgets"]
-            if not (b["year"] == year and b["month"] == month)
-        ]
-        self._save_data()
+        budget = self._get_budget(year, month)
+        if budget is None:
+            return
+
+        self._store_budget(year, month, None)
+        self._commit(ChangeKind.BUDGET_REMOVED, (year, month), budget)
 
-    def remove_tag(self, year: int, month: int, tag_id: str) -> None:
-        """Remove a tag from a specific budget."""
+    @_locked
+    def remove_tag(self, year: int, month: int, tag_id: str) -> int:
+        """Remove a tag from a specific budget.
+
+        Returns the number of transactions of the period left booked under
+        the tag or its subtags, see merge_tag to move them instead.
+        """
         budget = self._get_budget(year, month)
         if budget is None:
             raise ValueError(f"Budget for {year}-{month} not found")
 
+        tag = self._get_tag(budget, tag_id)
+        if tag is None:
+            raise ValueError(f"Tag '{tag_id}' not found")
+
         budget["tags"] = [t for t in budget["tags"] if t["id"] != tag_id]
-        self._save_data()
+        self._store_budget(year, month, budget["tags"], tag_id=tag_id)
+        self._commit(ChangeKind.TAG_REMOVED, (year, month), tag, tag_id=tag_id)
+        return self.count_references(year, month, tag_id)
 
+    @_locked
     def remove_subtag(self, year: int, month: int, parent_tag_id: str,
-                     subtag_id: str) -> None:
-        """Remove a subtag from a parent tag."""
+                     subtag_id: str) -> int:
+        """Remove a subtag from a parent tag.
+
+        Returns the number of transactions of the period left booked under
+        the subtag, see merge_subtag to move them instead.
+        """
         budget = self._get_budget(year, month)
         if budget is None:
             raise ValueError(f"Budget for {year}-{month} not found")
@@ -126,11 +433,111 @@ class FinancialData:
         if parent_tag is None:
             raise ValueError(f"Parent tag '{parent_tag_id}' not found")
 
+        subtag = self._get_subtag(parent_tag, subtag_id)
+        if subtag is None:
+            raise ValueError(f"Subtag '{subtag_id}' not found")
+
         parent_tag["subTags"] = [
             st for st in parent_tag["subTags"] if st["id"] != subtag_id
         ]
-        self._save_data()
+        self._store_budget(year, month, budget["tags"], tag_id=parent_tag_id)
+        self._commit(ChangeKind.TAG_REMOVED, (year, month), subtag,
+                     tag_id=parent_tag_id, subtag_id=subtag_id)
+        return self.count_references(year, month, parent_tag_id, subtag_id)
+
+    @_locked
+    def merge_tag(self, year: int, month: int, tag_id: str, target_tag_id: str) -> int:
+        """Remove a tag, moving the period's transactions booked under it to another tag.
+
+        Transactions on a subtag keep it if the target tag has a subtag with
+        the same id, otherwise they are booked on the target tag itself. One
+        change, undone at once. Returns the number of transactions moved.
+        """
+        budget = self._get_budget(year, month)
+        if budget is None:
+            raise ValueError(f"Budget for {year}-{month} not found")
+        tag = self._get_tag(budget, tag_id)
+        target = self._get_tag(budget, target_tag_id)
+        if tag is None or target is None or tag is target:
+            raise ValueError(f"Tag '{tag_id}' can not be merged into '{target_tag_id}'")
+
+        target_subtags = {subtag["id"] for subtag in target.get("subTags", [])}
+        events = self._reassign(
+            lambda t: t["tagId"] == tag_id and (t["year"], t["month"]) == (year, month),
+            lambda t: (target_tag_id, t.get("subtagId") if t.get("subtagId") in target_subtags else None)
+        )
+        budget["tags"] = [t for t in budget["tags"] if t["id"] != tag_id]
+        self._store_budget(year, month, budget["tags"], tag_id=tag_id)
+        events.append(ChangeEvent(ChangeKind.TAG_REMOVED, 0, (year, month), tag, tag_id=tag_id))
+        self._commit_events(events)
+        return len(events) - 1
+
+    @_locked
+    def merge_subtag(self, year: int, month: int, parent_tag_id: str, subtag_id: str,
+                     target_subtag_id: Optional[str] = None) -> int:
+        """Remove a subtag, moving the period's transactions booked under it to a sibling.
+
+        With no target_subtag_id they are booked on the parent tag itself.
+        One change, undone at once. Returns the number of transactions moved.
+        """
+        budget = self._get_budget(year, month)
+        if budget is None:
+            raise ValueError(f"Budget for {year}-{month} not found")
+        parent_tag = self._get_tag(budget, parent_tag_id)
+        if parent_tag is None:
+            raise ValueError(f"Parent tag '{parent_tag_id}' not found")
+        subtag = self._get_subtag(parent_tag, subtag_id)
+        if subtag is None or subtag_id == target_subtag_id or (
+                target_subtag_id is not None and self._get_subtag(parent_tag, target_subtag_id) is None):
+            raise ValueError(f"Subtag '{subtag_id}' can not be merged into '{target_subtag_id}'")
+
+        events = self._reassign(
+            lambda t: ((t["tagId"], t.get("subtagId")) == (parent_tag_id, subtag_id)
+                       and (t["year"], t["month"]) == (year, month)),
+            lambda t: (parent_tag_id, target_subtag_id)
+        )
+        parent_tag["subTags"] = [st for st in parent_tag["subTags"] if st["id"] != subtag_id]
+        self._store_budget(year, month, budget["tags"], tag_id=parent_tag_id)
+        events.append(ChangeEvent(ChangeKind.TAG_REMOVED, 0, (year, month), subtag,
+                                  tag_id=parent_tag_id, subtag_id=subtag_id))
+        self._commit_events(events)
+        return len(events) - 1
+
+    @_locked
+    def reassign_transactions(self, tag_id: str, subtag_id: Optional[str], to_tag_id: str,
+                              to_subtag_id: Optional[str],
+                              periods: Optional[Iterable[Tuple[int, int]]] = None) -> int:
+        """Book every stored transaction under (tag_id, subtag_id) on (to_tag_id, to_subtag_id).
 
+        subtag_id "*" matches the tag and all its subtags. periods limits the
+        move to those (year, month). One change, undone at once. Returns the
+        number of transactions moved.
+        """
+        periods = set(periods) if periods is not None else None
+        events = self._reassign(
+            lambda t: (t["tagId"] == tag_id and (subtag_id == "*" or (t.get("subtagId") or None) == subtag_id)
+                       and (periods is None or (t["year"], t["month"]) in periods)),
+            lambda t: (to_tag_id, to_subtag_id)
+        )
+        if events:
+            self._commit_events(events)
+        return len(events)
+
+    def _reassign(self, matches: Callable[[Dict], bool],
+                  target: Callable[[Dict], Tuple[str, Optional[str]]]) -> List[ChangeEvent]:
+        """Rebook matching stored transactions, returning their events for the caller to commit."""
+        events = []
+        for transaction in self.data["transactions"]:
+            if not matches(transaction):
+                continue
+            previous = dict(transaction)
+            transaction["tagId"], transaction["subtagId"] = target(transaction)
+            self._record("transaction", transaction["id"], previous, dict(transaction))
+            events.append(ChangeEvent(ChangeKind.TRANSACTION_EDITED, 0,
+                                      (transaction["year"], transaction["month"]), transaction, previous))
+        return events
+
+    @_locked
     def edit_budget(self, year: int, month: int, new_tags: List[Dict]) -> None:
         """Edit an existing budget's tags."""
         budget = self._get_budget(year, month)
@@ -138,8 +545,10 @@ class FinancialData:
             raise ValueError(f"Budget for {year}-{month} not found")
 
         budget["tags"] = new_tags
-        self._save_data()
+        self._store_budget(year, month, new_tags)
+        self._commit(ChangeKind.BUDGET_EDITED, (year, month), budget)
 
+    @_locked
     def edit_tag(self, year: int, month: int, tag_id: str,
                  name: Optional[str] = None, max_amount: Optional[float] = None) -> None:
         """Edit a tag's properties."""
@@ -156,8 +565,10 @@ class FinancialData:
         if max_amount is not None:
             tag["maxAmount"] = max_amount
 
-        self._save_data()
+        self._store_budget(year, month, budget["tags"], tag_id=tag_id)
+        self._commit(ChangeKind.TAG_EDITED, (year, month), tag, tag_id=tag_id)
 
+    @_locked
     def edit_subtag(self, year: int, month: int, parent_tag_id: str,
                     subtag_id: str, name: Optional[str] = None,
                     max_amount: Optional[float] = None) -> None:
@@ -179,26 +590,204 @@ class FinancialData:
         if max_amount is not None:
             subtag["maxAmount"] = max_amount
 
-        self._save_data()
+        self._store_budget(year, month, budget["tags"], tag_id=parent_tag_id)
+        self._commit(ChangeKind.TAG_EDITED, (year, month), subtag,
+                     tag_id=parent_tag_id, subtag_id=subtag_id)
 
     def get_budget(self, year: int, month: int) -> Optional[Dict]:
-        """Get budget data for a specific month/year."""
-        return self._get_budget(year, month)
+        """Get a copy of the budget for a specific month/year, with inherited tags resolved.
+
+        Changing the copy does not change the ledger, see edit_budget and edit_tag.
+        """
+        budget = self._get_budget(year, month)
+        return self._copy_budget(budget) if budget is not None else None
 
     def get_all_budgets(self) -> List[Dict]:
-        """Get all budgets."""
-        return self.data["budgets"]
+        """Get copies of all budgets with inherited tags resolved, sorted by date."""
+        return [self._copy_budget(budget) for budget in self._resolved_budgets().values()]
+
+    def get_budget_periods(self) -> List[Tuple[int, int]]:
+        """(year, month) of every budget, sorted by date, without copying the budgets."""
+        return list(self._resolved_budgets())
+
+    # Budget inheritance
+    #
+    # A stored budget either holds its full tag tree under "tags", or only
+    # the differences to the previous stored budget: "overrides" lists tags
+    # (with their subtags) that changed or are new, "removed" lists the ids of
+    # inherited tags it dropped. Unchanged months store next to nothing.
+
+    @staticmethod
+    def _copy_tags(tags: List[Dict]) -> List[Dict]:
+        return [dict(tag, subTags=[dict(subtag) for subtag in tag.get("subTags", [])]) for tag in tags]
+
+    def _copy_budget(self, budget: Dict) -> Dict:
+        return dict(budget, tags=self._copy_tags(budget["tags"]))
+
+    def _resolve_tags(self, stored: Dict, base_tags: List[Dict]) -> List[Dict]:
+        """Effective tag tree of a stored budget on top of its predecessor's tags."""
+        if "tags" in stored:
+            return self._copy_tags(stored["tags"])
+
+        overrides = {tag["id"]: tag for tag in stored.get("overrides", [])}
+        removed = set(stored.get("removed", []))
+        tags = [overrides.pop(tag["id"], tag) for tag in base_tags if tag["id"] not in removed]
+        # Overrides left over are tags the period added
+        tags.extend(overrides.values())
+        return self._copy_tags(tags)
+
+    def _encode_budget(self, year: int, month: int, tags: List[Dict],
+                       base_tags: Optional[List[Dict]]) -> Dict:
+        """Stored form of a budget, as a diff against base_tags when that reproduces it exactly."""
+        full = {"year": year, "month": month, "tags": self._copy_tags(tags)}
+        if base_tags is None:
+            return full
+
+        base_by_id = {tag["id"]: tag for tag in base_tags}
+        tag_ids = {tag["id"] for tag in tags}
+        stored = {
+            "year": year,
+            "month": month,
+            "overrides": self._copy_tags([tag for tag in tags if base_by_id.get(tag["id"]) != tag]),
+            "removed": [tag["id"] for tag in base_tags if tag["id"] not in tag_ids]
+        }
+        # Reordered tags can not be expressed as a diff
+        if self._resolve_tags(stored, base_tags) != full["tags"]:
+            return full
+        return stored
+
+    def _resolved_budgets(self) -> Dict[Tuple[int, int], Dict]:
+        """Effective budgets by period in date order, resolved once per change."""
+        if self._budget_cache is None:
+            cache = {}
+            base_tags = []
+            for stored in sorted(self.data["budgets"], key=lambda b: (b["year"], b["month"])):
+                base_tags = self._resolve_tags(stored, base_tags)
+                cache[(stored["year"], stored["month"])] = {
+                    "year": stored["year"],
+                    "month": stored["month"],
+                    "tags": base_tags
+                }
+            self._budget_cache = cache
+        return self._budget_cache
+
+    def _store_budget(self, year: int, month: int, tags: Optional[List[Dict]],
+                      tag_id: Optional[str] = None) -> None:
+        """Write a period's effective tags back as a diff, or remove it when tags is None.
+
+        The next stored period inherits from this one, so it is re-encoded
+        against the new tags to keep its own effective tags unchanged. With
+        tag_id only that tag changed, and only that tag is recorded for undo.
+        """
+        resolved = self._resolved_budgets()
+        period = (year, month)
+        predecessor = max((p for p in resolved if p < period), default=None)
+        successor = min((p for p in resolved if p > period), default=None)
+
+        stored = next((b for b in self.data["budgets"] if (b["year"], b["month"]) == period), None)
+        budgets = [b for b in self.data["budgets"] if (b["year"], b["month"]) not in (period, successor)]
+        base_tags = resolved[predecessor]["tags"] if predecessor else None
+        # Callers edit the resolved copy in place, the stored form still has the old tags
+        before = self._resolve_tags(stored, base_tags or []) if stored is not None else None
+        if tag_id is not None:
+            self._record("tag", (year, month, tag_id), self._tag_state(before, tag_id), self._tag_state(tags, tag_id))
+        else:
+            self._record("budget", period, before, self._copy_tags(tags) if tags is not None else None)
+        if tags is not None:
+            budgets.append(self._encode_budget(year, month, tags, base_tags))
+            base_tags = tags
+        if successor:
+            budgets.append(self._encode_budget(*successor, resolved[successor]["tags"], base_tags))
+
+        budgets.sort(key=lambda b: (b["year"], b["month"]))
+        self.data["budgets"] = budgets
+        self._budget_cache = None
+        self._update_tag_catalog(period, tags)
+
+    def _tag_state(self, tags: List[Dict], tag_id: str) -> Optional[Tuple[int, Dict]]:
+        """(position, copy) of a tag in a period's tags for the history, None if it has no such tag."""
+        for index, tag in enumerate(tags):
+            if tag["id"] == tag_id:
+                return index, self._copy_tags([tag])[0]
+        return None
+
+    def get_tag_catalog(self) -> Dict[str, Dict]:
+        """Every tag and subtag used by any budget, without scanning the budgets.
+
+        Maps tag id to {"name", "subtags": {subtag id: {"name", ...}}, ...}.
+        Names are taken from the latest period that has the tag. The catalog
+        is kept up to date by every budget change and must not be modified by
+        callers.
+        """
+        return self._tag_catalog
+
+    def _update_tag_catalog(self, period: Tuple[int, int], tags: Optional[List[Dict]]) -> None:
+        """Replace what a period contributes to the tag catalog, tags=None removes it.
+
+        Each catalog entry records the periods it appears in, so the cost
+        depends on the number of distinct tags, not on the number of periods.
+        """
+        for tag_id, entry in list(self._tag_catalog.items()):
+            if entry["periods"].pop(period, None) is None:
+                continue
+            for subtag_id, subtag_entry in list(entry["subtags"].items()):
+                subtag_entry["periods"].pop(period, None)
+                if not self._refresh_catalog_entry(subtag_entry, period):
+                    del entry["subtags"][subtag_id]
+            if not self._refresh_catalog_entry(entry, period):
+                del self._tag_catalog[tag_id]
+
+        for tag in tags or []:
+            entry = self._tag_catalog.setdefault(tag["id"], {"name": tag["name"], "latest": period,
+                                                             "periods": {}, "subtags": {}})
+            self._add_catalog_period(entry, period, tag["name"])
+            for subtag in tag.get("subTags", []):
+                subtag_entry = entry["subtags"].setdefault(subtag["id"], {"name": subtag["name"], "latest": period,
+                                                                          "periods": {}})
+                self._add_catalog_period(subtag_entry, period, subtag["name"])
+
+    @staticmethod
+    def _add_catalog_period(entry: Dict, period: Tuple[int, int], name: str) -> None:
+        entry["periods"][period] = name
+        if period >= entry["latest"]:
+            entry["latest"] = period
+            entry["name"] = name
+
+    @staticmethod
+    def _refresh_catalog_entry(entry: Dict, removed: Tuple[int, int]) -> bool:
+        """Re-pick the name after a period was removed, False if no period has the entry anymore."""
+        if not entry["periods"]:
+            return False
+        if entry["latest"] == removed:
+            entry["latest"] = max(entry["periods"])
+            entry["name"] = entry["periods"][entry["latest"]]
+        return True
+
+    def _compact_budgets(self) -> None:
+        """Re-encode every budget as a diff against its predecessor where possible."""
+        budgets = []
+        base_tags = None
+        for budget in self._resolved_budgets().values():
+            budgets.append(self._encode_budget(budget["year"], budget["month"], budget["tags"], base_tags))
+            base_tags = budget["tags"]
+        self.data["budgets"] = budgets
 
     # Transaction methods
+    @_locked
     def add_transaction(self, transaction_id: str, year: int, month: int, day: int,
                        amount: float, description: str, tag_id: str,
-                       subtag_id: Optional[str] = None) -> None:
-        """Add a new transaction."""
+                       subtag_id: Optional[str] = None) -> List[str]:
+        """Add a new transaction.
+
+        Returns the ids of existing transactions it looks like a duplicate of,
+        the transaction is added either way.
+        """
         # Check if transaction ID already exists
         for transaction in self.data["transactions"]:
             if transaction["id"] == transaction_id:
                 raise ValueError(f"Transaction with id '{transaction_id}' already exists")
 
+        duplicates = self.find_duplicates(year, month, day, amount, description)
         new_transaction = {
             "id": transaction_id,
             "year": year,
@@ -210,24 +799,96 @@ class FinancialData:
             "subtagId": subtag_id
         }
         self.data["transactions"].append(new_transaction)
-        self._save_data()
+        self._record("transaction", transaction_id, None, dict(new_transaction))
+        self._commit(ChangeKind.TRANSACTION_ADDED, (year, month), new_transaction)
+        return duplicates
+
+    @_locked
+    def add_transactions(self, transactions: List[Dict], skip_duplicates: bool = False) -> Dict[str, List[str]]:
+        """Add many transactions with a single save, undone as one change.
 
+        Each transaction is a dict with the arguments of add_transaction,
+        keyed like stored transactions ("id", "year", ..., "tagId",
+        "subtagId"). Returns the ids of the transactions that look like
+        duplicates, of existing transactions or of earlier ones in the batch,
+        mapped to the ids they duplicate. With skip_duplicates those are left
+        out instead of added.
+        """
+        from finman.logic.duplicates import transaction_fingerprint
+
+        existing_ids = {t["id"] for t in self.data["transactions"]}
+        index = self.get_duplicate_index()
+        batch = {}  # Fingerprints of the transactions added so far
+        flagged = {}
+        events = []
+        for row in transactions:
+            if row["id"] in existing_ids:
+                raise ValueError(f"Transaction with id '{row['id']}' already exists")
+            new_transaction = {
+                "id": row["id"],
+                "year": row["year"],
+                "month": row["month"],
+                "day": row["day"],
+                "amount": row["amount"],
+                "description": row["description"],
+                "tagId": row["tagId"],
+                "subtagId": row.get("subtagId")
+            }
+            key = transaction_fingerprint(new_transaction)
+            duplicates = index.matches(key) + batch.get(key, [])
+            if duplicates:
+                flagged[new_transaction["id"]] = duplicates
+                if skip_duplicates:
+                    continue
+            existing_ids.add(new_transaction["id"])
+            batch.setdefault(key, []).append(new_transaction["id"])
+            self.data["transactions"].append(new_transaction)
+            self._record("transaction", new_transaction["id"], None, dict(new_transaction))
+            events.append(ChangeEvent(ChangeKind.TRANSACTION_ADDED, 0,
+                                      (new_transaction["year"], new_transaction["month"]), new_transaction))
+
+        if events:
+            self._commit_events(events)
+        return flagged
+
+    @_locked
     def remove_transaction(self, transaction_id: str) -> None:
-        """Remove a transaction by ID."""
-        self.data["transactions"] = [
-            t for t in self.data["transactions"] if t["id"] != transaction_id
-        ]
-        self._save_data()
+        """Remove a transaction by ID, removing a recurring occurrence skips its date."""
+        transaction = self._get_transaction(transaction_id)
+        if transaction is None:
+            self._check_not_archived(transaction_id)
+            return
+
+        if "recurring" in transaction:
+            self._skip_occurrence(transaction)
+        else:
+            self.data["transactions"] = [
+                t for t in self.data["transactions"] if t["id"] != transaction_id
+            ]
+            self._record("transaction", transaction_id, dict(transaction), None)
+        self._commit(ChangeKind.TRANSACTION_REMOVED,
+                     (transaction["year"], transaction["month"]), transaction)
 
+    @_locked
     def edit_transaction(self, transaction_id: str, year: Optional[int] = None,
                         month: Optional[int] = None, day: Optional[int] = None,
                         amount: Optional[float] = None, description: Optional[str] = None,
                         tag_id: Optional[str] = None, subtag_id: Optional[str] = None) -> None:
-        """Edit a transaction's properties."""
+        """Edit a transaction's properties.
+
+        Editing a recurring occurrence materializes it as a regular
+        transaction with the same id, the rule skips that date from then on.
+        """
         transaction = self._get_transaction(transaction_id)
         if transaction is None:
+            self._check_not_archived(transaction_id)
             raise ValueError(f"Transaction with id '{transaction_id}' not found")
 
+        previous = dict(transaction)
+        if "recurring" in transaction:
+            self._skip_occurrence(transaction)
+            transaction = {key: value for key, value in transaction.items() if key != "recurring"}
+            self.data["transactions"].append(transaction)
         if year is not None:
             transaction["year"] = year
         if month is not None:
@@ -243,20 +904,86 @@ class FinancialData:
         if subtag_id is not None:
             transaction["subtagId"] = subtag_id
 
-        self._save_data()
+        # A materialized occurrence did not exist as a stored transaction before
+        self._record("transaction", transaction_id, None if "recurring" in previous else previous,
+                     dict(transaction))
+        self._commit(ChangeKind.TRANSACTION_EDITED,
+                     (transaction["year"], transaction["month"]), transaction, previous)
 
     def get_transaction(self, transaction_id: str) -> Optional[Dict]:
         """Get a transaction by ID."""
         return self._get_transaction(transaction_id)
 
+    def get_transaction_count(self) -> int:
+        """Number of stored transactions, without expanding recurring rules or loading archives."""
+        return len(self.data["transactions"])
+
     def get_all_transactions(self) -> List[Dict]:
-        """Get all transactions."""
-        return self.data["transactions"]
+        """Get all transactions, including archived ones and recurring occurrences up to the expansion horizon.
+
+        Archived years are decompressed on the first call.
+        """
+        if not self.data["archives"]:
+            return self._live_transactions()
+
+        end = self._expansion_end()
+        if self._with_archives is None or self._with_archives[:2] != (self.generation, end):
+            transactions = []
+            for archive in self.data["archives"]:
+                transactions.extend(self._load_archive(archive))
+            transactions.extend(self._live_transactions())
+            self._with_archives = (self.generation, end, transactions)
+        return self._with_archives[2]
+
+    def get_transactions_between(self, start: Tuple[int, int], end: Tuple[int, int]) -> List[Dict]:
+        """Transactions of the periods from start to end (year, month), both inclusive, oldest first.
+
+        Reads a range of the date index, so the cost follows the number of
+        transactions in range rather than the size of the ledger. Only the
+        archives of years in range are decompressed.
+        """
+        transactions = self.get_date_index().between((start[0], start[1], 1), (end[0], end[1], 31))
+        archived = []
+        for archive in self.data["archives"]:
+            if start[0] <= archive["year"] <= end[0]:
+                archived.extend(t for t in self._load_archive(archive) if start <= (t["year"], t["month"]) <= end)
+        if archived:
+            transactions = sorted(archived + transactions, key=lambda t: (t["year"], t["month"], t["day"], t["id"]))
+        return transactions
+
+    def get_transaction_span(self) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """(year, month) of the oldest and the newest transaction, archives included, None if there are none."""
+        periods = list(self.get_date_index().span() or ())
+        for archive in self.data["archives"]:
+            periods += [(archive["year"], row[0]) for row in archive["totals"]]
+        if not periods:
+            return None
+        return min(periods), max(periods)
+
+    def _live_transactions(self) -> List[Dict]:
+        """Stored transactions and recurring occurrences up to the expansion horizon, without archives."""
+        if not self.data["recurring"]:
+            return self.data["transactions"]
+
+        end = self._expansion_end()
+        if self._expanded is None or self._expanded[:2] != (self.generation, end):
+            transactions = list(self.data["transactions"])
+            for rule in self.data["recurring"]:
+                transactions.extend(expand_rule(rule, date.min, end))
+            self._expanded = (self.generation, end, transactions)
+        return self._expanded[2]
 
     def get_transactions_by_date(self, year: int, month: Optional[int] = None,
-                                 day: Optional[int] = None) -> List[Dict]:
-        """Get transactions filtered by date."""
+                                 day: Optional[int] = None, include_archived: bool = True) -> List[Dict]:
+        """Get transactions filtered by date, recurring occurrences are expanded for that range.
+
+        An archived year is decompressed unless include_archived is False,
+        see get_archived_totals for its spending.
+        """
         transactions = [t for t in self.data["transactions"] if t["year"] == year]
+        archive = self._get_archive(year)
+        if archive is not None and include_archived:
+            transactions.extend(self._load_archive(archive))
 
         if month is not None:
             transactions = [t for t in transactions if t["month"] == month]
@@ -264,8 +991,477 @@ class FinancialData:
         if day is not None:
             transactions = [t for t in transactions if t["day"] == day]
 
+        if self.data["recurring"]:
+            first = date(year, month or 1, 1)
+            last = date(year, month or 12, calendar.monthrange(year, month or 12)[1])
+            for rule in self.data["recurring"]:
+                transactions.extend(t for t in expand_rule(rule, first, last) if day is None or t["day"] == day)
+
         return transactions
 
+    def _expansion_end(self) -> date:
+        """Last day that get_all_transactions expands recurring rules to.
+
+        Rules without an end date repeat forever, so they are expanded up to
+        the later of the current month and the last budgeted month.
+        """
+        today = date.today()
+        year, month = today.year, today.month
+        budgets = self._resolved_budgets()
+        if budgets:
+            year, month = max((year, month), max(budgets))
+        return date(year, month, calendar.monthrange(year, month)[1])
+
+    # Undo and redo
+    #
+    # Every mutation records the before and after state of the entities it
+    # touched through _record, _commit files them as one history entry.
+    # Undoing restores the before states through _commit again, so the
+    # ledger is saved and subscribers are notified like for any other change.
+
+    def _record(self, entity: str, key: Any, before: Optional[Any], after: Optional[Any]) -> None:
+        if not self._replaying:
+            self._deltas.append((entity, key, before, after))
+
+    @_locked
+    def undo(self) -> bool:
+        """Revert the latest change, False if there is nothing to undo."""
+        deltas = self.history.take_undo()
+        if deltas is None:
+            return False
+        self._replay([(entity, key, before) for entity, key, before, _ in reversed(deltas)])
+        return True
+
+    @_locked
+    def redo(self) -> bool:
+        """Apply the latest undone change again, False if there is nothing to redo."""
+        deltas = self.history.take_redo()
+        if deltas is None:
+            return False
+        self._replay([(entity, key, after) for entity, key, _, after in deltas])
+        return True
+
+    def _replay(self, states: List[Tuple[str, Any, Optional[Any]]]) -> None:
+        self._replaying = True
+        self._replayed = []
+        try:
+            for entity, key, state in states:
+                if entity == "budget":
+                    self._restore_budget(key, state)
+                elif entity == "tag":
+                    self._restore_tag(key, state)
+                elif entity == "transaction":
+                    self._restore_transaction(key, state)
+                else:
+                    self._restore_rule(key, state)
+        finally:
+            self._replaying = False
+            # A bulk import is undone with a single save, like it was added
+            self._commit_events(self._replayed)
+
+    def _restore_budget(self, period: Tuple[int, int], tags: Optional[List[Dict]]) -> None:
+        current = self._get_budget(*period)
+        self._store_budget(*period, self._copy_tags(tags) if tags is not None else None)
+        if tags is None:
+            self._commit(ChangeKind.BUDGET_REMOVED, period, current)
+        else:
+            budget = {"year": period[0], "month": period[1], "tags": self._copy_tags(tags)}
+            self._commit(ChangeKind.BUDGET_ADDED if current is None else ChangeKind.BUDGET_EDITED,
+                         period, budget)
+
+    def _restore_tag(self, key: Tuple[int, int, str], state: Optional[Tuple[int, Dict]]) -> None:
+        year, month, tag_id = key
+        budget = self._get_budget(year, month)
+        current = self._get_tag(budget, tag_id)
+        tags = [tag for tag in budget["tags"] if tag["id"] != tag_id]
+        if state is None:
+            self._store_budget(year, month, tags)
+            self._commit(ChangeKind.TAG_REMOVED, (year, month), current, tag_id=tag_id)
+            return
+
+        index, tag = state
+        tag = self._copy_tags([tag])[0]
+        tags.insert(index, tag)
+        self._store_budget(year, month, tags)
+        self._commit(ChangeKind.TAG_ADDED if current is None else ChangeKind.TAG_EDITED, (year, month), tag,
+                     tag_id=tag_id)
+
+    def _restore_transaction(self, transaction_id: str, state: Optional[Dict]) -> None:
+        transactions = self.data["transactions"]
+        index = next((i for i, t in enumerate(transactions) if t["id"] == transaction_id), None)
+        current = transactions[index] if index is not None else None
+        if state is None:
+            del transactions[index]
+            self._commit(ChangeKind.TRANSACTION_REMOVED, (current["year"], current["month"]), current)
+            return
+
+        transaction = dict(state)
+        if current is None:
+            transactions.append(transaction)
+            self._commit(ChangeKind.TRANSACTION_ADDED, (transaction["year"], transaction["month"]), transaction)
+        else:
+            transactions[index] = transaction
+            self._commit(ChangeKind.TRANSACTION_EDITED, (transaction["year"], transaction["month"]),
+                         transaction, current)
+
+    def _restore_rule(self, rule_id: str, state: Optional[Dict]) -> None:
+        rules = self.data["recurring"]
+        index = next((i for i, r in enumerate(rules) if r["id"] == rule_id), None)
+        current = rules[index] if index is not None else None
+        rule = self._copy_rule(state) if state is not None else current
+        if state is None:
+            del rules[index]
+            kind = ChangeKind.RULE_REMOVED
+        elif current is None:
+            rules.append(rule)
+            kind = ChangeKind.RULE_ADDED
+        else:
+            rules[index] = rule
+            kind = ChangeKind.RULE_EDITED
+        start_date = parse_date(rule["start"])
+        self._commit(kind, (start_date.year, start_date.month), rule)
+
+    # Recurring rules
+    @_locked
+    def add_rule(self, rule_id: str, amount: float, description: str, tag_id: str,
+                 subtag_id: Optional[str], start: str, schedule: str = "monthly",
+                 interval: int = 1, end: Optional[str] = None) -> None:
+        """Add a recurring transaction rule, start and end are YYYY-MM-DD dates."""
+        if self._get_rule(rule_id) is not None:
+            raise ValueError(f"Recurring rule '{rule_id}' already exists")
+
+        new_rule = {
+            "id": rule_id,
+            "amount": amount,
+            "description": description,
+            "tagId": tag_id,
+            "subtagId": subtag_id,
+            "schedule": schedule,
+            "interval": interval,
+            "start": start,
+            "end": end,
+            "skipped": []
+        }
+        self._validate_rule(new_rule)
+        self.data["recurring"].append(new_rule)
+        self._record("rule", rule_id, None, self._copy_rule(new_rule))
+        start_date = parse_date(start)
+        self._commit(ChangeKind.RULE_ADDED, (start_date.year, start_date.month), new_rule)
+
+    @_locked
+    def edit_rule(self, rule_id: str, **changes: Any) -> None:
+        """Change fields of a rule (amount, description, tagId, subtagId, schedule, interval, start, end).
+
+        Occurrences that were already materialized or removed stay as they are.
+        """
+        rule = self._get_rule(rule_id)
+        if rule is None:
+            raise ValueError(f"Recurring rule '{rule_id}' not found")
+
+        editable = {"amount", "description", "tagId", "subtagId", "schedule", "interval", "start", "end"}
+        unknown = set(changes) - editable
+        if unknown:
+            raise ValueError(f"Recurring rules have no field(s) {', '.join(sorted(unknown))}")
+
+        edited = dict(rule, **changes)
+        self._validate_rule(edited)
+        before = self._copy_rule(rule)
+        rule.update(changes)
+        self._record("rule", rule_id, before, self._copy_rule(rule))
+        start_date = parse_date(rule["start"])
+        self._commit(ChangeKind.RULE_EDITED, (start_date.year, start_date.month), rule)
+
+    @_locked
+    def remove_rule(self, rule_id: str) -> None:
+        """Remove a recurring rule and all of its unmaterialized occurrences."""
+        rule = self._get_rule(rule_id)
+        if rule is None:
+            return
+
+        self.data["recurring"] = [r for r in self.data["recurring"] if r["id"] != rule_id]
+        self._record("rule", rule_id, self._copy_rule(rule), None)
+        start_date = parse_date(rule["start"])
+        self._commit(ChangeKind.RULE_REMOVED, (start_date.year, start_date.month), rule)
+
+    def get_rule(self, rule_id: str) -> Optional[Dict]:
+        """Get a recurring rule by ID."""
+        return self._get_rule(rule_id)
+
+    def get_all_rules(self) -> List[Dict]:
+        """Get all recurring rules."""
+        return self.data["recurring"]
+
+    def _validate_rule(self, rule: Dict) -> None:
+        if rule["schedule"] not in SCHEDULES:
+            raise ValueError(f"Schedule must be one of {', '.join(SCHEDULES)}")
+        if not isinstance(rule["interval"], int) or rule["interval"] < 1:
+            raise ValueError("Interval must be a whole number of at least 1")
+        start = parse_date(rule["start"])
+        if rule["end"] and parse_date(rule["end"]) < start:
+            raise ValueError("End date must not be before the start date")
+
+    def _skip_occurrence(self, occurrence: Dict) -> None:
+        """Stop a rule from generating an occurrence, it was removed or materialized."""
+        rule = self._get_rule(occurrence["recurring"])
+        when = date(occurrence["year"], occurrence["month"], occurrence["day"])
+        before = self._copy_rule(rule)
+        rule.setdefault("skipped", []).append(when.isoformat())
+        self._record("rule", rule["id"], before, self._copy_rule(rule))
+
+    @staticmethod
+    def _copy_rule(rule: Dict) -> Dict:
+        return dict(rule, skipped=list(rule.get("skipped", [])))
+
+    def get_spend_index(self) -> 'SpendIndex':
+        """Prefix-sum spending index, built on first use and kept current by _commit.
+
+        Archived years are counted from their summaries, per day.
+        """
+        if self._spend_index is None:
+            from finman.logic.archive import summary_entries
+            from finman.logic.spend_index import SpendIndex
+            summaries = [entry for archive in self.data["archives"] for entry in summary_entries(self._daily_archive(archive))]
+            self._spend_index = SpendIndex(summaries + self._live_transactions())
+        return self._spend_index
+
+    def get_date_index(self) -> 'DateIndex':
+        """Transactions sorted by date, built on first use and kept current by _commit."""
+        if self._date_index is None:
+            from finman.logic.date_index import DateIndex
+            self._date_index = DateIndex(self._live_transactions())
+        return self._date_index
+
+    def get_duplicate_index(self) -> 'DuplicateIndex':
+        """Fingerprint index of transactions, built on first use and kept current by _commit."""
+        if self._duplicate_index is None:
+            from finman.logic.duplicates import DuplicateIndex
+            self._duplicate_index = DuplicateIndex(self._live_transactions())
+        return self._duplicate_index
+
+    def find_duplicates(self, year: int, month: int, day: int, amount: float,
+                        description: str) -> List[str]:
+        """Ids of transactions on the same day with the same amount and description."""
+        from finman.logic.duplicates import fingerprint
+        return self.get_duplicate_index().matches(fingerprint(year, month, day, amount, description))
+
+    def get_duplicate_groups(self) -> List[List[Dict]]:
+        """Every set of suspected duplicate transactions in the ledger, ordered by date, archives left out."""
+        transactions = {t["id"]: t for t in self._live_transactions()}
+        groups = []
+        for ids in self.get_duplicate_index().groups():
+            # Occurrences beyond the current expansion horizon are left out
+            group = [transactions[transaction_id] for transaction_id in ids if transaction_id in transactions]
+            if len(group) > 1:
+                groups.append(group)
+        return groups
+
+    def get_categorizer(self) -> 'Categorizer':
+        """Tag suggestions learned from the transactions, built on first use and kept current by _commit."""
+        if self._categorizer is None:
+            from finman.logic.categorizer import Categorizer
+            self._categorizer = Categorizer(self._live_transactions())
+        return self._categorizer
+
+    def suggest_category(self, description: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(tag id, subtag id) transactions with a similar description were booked under, or None."""
+        return self.get_categorizer().suggest(description)
+
+    def categorize_transactions(self, transactions: List[Dict]) -> List[Dict]:
+        """Fill in tagId and subtagId of transactions without a tag, in place.
+
+        Returns the transactions no tag could be suggested for.
+        """
+        categorizer = self.get_categorizer()
+        untagged = []
+        for transaction in transactions:
+            if transaction.get("tagId"):
+                continue
+            category = categorizer.suggest(transaction["description"])
+            if category is None:
+                untagged.append(transaction)
+            else:
+                transaction["tagId"], transaction["subtagId"] = category
+        return untagged
+
+    def get_reference_index(self) -> 'ReferenceIndex':
+        """Transactions per period and tag, built on first use and kept current by _commit."""
+        if self._reference_index is None:
+            from finman.logic.integrity import ReferenceIndex
+            self._reference_index = ReferenceIndex(self.data["transactions"])
+        return self._reference_index
+
+    def count_references(self, year: int, month: int, tag_id: str, subtag_id: Optional[str] = "*") -> int:
+        """Stored transactions of a period booked under a tag, subtag_id "*" includes its subtags."""
+        return self.get_reference_index().references((year, month), tag_id, subtag_id)
+
+    def find_orphans(self) -> List[Dict]:
+        """Transactions booked under a tag or subtag their period's budget does not have.
+
+        One entry per period, tag and subtag: {"year", "month", "tagId",
+        "subtagId", "count"}. Compares the reference counts with the budgets,
+        so it does not read the transactions once the index is built.
+        """
+        return self.get_reference_index().orphans(self._resolved_budgets())
+
+    def get_spend_total(self, start: Tuple[int, int, int], end: Tuple[int, int, int],
+                        tag_id: str = "*", subtag_id: Optional[str] = "*") -> float:
+        """Spending between two (year, month, day) dates, both inclusive, in O(log n).
+
+        tag_id and subtag_id default to "*", matching every tag or subtag. A
+        subtag_id of None only counts transactions booked on the tag itself.
+        """
+        return self.get_spend_index().range_total(start, end, tag_id, subtag_id)
+
+    # Archives
+    #
+    # Closed years can be moved out of the ledger into a compressed file next
+    # to it. The ledger keeps a summary of their spending per day, tag and
+    # subtag, which is all the totals need, so their transactions are only
+    # decompressed when a list of them is asked for.
+
+    def get_archives(self) -> List[Dict]:
+        """Archived years: {"year", "file", "format", "count", "totals"}, sorted by year."""
+        return self.data["archives"]
+
+    def is_archived(self, year: int) -> bool:
+        return self._get_archive(year) is not None
+
+    def has_unloaded_archives(self) -> bool:
+        """True while get_all_transactions would still have to decompress an archive."""
+        return any(archive["year"] not in self._archive_cache for archive in self.data["archives"])
+
+    def get_archived_totals(self, year: int, month: int) -> Dict[Tuple[str, Optional[str]], float]:
+        """Spending per (tag id, subtag id) of the archived transactions of a period, from the summary.
+
+        Empty for a year that is not archived. Transactions added to the
+        period after archiving and recurring occurrences are not included,
+        see get_transactions_by_date with include_archived=False for those.
+        """
+        archive = self._get_archive(year)
+        if archive is None:
+            return {}
+        totals: Dict[Tuple[str, Optional[str]], float] = {}
+        for row in archive["totals"]:
+            if row[0] == month:
+                key = (row[-3], row[-2])
+                totals[key] = totals.get(key, 0.0) + row[-1]
+        return totals
+
+    def get_archivable_years(self) -> List[int]:
+        """Closed years that still have transactions stored in the ledger."""
+        current_year = date.today().year
+        return sorted({t["year"] for t in self.data["transactions"] if t["year"] < current_year})
+
+    @_locked
+    def archive_year(self, year: int, fmt: str = "gzip") -> int:
+        """Move the stored transactions of a closed year to a compressed archive file.
+
+        Archiving a year again adds the transactions stored for it since,
+        and rewrites the file in fmt. Recurring occurrences are not stored,
+        they keep being expanded from their rule. Returns the number of
+        transactions in the archive, 0 if the year has none.
+        """
+        from finman.logic.archive import ARCHIVE_FORMATS, archive_file_name, summarize_year, write_archive
+        if year >= date.today().year:
+            raise ValueError(f"{year} is not closed yet, only earlier years can be archived")
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format '{fmt}'")
+
+        previous = self._get_archive(year)
+        transactions = [t for t in self.data["transactions"] if t["year"] == year]
+        if previous is not None:
+            transactions = self._load_archive(previous) + transactions
+        if not transactions:
+            return 0
+
+        # The archive is complete on disk before the ledger stops holding its transactions
+        name = archive_file_name(self.file_path, year, fmt)
+        write_archive(self._archive_path(name), fmt, transactions)
+        archive = {"year": year, "file": name, "format": fmt, "count": len(transactions),
+                   "totals": summarize_year(transactions)}
+        self.data["transactions"] = [t for t in self.data["transactions"] if t["year"] != year]
+        self.data["archives"] = sorted([a for a in self.data["archives"] if a["year"] != year] + [archive],
+                                       key=lambda a: a["year"])
+        self._archive_cache[year] = transactions
+        self._commit_archives(ChangeKind.YEAR_ARCHIVED, archive)
+        if previous is not None and previous["file"] != name:
+            self._remove_archive_file(previous["file"])
+        return len(transactions)
+
+    @_locked
+    def restore_year(self, year: int) -> int:
+        """Move the transactions of an archived year back into the ledger and delete its archive.
+
+        Returns the number of transactions restored.
+        """
+        archive = self._get_archive(year)
+        if archive is None:
+            raise ValueError(f"{year} is not archived")
+        transactions = self._load_archive(archive)
+        self.data["transactions"].extend(transactions)
+        self.data["archives"] = [a for a in self.data["archives"] if a["year"] != year]
+        del self._archive_cache[year]
+        # The ledger holds the transactions again before the archive goes
+        self._commit_archives(ChangeKind.YEAR_RESTORED, archive)
+        self._remove_archive_file(archive["file"])
+        return len(transactions)
+
+    def _commit_archives(self, kind: ChangeKind, archive: Dict) -> None:
+        """Persist a change to the archives and notify subscribers with one event for the year.
+
+        The derived indexes are rebuilt on next use and the undo history is
+        dropped, its states may refer to transactions that moved.
+        """
+        self.history = History()
+        self._deltas = []
+        self._commit_events([ChangeEvent(kind, 0, (archive["year"], 1), archive)])
+
+    def _get_archive(self, year: int) -> Optional[Dict]:
+        for archive in self.data["archives"]:
+            if archive["year"] == year:
+                return archive
+        return None
+
+    def _daily_archive(self, archive: Dict) -> Dict:
+        """The archive entry with its summary per day, summarized again from its file if older.
+
+        Summaries per month cannot answer totals over part of a month. The
+        new summary is written with the next save of the ledger.
+        """
+        from finman.logic.archive import is_daily_summary, summarize_year
+        if not is_daily_summary(archive):
+            archive["totals"] = summarize_year(self._load_archive(archive))
+        return archive
+
+    def _archive_path(self, file_name: str) -> str:
+        """Archive files are stored next to the ledger, which only records their names."""
+        return os.path.join(os.path.dirname(os.path.abspath(self.file_path)), file_name)
+
+    def _load_archive(self, archive: Dict) -> List[Dict]:
+        """Transactions of an archived year, decompressed once per session."""
+        with FinancialData._lock:
+            if archive["year"] not in self._archive_cache:
+                from finman.logic.archive import read_archive
+                self._archive_cache[archive["year"]] = read_archive(self._archive_path(archive["file"]),
+                                                                    archive["format"])
+            return self._archive_cache[archive["year"]]
+
+    def _remove_archive_file(self, file_name: str) -> None:
+        try:
+            os.remove(self._archive_path(file_name))
+        except OSError:
+            pass
+
+    def _check_not_archived(self, transaction_id: str) -> None:
+        """Raise for the id of an archived transaction, archived years are read-only.
+
+        Only called for ids missing from the ledger, so decompressing the
+        archives not loaded yet is only paid for on that path.
+        """
+        for archive in self.data["archives"]:
+            if any(t["id"] == transaction_id for t in self._load_archive(archive)):
+                raise ValueError(f"{archive['year']} is archived, restore it to change transaction '{transaction_id}'")
+
     def get_transactions_by_tag(self, tag_id: str, subtag_id: Optional[str] = None) -> List[Dict]:
         """Get transactions filtered by tag."""
         transactions = [t for t in self.data["transactions"] if t["tagId"] == tag_id]
@@ -277,11 +1473,8 @@ class FinancialData:
 
     # Helper methods
     def _get_budget(self, year: int, month: int) -> Optional[Dict]:
-        """Helper method to find a budget."""
-        for budget in self.data["budgets"]:
-            if budget["year"] == year and budget["month"] == month:
-                return budget
-        return None
+        """Helper method to find a resolved budget, mutators write it back with _store_budget."""
+        return self._resolved_budgets().get((year, month))
 
     def _get_tag(self, budget: Dict, tag_id: str) -> Optional[Dict]:
         """Helper method to find a tag in a budget."""
@@ -298,8 +1491,24 @@ class FinancialData:
         return None
 
     def _get_transaction(self, transaction_id: str) -> Optional[Dict]:
-        """Helper method to find a transaction by ID."""
+        """Helper method to find a transaction or recurring occurrence by ID."""
         for transaction in self.data["transactions"]:
             if transaction["id"] == transaction_id:
                 return transaction
+
+        # Occurrence ids are "<rule id>@<YYYY-MM-DD>"
+        occurrence = split_occurrence_id(transaction_id)
+        if occurrence is None:
+            return None
+        rule = self._get_rule(occurrence[0])
+        if rule is None:
+            return None
+        occurrences = expand_rule(rule, occurrence[1], occurrence[1])
+        return occurrences[0] if occurrences else None
+
+    def _get_rule(self, rule_id: str) -> Optional[Dict]:
+        """Helper method to find a recurring rule by ID."""
+        for rule in self.data["recurring"]:
+            if rule["id"] == rule_id:
+                return rule
         return None
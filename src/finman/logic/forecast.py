@@ -0,0 +1,62 @@
+import calendar
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from finman.logic.financial_data import FinancialData
+from finman.logic.spend_index import ALL
+
+# Earlier years of the same month the projection learns from
+HISTORY_YEARS = 3
+
+
+def elapsed_days(year: int, month: int, today: Optional[date] = None) -> int:
+    """Days of a period that have passed, 0 for a future period."""
+    today = today or date.today()
+    if (year, month) < (today.year, today.month):
+        return calendar.monthrange(year, month)[1]
+    if (year, month) > (today.year, today.month):
+        return 0
+    return today.day
+
+
+def project_period(findata: FinancialData, year: int, month: int,
+                   keys: Iterable[Tuple[str, Optional[str]]],
+                   today: Optional[date] = None) -> Dict[Tuple[str, Optional[str]], float]:
+    """End of period spending per (tag id, subtag id) key, empty once the period is over.
+
+    The spending still to come is estimated twice: from this month's daily
+    burn rate so far, and from what was spent after the same day of the month
+    in earlier years. The burn rate weighs more as the month goes on.
+    Transactions already booked for later days, like recurring ones, are a
+    lower bound. Every figure is a range total of the spend index, which
+    keeps spending aggregated per day, so projecting a key costs a few
+    prefix sums regardless of how many transactions it has.
+    """
+    days = calendar.monthrange(year, month)[1]
+    elapsed = elapsed_days(year, month, today)
+    if elapsed >= days:
+        return {}
+
+    index = findata.get_spend_index()
+    # Ledger days are not checked against month lengths, day 31 covers them all
+    month_end = (year, month, 31)
+    # Only years with any spending in the month tell something about it
+    history_years = [y for y in range(year - HISTORY_YEARS, year)
+                     if index.range_total((y, month, 1), (y, month, 31), ALL, ALL) > 0]
+    weight = elapsed / days
+
+    projections = {}
+    for tag_id, subtag_id in keys:
+        to_date = index.range_total((year, month, 1), (year, month, elapsed), tag_id, subtag_id) if elapsed else 0.0
+        booked = index.range_total((year, month, elapsed + 1), month_end, tag_id, subtag_id)
+        estimates = []
+        if elapsed:
+            estimates.append((weight, to_date / elapsed * (days - elapsed)))
+        if history_years:
+            later = sum(index.range_total((y, month, elapsed + 1), (y, month, 31), tag_id, subtag_id)
+                        for y in history_years)
+            estimates.append((1 - weight, later / len(history_years)))
+        total_weight = sum(w for w, _ in estimates)
+        remaining = sum(w * e for w, e in estimates) / total_weight if total_weight else 0.0
+        projections[(tag_id, subtag_id)] = to_date + max(remaining, booked)
+    return projections
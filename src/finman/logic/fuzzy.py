@@ -0,0 +1,98 @@
+import re
+from collections import Counter
+from typing import Dict, List, Set, Tuple
+
+# Search modes the Overview and Transactions scenes cycle through
+SEARCH_MODES = ["exact", "fuzzy"]
+# Dice coefficient of trigrams a word needs to match a query token. "grocey"
+# matches "grocery" with 0.67, unrelated words of similar length stay below 0.3
+MIN_SIMILARITY = 0.5
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def trigrams(word: str) -> Set[str]:
+    """Trigrams of a word padded like "  word ", so its start weighs more than its end."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Fuzzy word search over a list of texts, ranked by trigram similarity.
+
+    Trigrams map to the distinct words containing them and words map to the
+    texts containing them. A query token is only compared against words that
+    share a trigram with it, so the cost depends on the vocabulary, which
+    stays small, rather than on the number of texts.
+    """
+
+    def __init__(self, texts: List[str]):
+        self.documents: Dict[str, List[int]] = {}  # Word to the ids (positions) of texts containing it
+        self.trigram_counts: Dict[str, int] = {}
+        self.postings: Dict[str, List[str]] = {}  # Trigram to the words containing it
+        for doc_id, text in enumerate(texts):
+            self.add(doc_id, text)
+
+    def add(self, doc_id: int, text: str) -> None:
+        for word in set(tokenize(text)):
+            documents = self.documents.get(word)
+            if documents is None:
+                documents = self.documents[word] = []
+                grams = trigrams(word)
+                self.trigram_counts[word] = len(grams)
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append(word)
+            documents.append(doc_id)
+
+    def similar_words(self, token: str, min_similarity: float = MIN_SIMILARITY) -> Dict[str, float]:
+        """Words of the index resembling token, with their similarity from 0 to 1.
+
+        A word containing the token counts as a full match, so results do not
+        drop out while a word is still being typed.
+        """
+        grams = trigrams(token)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        similar = {}
+        for word, count in shared.items():
+            similarity = 1.0 if token in word else 2 * count / (len(grams) + self.trigram_counts[word])
+            if similarity >= min_similarity:
+                similar[word] = similarity
+        if len(token) < 3:
+            # Too short to share a trigram with every word containing it, like "oc" in "grocery"
+            for word in self.documents:
+                if token in word:
+                    similar[word] = 1.0
+        return similar
+
+    def search(self, query: str, min_similarity: float = MIN_SIMILARITY) -> List[Tuple[int, float]]:
+        """(text id, score) of texts matching every token of query, best first.
+
+        A text scores the average similarity of its best word for each token.
+        """
+        tokens = tokenize(query)
+        scores = None
+        for token in tokens:
+            best = {}
+            for word, similarity in self.similar_words(token, min_similarity).items():
+                for doc_id in self.documents[word]:
+                    if similarity > best.get(doc_id, 0.0):
+                        best[doc_id] = similarity
+            if scores is None:
+                scores = best
+            else:
+                scores = {doc_id: scores[doc_id] + similarity for doc_id, similarity in best.items()
+                          if doc_id in scores}
+            if not scores:
+                return []
+
+        if not scores:
+            return []
+        return sorted(((doc_id, total / len(tokens)) for doc_id, total in scores.items()),
+                      key=lambda match: (-match[1], match[0]))
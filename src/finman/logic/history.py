@@ -0,0 +1,52 @@
+from collections import deque
+from typing import Any, List, Optional, Tuple
+
+# Changes kept for undo, the oldest are dropped beyond this
+HISTORY_LIMIT = 1000
+
+# (entity, key, state before, state after) of one ledger entity, where the
+# entity is "transaction" (keyed by id), "rule" (by id), "budget" (by
+# (year, month), its state being the period's tag tree) or "tag" (by (year,
+# month, tag id), its state being the tag's position and the tag with its
+# subtags). A state of None means the entity did not exist
+Delta = Tuple[str, Any, Optional[Any], Optional[Any]]
+
+
+class History:
+    """Undo and redo stacks of FinancialData changes.
+
+    Each entry is the list of deltas a single mutation made, usually one, so
+    memory grows with the size of the edited entities rather than with the
+    size of the ledger.
+    """
+
+    def __init__(self, limit: int = HISTORY_LIMIT):
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = deque(maxlen=limit)
+
+    def record(self, deltas: List[Delta]) -> None:
+        """Add a new change, which makes everything undone so far unreachable."""
+        self.undo_stack.append(deltas)
+        self.redo_stack.clear()
+
+    def take_undo(self) -> Optional[List[Delta]]:
+        """Deltas of the latest change, moved to the redo stack."""
+        if not self.undo_stack:
+            return None
+        deltas = self.undo_stack.pop()
+        self.redo_stack.append(deltas)
+        return deltas
+
+    def take_redo(self) -> Optional[List[Delta]]:
+        """Deltas of the latest undone change, moved back to the undo stack."""
+        if not self.redo_stack:
+            return None
+        deltas = self.redo_stack.pop()
+        self.undo_stack.append(deltas)
+        return deltas
+
+    def can_undo(self) -> bool:
+        return bool(self.undo_stack)
+
+    def can_redo(self) -> bool:
+        return bool(self.redo_stack)
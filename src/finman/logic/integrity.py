@@ -0,0 +1,71 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from finman.logic.financial_data import ChangeEvent, ChangeKind
+from finman.logic.spend_index import ALL
+
+
+class ReferenceIndex:
+    """Number of stored transactions per period booked under each (tag, subtag).
+
+    Validating the ledger compares these counts with the budgets instead of
+    every transaction, and telling how many transactions a removed tag
+    orphans only looks at its own period. Recurring occurrences are left out,
+    they follow their rule's tag and are not stored.
+    """
+
+    def __init__(self, transactions: Iterable[Dict] = ()):
+        self.counts: Dict[Tuple[int, int], Counter] = {}
+        for transaction in transactions:
+            self.add(transaction)
+
+    def _count(self, transaction: Dict, delta: int) -> None:
+        if "recurring" in transaction:
+            return
+        period = (transaction["year"], transaction["month"])
+        key = (transaction["tagId"], transaction.get("subtagId") or None)
+        counts = self.counts.setdefault(period, Counter())
+        counts[key] += delta
+        if counts[key] <= 0:
+            del counts[key]
+            if not counts:
+                del self.counts[period]
+
+    def add(self, transaction: Dict) -> None:
+        self._count(transaction, 1)
+
+    def remove(self, transaction: Dict) -> None:
+        self._count(transaction, -1)
+
+    def apply(self, event: ChangeEvent) -> None:
+        """Update the counts for a FinancialData change."""
+        if event.kind == ChangeKind.TRANSACTION_ADDED:
+            self.add(event.item)
+        elif event.kind == ChangeKind.TRANSACTION_REMOVED:
+            self.remove(event.item)
+        elif event.kind == ChangeKind.TRANSACTION_EDITED:
+            self.remove(event.previous)
+            self.add(event.item)
+
+    def references(self, period: Tuple[int, int], tag_id: str, subtag_id: Optional[str] = ALL) -> int:
+        """Transactions of a period booked under a tag, subtag_id ALL includes its subtags."""
+        return sum(count for (tag, subtag), count in self.counts.get(period, {}).items()
+                   if tag == tag_id and (subtag_id == ALL or subtag == subtag_id))
+
+    def orphans(self, budgets: Dict[Tuple[int, int], Dict]) -> List[Dict]:
+        """References to tags or subtags missing from their period's budget.
+
+        Periods without a budget are not checked, none of their spending is
+        budgeted in the first place.
+        """
+        orphans = []
+        for period in sorted(self.counts):
+            budget = budgets.get(period)
+            if budget is None:
+                continue
+            tags = {tag["id"]: {subtag["id"] for subtag in tag.get("subTags", [])} for tag in budget["tags"]}
+            for (tag_id, subtag_id), count in sorted(self.counts[period].items(), key=lambda item: (item[0][0], item[0][1] or "")):
+                if tag_id not in tags or (subtag_id is not None and subtag_id not in tags[tag_id]):
+                    orphans.append({"year": period[0], "month": period[1], "tagId": tag_id,
+                                    "subtagId": subtag_id, "count": count})
+        return orphans
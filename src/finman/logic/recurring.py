@@ -0,0 +1,97 @@
+import calendar
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Schedules a recurring rule can repeat on, "never" is only used by the editor
+SCHEDULES = ["weekly", "monthly", "yearly"]
+# Separates the rule id from the date in the id of an expanded occurrence
+OCCURRENCE_SEPARATOR = "@"
+
+
+def parse_date(text: str) -> date:
+    """Parse a YYYY-MM-DD date string."""
+    try:
+        year, month, day = (int(part) for part in text.split("-"))
+        return date(year, month, day)
+    except ValueError:
+        raise ValueError(f"Date '{text}' must be a valid YYYY-MM-DD date")
+
+
+def occurrence_id(rule_id: str, when: date) -> str:
+    return f"{rule_id}{OCCURRENCE_SEPARATOR}{when.isoformat()}"
+
+
+def split_occurrence_id(transaction_id: str) -> Optional[Tuple[str, date]]:
+    """(rule id, date) of an occurrence id, None for any other transaction id."""
+    rule_id, separator, when = transaction_id.rpartition(OCCURRENCE_SEPARATOR)
+    if not separator or not rule_id:
+        return None
+    try:
+        return rule_id, parse_date(when)
+    except ValueError:
+        return None
+
+
+def _nth_date(rule: Dict, start: date, n: int) -> date:
+    """Date of the nth occurrence of a rule, counting from 0 at its start."""
+    interval = rule.get("interval", 1)
+    if rule["schedule"] == "weekly":
+        return start + timedelta(weeks=n * interval)
+
+    months = n * interval * (12 if rule["schedule"] == "yearly" else 1)
+    year, month = divmod(start.month - 1 + months, 12)
+    year, month = start.year + year, month + 1
+    # A rule starting on the 31st falls on the last day of shorter months
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def _first_index(rule: Dict, start: date, first: date) -> int:
+    """Index of the first occurrence that could fall on or after first."""
+    if first <= start:
+        return 0
+    interval = rule.get("interval", 1)
+    if rule["schedule"] == "weekly":
+        return (first - start).days // (7 * interval)
+    months = (first.year - start.year) * 12 + first.month - start.month
+    if rule["schedule"] == "yearly":
+        months //= 12
+    # One early is fine, occurrences before first are skipped by the caller
+    return max(months // interval - 1, 0)
+
+
+def expand_rule(rule: Dict, first: date, last: date) -> List[Dict]:
+    """Occurrences of a rule between first and last (inclusive) as transaction dicts.
+
+    Only the requested range is generated, dates listed in the rule's
+    "skipped" were removed or materialized as real transactions.
+    """
+    start = parse_date(rule["start"])
+    if rule.get("end"):
+        last = min(last, parse_date(rule["end"]))
+    skipped = set(rule.get("skipped", []))
+
+    occurrences = []
+    n = _first_index(rule, start, first)
+    while True:
+        when = _nth_date(rule, start, n)
+        if when > last:
+            break
+        if when >= first and when.isoformat() not in skipped:
+            occurrences.append(make_occurrence(rule, when))
+        n += 1
+    return occurrences
+
+
+def make_occurrence(rule: Dict, when: date) -> Dict:
+    """Transaction dict for a rule's occurrence on a date."""
+    return {
+        "id": occurrence_id(rule["id"], when),
+        "year": when.year,
+        "month": when.month,
+        "day": when.day,
+        "amount": rule["amount"],
+        "description": rule["description"],
+        "tagId": rule["tagId"],
+        "subtagId": rule.get("subtagId"),
+        "recurring": rule["id"]
+    }
@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from typing import Dict, List, Optional, Tuple
+
+from finman.logic.financial_data import FinancialData
+
+REPORT_FORMATS = ["text", "csv", "json"]
+REPORT_FIELDS = ["period", "type", "tagId", "subtagId", "name", "spent", "maxAmount", "percentage"]
+
+
+def parse_period(text: str) -> Tuple[int, int]:
+    """Parse a YYYY-MM period string."""
+    try:
+        year, month = text.split("-")
+        year, month = int(year), int(month)
+    except ValueError:
+        raise ValueError(f"Period '{text}' must be in YYYY-MM format")
+    if month < 1 or month > 12:
+        raise ValueError(f"Period '{text}' has a month outside 1-12")
+    return year, month
+
+
+def select_periods(findata: FinancialData, start: Optional[Tuple[int, int]] = None,
+                   end: Optional[Tuple[int, int]] = None) -> List[Tuple[int, int]]:
+    """Budget periods between start and end (inclusive), all periods if neither is given."""
+    from finman.logic.usage import get_budget_periods
+    return [
+        period for period in get_budget_periods(findata)
+        if (start is None or period >= start) and (end is None or period <= end)
+    ]
+
+
+def build_report(findata: FinancialData, periods: List[Tuple[int, int]]) -> List[Dict]:
+    """Budget usage rows for each period, tags sorted by name with their subtags after them."""
+    from finman.logic.usage import get_usage_groups
+    rows = []
+    for year, month in periods:
+        tag_groups = sorted(get_usage_groups(findata, year, month), key=lambda g: g[0]["name"].lower())
+        for tag_item, subtag_items in tag_groups:
+            for item in [tag_item] + subtag_items:
+                rows.append({
+                    "period": f"{year}-{month:02d}",
+                    "type": item["type"],
+                    "tagId": item["parent_id"] or item["id"],
+                    "subtagId": item["id"] if item["type"] == "subtag" else None,
+                    "name": item["name"],
+                    "spent": round(item["spent"], 2),
+                    "maxAmount": item["maxAmount"],
+                    "percentage": round(item["percentage"], 1)
+                })
+    return rows
+
+
+def format_text(rows: List[Dict]) -> str:
+    """Human readable report, one block per period like the Overview."""
+    lines = []
+    current_period = None
+    for row in rows:
+        if row["period"] != current_period:
+            if current_period is not None:
+                lines.append("")
+            current_period = row["period"]
+            lines.append(f"Period: {current_period}")
+
+        prefix = "  └─ " if row["type"] == "subtag" else ""
+        item_id = f"[{row['subtagId'] or row['tagId']}]"
+        name = f"{prefix}{row['name']}"
+        lines.append(f"{item_id:<15} | {name:<25} | ${row['spent']:>8.2f} / ${row['maxAmount']:>8.2f} "
+                     f"{row['percentage']:>5.1f}%")
+    return "\n".join(lines) + "\n" if lines else "No budgets in the selected periods\n"
+
+
+def format_csv(rows: List[Dict]) -> str:
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=REPORT_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+def format_json(rows: List[Dict]) -> str:
+    return json.dumps(rows, indent=2) + "\n"
+
+
+def format_report(rows: List[Dict], fmt: str) -> str:
+    """Format report rows as text, csv or json."""
+    if fmt == "csv":
+        return format_csv(rows)
+    elif fmt == "json":
+        return format_json(rows)
+    return format_text(rows)
@@ -0,0 +1,146 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from finman.logic.financial_data import ChangeEvent, ChangeKind
+
+# Matches any tag or subtag in SpendIndex keys and queries. A subtag id of
+# None only matches spending booked on the parent tag itself
+ALL = "*"
+
+
+def day_ordinal(year: int, month: int, day: int) -> int:
+    """Position of a date on a calendar where every month has 31 days.
+
+    Ledger days are not validated against month lengths, so a fixed grid
+    keeps every stored date ordered without rejecting a 2025-02-30.
+    """
+    return year * 372 + (month - 1) * 31 + (day - 1)
+
+
+class FenwickTree:
+    """Binary indexed tree of floats with point updates and prefix sums."""
+
+    def __init__(self, values: Optional[List[float]] = None):
+        values = values or []
+        self.tree = [0.0] + list(values)
+        # Linear time construction: push each node's sum to its parent
+        for i in range(1, len(self.tree)):
+            parent = i + (i & -i)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[i]
+
+    def __len__(self) -> int:
+        return len(self.tree) - 1
+
+    def add(self, index: int, delta: float) -> None:
+        """Add delta to the value at a 0-based index."""
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count: int) -> float:
+        """Sum of the first count values."""
+        total = 0.0
+        i = min(count, len(self.tree) - 1)
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def grow(self, size: int) -> None:
+        """Extend with zero values up to size, keeping existing sums."""
+        for i in range(len(self.tree), size + 1):
+            # A new node covers (i - lowbit(i), i], all of it already stored except i itself
+            self.tree.append(self.prefix(i - 1) - self.prefix(i - (i & -i)))
+
+
+class SpendIndex:
+    """Cumulative spending per (tag, subtag) over day ordinals.
+
+    Every transaction is counted under its exact (tag, subtag) key, under
+    (tag, ALL) and under (ALL, ALL), so totals for a subtag, a tag with all
+    its subtags, or the whole ledger are each a pair of prefix sums.
+    """
+
+    def __init__(self, transactions: Iterable[Dict] = ()):
+        transactions = list(transactions)
+        self.base = min((self._ordinal(t) for t in transactions), default=0)
+        self.size = 0
+        self.trees: Dict[Tuple[str, Optional[str]], FenwickTree] = {}
+        self._build(transactions)
+
+    @staticmethod
+    def _ordinal(transaction: Dict) -> int:
+        return day_ordinal(transaction["year"], transaction["month"], transaction["day"])
+
+    @staticmethod
+    def _keys(transaction: Dict) -> List[Tuple[str, Optional[str]]]:
+        tag_id = transaction["tagId"]
+        return [(tag_id, transaction.get("subtagId") or None), (tag_id, ALL), (ALL, ALL)]
+
+    def _build(self, transactions: List[Dict]) -> None:
+        """Rebuild every tree from scratch over transactions."""
+        self.size = max((self._ordinal(t) - self.base + 1 for t in transactions), default=0)
+        values = {}
+        for transaction in transactions:
+            position = self._ordinal(transaction) - self.base
+            for key in self._keys(transaction):
+                if key not in values:
+                    values[key] = [0.0] * self.size
+                values[key][position] += transaction["amount"]
+        self.trees = {key: FenwickTree(key_values) for key, key_values in values.items()}
+
+    def add(self, transaction: Dict, sign: int = 1) -> None:
+        """Count a transaction's amount, or remove it again with sign=-1."""
+        ordinal = self._ordinal(transaction)
+        if not self.trees:
+            # Nothing indexed yet, start the range at this transaction
+            self.base, self.size = ordinal, 0
+        elif ordinal < self.base:
+            self._rebase(ordinal)
+        position = ordinal - self.base
+        if position >= self.size:
+            # Grow geometrically so appending day after day stays amortized O(log n)
+            self.size = max(position + 1, self.size * 2)
+            for tree in self.trees.values():
+                tree.grow(self.size)
+
+        for key in self._keys(transaction):
+            tree = self.trees.get(key)
+            if tree is None:
+                tree = self.trees[key] = FenwickTree([0.0] * self.size)
+            tree.add(position, sign * transaction["amount"])
+
+    def _rebase(self, ordinal: int) -> None:
+        """Move the start of the range back to ordinal, shifting every tree."""
+        shift = self.base - ordinal
+        for key, tree in self.trees.items():
+            values = [tree.prefix(i + 1) - tree.prefix(i) for i in range(len(tree))]
+            self.trees[key] = FenwickTree([0.0] * shift + values)
+        self.base = ordinal
+        self.size += shift
+
+    def apply(self, event: ChangeEvent) -> None:
+        """Update the index for a FinancialData change."""
+        if event.kind == ChangeKind.TRANSACTION_ADDED:
+            self.add(event.item)
+        elif event.kind == ChangeKind.TRANSACTION_REMOVED:
+            self.add(event.item, -1)
+        elif event.kind == ChangeKind.TRANSACTION_EDITED:
+            self.add(event.previous, -1)
+            self.add(event.item)
+
+    def range_total(self, start: Tuple[int, int, int], end: Tuple[int, int, int],
+                    tag_id: str = ALL, subtag_id: Optional[str] = ALL) -> float:
+        """Spending between two (year, month, day) dates, both inclusive."""
+        tree = self.trees.get((tag_id, subtag_id))
+        if tree is None:
+            return 0.0
+        first = max(day_ordinal(*start) - self.base, 0)
+        last = day_ordinal(*end) - self.base
+        if last < first:
+            return 0.0
+        return tree.prefix(last + 1) - tree.prefix(first)
+
+    def node_count(self) -> int:
+        return len(self.trees) * self.size
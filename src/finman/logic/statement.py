@@ -0,0 +1,49 @@
+import csv
+import io
+from typing import Dict, Iterable, List
+
+from finman.logic.recurring import parse_date
+
+# Columns of an imported statement, tag and subtag may be left empty or out
+STATEMENT_FIELDS = ["date", "amount", "description", "tag", "subtag"]
+
+
+def parse_statement(text: str, existing_ids: Iterable[str]) -> List[Dict]:
+    """Transactions of a CSV statement with STATEMENT_FIELDS columns and a header row.
+
+    New ids are numbered "imp_001", "imp_002", ... skipping existing_ids.
+    Rows without a tag get an empty tagId, see FinancialData.categorize_transactions.
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [field for field in STATEMENT_FIELDS[:3] if field not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Statement is missing the column(s): {', '.join(missing)}")
+
+    taken = set(existing_ids)
+    counter = 0
+    transactions = []
+    for line_number, row in enumerate(reader, start=2):
+        # Short rows leave the missing columns as None
+        row = {field: (row.get(field) or "").strip() for field in STATEMENT_FIELDS}
+        try:
+            day = parse_date(row["date"])
+            amount = float(row["amount"])
+        except ValueError:
+            raise ValueError(f"Line {line_number}: date must be YYYY-MM-DD and amount a number")
+        if not row["description"]:
+            raise ValueError(f"Line {line_number}: description is required")
+
+        counter += 1
+        while f"imp_{counter:03d}" in taken:
+            counter += 1
+        transactions.append({
+            "id": f"imp_{counter:03d}",
+            "year": day.year,
+            "month": day.month,
+            "day": day.day,
+            "amount": amount,
+            "description": row["description"],
+            "tagId": row["tag"],
+            "subtagId": row["subtag"] or None
+        })
+    return transactions
@@ -0,0 +1,134 @@
+from typing import Dict, List, Optional, Tuple
+from finman.logic.fuzzy import TrigramIndex
+
+# Sort modes shown in the Transactions scene, indexed by sort_transactions
+SORT_OPTIONS = ["Date-Ascending", "Date-Descending", "Quan-Ascending", "Quan-Descending"]
+
+# Months the Transactions scene shows at first, and adds each time the list
+# is scrolled past its oldest transaction
+WINDOW_MONTHS = 3
+
+
+def shift_period(period: Tuple[int, int], months: int) -> Tuple[int, int]:
+    """(year, month) a number of months after period, before it when negative."""
+    index = period[0] * 12 + period[1] - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def sort_transactions(transactions: List[Dict], sort_selected: int) -> List[Dict]:
+    """Return transactions sorted by one of SORT_OPTIONS."""
+    if sort_selected == 0:  # Date-Ascending
+        return sorted(transactions, key=lambda t: (t['year'], t['month'], t['day']))
+    elif sort_selected == 1:  # Date-Descending
+        return sorted(transactions, key=lambda t: (t['year'], t['month'], t['day']), reverse=True)
+    elif sort_selected == 2:  # Quan-Ascending
+        return sorted(transactions, key=lambda t: t['amount'])
+    elif sort_selected == 3:  # Quan-Descending
+        return sorted(transactions, key=lambda t: t['amount'], reverse=True)
+
+    return transactions
+
+
+def format_transaction(transaction: Dict) -> str:
+    """Format a transaction for display."""
+    date = f"{transaction['year']}-{transaction['month']:02d}-{transaction['day']:02d}"
+    amount = f"${transaction['amount']:.2f}"
+    description = transaction['description']
+    tag = transaction.get('tagId', '')
+    subtag = transaction.get('subtagId', '')
+
+    # Format tags
+    if subtag:
+        tags = f"#{tag}/{subtag}"
+    else:
+        tags = f"#{tag}"
+
+    # Mark occurrences generated by a recurring rule
+    if transaction.get('recurring'):
+        tags += " ↻"
+
+    return f"{date} | {amount:>10} | {description} {tags}"
+
+
+def filter_transactions(transactions: List[Dict], search_text: str) -> List[Dict]:
+    """Filter transactions by description, date or amount, or by tag with #tag[/subtag]."""
+    if not search_text:
+        return transactions
+
+    search_lower = search_text.lower()
+    filtered = []
+
+    # Check if searching by tag (#tag or #tag/subtag)
+    if search_lower.startswith('#'):
+        tag_search = search_lower[1:]  # Remove the #
+
+        for transaction in transactions:
+            tag = transaction.get('tagId', '').lower()
+            subtag = transaction.get('subtagId', '').lower() if transaction.get('subtagId') else ''
+
+            # Check if matches tag or tag/subtag format
+            if '/' in tag_search:
+                # Searching for specific tag/subtag
+                if tag_search == f"{tag}/{subtag}":
+                    filtered.append(transaction)
+            else:
+                # Searching for just tag
+                if tag_search in tag or tag_search in subtag:
+                    filtered.append(transaction)
+        return filtered
+
+    # Regular search (non-tag)
+    for transaction in transactions:
+        # Check if search text appears in description
+        if search_lower in transaction['description'].lower():
+            filtered.append(transaction)
+            continue
+
+        # Check if search text appears in date
+        date = f"{transaction['year']}-{transaction['month']:02d}-{transaction['day']:02d}"
+        if search_lower in date:
+            filtered.append(transaction)
+            continue
+
+        # Check if search text appears in amount
+        amount = f"{transaction['amount']:.2f}"
+        if search_lower in amount:
+            filtered.append(transaction)
+            continue
+
+    return filtered
+
+
+def build_search_index(transactions: List[Dict]) -> TrigramIndex:
+    """Index the description, tag and subtag ids of transactions for fuzzy search."""
+    return TrigramIndex([f"{t['description']} {t.get('tagId', '')} {t.get('subtagId') or ''}"
+                         for t in transactions])
+
+
+def fuzzy_filter_transactions(transactions: List[Dict], index: TrigramIndex, search_text: str,
+                              sort_selected: int) -> List[Dict]:
+    """Transactions fuzzily matching search_text, best match first.
+
+    index must have been built from transactions. Equally good matches keep
+    the order of the selected sort.
+    """
+    hits = index.search(search_text)
+    scores = {id(transactions[doc_id]): score for doc_id, score in hits}
+    matches = sort_transactions([transactions[doc_id] for doc_id, _ in hits], sort_selected)
+    matches.sort(key=lambda t: -scores[id(t)])
+    return matches
+
+
+def query_transactions(transactions: List[Dict], sort_selected: int, search_text: str,
+                       index: Optional[TrigramIndex] = None) -> Tuple[List[Dict], List[str]]:
+    """Sort, filter and format transactions for the Transactions scene.
+
+    With an index, built by build_search_index, the search is fuzzy, except
+    for #tag filters which stay exact. Pure, so it can run on a background task
+    over a snapshot of the ledger.
+    """
+    if index is not None and search_text and not search_text.startswith('#'):
+        matches = fuzzy_filter_transactions(transactions, index, search_text, sort_selected)
+    else:
+        matches = filter_transactions(sort_transactions(transactions, sort_selected), search_text)
+    return matches, [format_transaction(t) for t in matches]
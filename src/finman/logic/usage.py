@@ -0,0 +1,70 @@
+from typing import Dict, List, Optional, Tuple
+
+from finman.logic.financial_data import FinancialData
+from finman.logic.forecast import project_period
+
+
+def get_period_spending(findata: FinancialData, year: int,
+                        month: int) -> Dict[Tuple[str, Optional[str]], float]:
+    """Total spending per (tag id, subtag id) in a period, in a single pass.
+
+    Transactions without a subtag are keyed with a subtag id of None, so a
+    parent tag's spending does not include its subtags. An archived period
+    starts from its summary instead of decompressing the archive.
+    """
+    totals = dict(findata.get_archived_totals(year, month))
+    for transaction in findata.get_transactions_by_date(year, month, include_archived=False):
+        key = (transaction["tagId"], transaction.get("subtagId") or None)
+        totals[key] = totals.get(key, 0.0) + transaction["amount"]
+    return totals
+
+
+def _usage_item(item_type: str, year: int, month: int, entry: Dict, spent: float,
+                ytd: float, projected: Optional[float], parent_id: Optional[str]) -> Dict:
+    """Build a tag or subtag usage item as shown in the Overview."""
+    return {
+        "type": item_type,
+        "year": year,
+        "month": month,
+        "id": entry["id"],
+        "name": entry["name"],
+        "maxAmount": entry["maxAmount"],
+        "spent": spent,
+        "ytd": ytd,  # Spending from January up to the end of this period
+        "percentage": (spent / entry["maxAmount"] * 100) if entry["maxAmount"] > 0 else 0,
+        "projected": projected,  # Spending expected by the end of the period, None once it is over
+        "parent_id": parent_id
+    }
+
+
+def get_usage_groups(findata: FinancialData, year: int, month: int) -> List[Tuple[Dict, List[Dict]]]:
+    """Budget usage for a period as (tag_item, subtag_items) groups in budget order."""
+    budget = findata.get_budget(year, month)
+    if not budget:
+        return []
+
+    spending = get_period_spending(findata, year, month)
+    year_start, period_end = (year, 1, 1), (year, month, 31)
+    keys = [(tag["id"], None) for tag in budget.get("tags", [])]
+    keys += [(tag["id"], subtag["id"]) for tag in budget.get("tags", []) for subtag in tag.get("subTags", [])]
+    projections = project_period(findata, year, month, keys)
+    tag_groups = []
+    for tag in budget.get("tags", []):
+        tag_item = _usage_item("tag", year, month, tag, spending.get((tag["id"], None), 0.0),
+                               findata.get_spend_total(year_start, period_end, tag["id"], None),
+                               projections.get((tag["id"], None)), None)
+        subtag_items = [
+            _usage_item("subtag", year, month, subtag,
+                        spending.get((tag["id"], subtag["id"]), 0.0),
+                        findata.get_spend_total(year_start, period_end, tag["id"], subtag["id"]),
+                        projections.get((tag["id"], subtag["id"])), tag["id"])
+            for subtag in tag.get("subTags", [])
+        ]
+        tag_groups.append((tag_item, subtag_items))
+
+    return tag_groups
+
+
+def get_budget_periods(findata: FinancialData) -> List[Tuple[int, int]]:
+    """All (year, month) periods that have a budget, sorted by date."""
+    return findata.get_budget_periods()
@@ -1,29 +1,270 @@
 import curses # imports curses a barebones highly portable tui library
 from finman.ui.main_menu import MainMenu
+from finman.ui.scene import Scene
+from finman.logic.financial_data import FinancialData
+from finman.util.profiler import PROFILER
+from finman.util.tasks import TASKS
 import argparse
+import os
+import sys
+# Only the constants of the subcommands' parsers, their modules are imported where they run
+from finman.logic.report import REPORT_FORMATS
+from finman.logic.statement import STATEMENT_FIELDS
+from finman.logic.archive import ARCHIVE_FORMATS
 
-def main():
+def build_parser():
+    parser = argparse.ArgumentParser(prog="finman", description="Terminal based financial management")
+    parser.add_argument("--file", default="budget_data.json", help="ledger file to open (default: budget_data.json)")
+    parser.add_argument("--ledger", action="append", default=[], metavar="FILE",
+                        help="another ledger for the Consolidated view, may be repeated")
+    parser.add_argument("--profile", action="store_true", help="record frame and save timings, F12 toggles the overlay")
+    parser.add_argument("--pstats", metavar="FILE", help="write a cProfile capture of the session to FILE (implies --profile)")
+    parser.add_argument("--metrics", metavar="FILE", help="append ledger storage stats to FILE as JSON lines")
+    parser.add_argument("--metrics-interval", type=float, default=60.0, metavar="SECONDS",
+                        help="seconds between --metrics records (default: 60)")
+    parser.add_argument("--search-delay", type=int, default=150, metavar="MS",
+                        help="milliseconds of typing pause before a search is evaluated, 0 for every key (default: 150)")
+    parser.add_argument("--record", metavar="FILE", help="write the keys and mouse events of the session to FILE for `finman replay`")
+    subparsers = parser.add_subparsers(dest="command")
+
+    # Headless budget usage report, never initializes curses
+    report = subparsers.add_parser("report", help="print budget usage per tag and subtag without the TUI")
+    report.add_argument("--period", help="single period to report, as YYYY-MM")
+    report.add_argument("--from", dest="start", help="first period of a range, as YYYY-MM")
+    report.add_argument("--to", dest="end", help="last period of a range, as YYYY-MM")
+    report.add_argument("--format", choices=REPORT_FORMATS, default="text", help="output format (default: text)")
+
+    # Bulk import of a CSV statement, flags transactions that are already in the ledger
+    statement = subparsers.add_parser("import", help="add the transactions of a CSV statement without the TUI")
+    statement.add_argument("statement", help=f"CSV file with the columns {','.join(STATEMENT_FIELDS)}")
+    statement.add_argument("--skip-duplicates", action="store_true",
+                           help="leave out rows matching a transaction's date, amount and description")
+
+    # Referential integrity check, exits with 1 while transactions reference missing tags
+    validate = subparsers.add_parser("validate", help="report transactions booked under tags their budget lacks")
+    validate.add_argument("--reassign", nargs=2, metavar=("FROM", "TO"),
+                          help="first move transactions from tag[/subtag] FROM to tag[/subtag] TO, "
+                               "a FROM tag without subtag includes its subtags")
+    validate.add_argument("--period", help="only move the transactions of this period, as YYYY-MM")
+
+    # Moves closed years to compressed files next to the ledger, keeping their totals
+    archive = subparsers.add_parser("archive", help="move the transactions of closed years to compressed files")
+    archive.add_argument("years", nargs="*", type=int, metavar="YEAR",
+                         help="years to archive (default: every year before the current one)")
+    archive.add_argument("--format", choices=list(ARCHIVE_FORMATS), default="gzip",
+                         help="compression of the archive files (default: gzip)")
+    archive.add_argument("--restore", action="store_true", help="move the years' transactions back into the ledger")
+
+    # Plays a --record file back on a copy of the ledger without a terminal and reports the latency per event
+    replay_parser = subparsers.add_parser("replay", help="replay a session recorded with --record and time every event")
+    replay_parser.add_argument("recording", help="file written by --record")
+    replay_parser.add_argument("--speed", choices=["original", "max"], default="original",
+                               help="feed events at their recorded times or back to back (default: original)")
+    replay_parser.add_argument("--events", action="store_true", help="list the latency of every event")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    FinancialData.default_file_path = args.file
+    FinancialData.ledger_paths = [args.file] + args.ledger
+
+    if args.command == "report":
+        return run_report(parser, args)
+    if args.command == "import":
+        return run_import(args)
+    if args.command == "validate":
+        return run_validate(parser, args)
+    if args.command == "archive":
+        return run_archive(parser, args)
+    if args.command == "replay":
+        return run_replay(args)
+
+    if args.search_delay < 0:
+        parser.error("--search-delay cannot be negative")
+    Scene.search_delay = args.search_delay / 1000
+    if args.profile or args.pstats:
+        PROFILER.enable(args.pstats)
+    stop_metrics = FinancialData.export_metrics(args.metrics, args.metrics_interval) if args.metrics else None
+    recorder = None
+    if args.record:
+        from finman.util.recording import SessionRecorder
+        recorder = SessionRecorder(args.record, ledger=args.file, search_delay=Scene.search_delay)
+    try:
+        run_tui(recorder)
+    finally:
+        # Quitting the TUI raises SystemExit, the capture, recording and metrics are still written
+        TASKS.shutdown()
+        PROFILER.finish()
+        if recorder is not None:
+            recorder.close()
+        if stop_metrics is not None:
+            stop_metrics.set()
+            FinancialData().write_metrics(args.metrics)
+    return 0
+
+def run_report(parser, args):
+    from finman.logic.report import build_report, format_report, parse_period, select_periods
+    try:
+        if args.period:
+            if args.start or args.end:
+                parser.error("--period cannot be combined with --from/--to")
+            start = end = parse_period(args.period)
+        else:
+            start = parse_period(args.start) if args.start else None
+            end = parse_period(args.end) if args.end else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    if not os.path.exists(args.file):
+        print(f"finman: ledger '{args.file}' not found", file=sys.stderr)
+        return 1
+
+    findata = FinancialData(args.file)
+    rows = build_report(findata, select_periods(findata, start, end))
+    sys.stdout.write(format_report(rows, args.format))
+    return 0
+
+def run_import(args):
+    from finman.logic.statement import parse_statement
+    try:
+        with open(args.statement, 'r', newline='') as f:
+            text = f.read()
+    except OSError as e:
+        print(f"finman: cannot read '{args.statement}': {e.strerror}", file=sys.stderr)
+        return 1
+
+    findata = FinancialData(args.file)
+    try:
+        transactions = parse_statement(text, (t["id"] for t in findata.get_all_transactions()))
+        # Rows without a tag are tagged like similar descriptions already in the ledger
+        suggested = sum(1 for t in transactions if not t["tagId"])
+        untagged = findata.categorize_transactions(transactions)
+        if untagged:
+            descriptions = ", ".join(t["description"] for t in untagged[:3])
+            raise ValueError(f"{len(untagged)} rows have no tag and none could be suggested ({descriptions})")
+        flagged = findata.add_transactions(transactions, skip_duplicates=args.skip_duplicates)
+    except ValueError as e:
+        print(f"finman: {e}", file=sys.stderr)
+        return 1
+
+    for transaction in transactions:
+        if transaction["id"] in flagged:
+            action = "skipped" if args.skip_duplicates else "added"
+            print(f"{action} possible duplicate {transaction['id']}: {transaction['year']}-"
+                  f"{transaction['month']:02d}-{transaction['day']:02d} {transaction['amount']:.2f} "
+                  f"{transaction['description']} (matches {', '.join(flagged[transaction['id']])})")
+    added = len(transactions) - (len(flagged) if args.skip_duplicates else 0)
+    print(f"Imported {added} of {len(transactions)} transactions, {suggested} tagged from history, "
+          f"{len(flagged)} possible duplicates")
+    return 0
+
+def run_validate(parser, args):
+    from finman.logic.report import parse_period
+    try:
+        periods = [parse_period(args.period)] if args.period else None
+    except ValueError as e:
+        parser.error(str(e))
+    if not os.path.exists(args.file):
+        print(f"finman: ledger '{args.file}' not found", file=sys.stderr)
+        return 1
+
+    findata = FinancialData(args.file)
+    if args.reassign:
+        source, target = (reference.split("/", 1) for reference in args.reassign)
+        moved = findata.reassign_transactions(source[0], source[1] if len(source) > 1 else "*",
+                                              target[0], target[1] if len(target) > 1 else None, periods)
+        print(f"Moved {moved} transactions from {args.reassign[0]} to {args.reassign[1]}")
+
+    orphans = findata.find_orphans()
+    for orphan in orphans:
+        reference = orphan["tagId"] + (f"/{orphan['subtagId']}" if orphan["subtagId"] else "")
+        print(f"{orphan['year']}-{orphan['month']:02d} {reference}: {orphan['count']} transactions, "
+              f"not in the period's budget")
+    if orphans:
+        return 1
+    print("No transactions booked under missing tags")
+    return 0
+
+def run_archive(parser, args):
+    if args.restore and not args.years:
+        parser.error("--restore needs the years to restore")
+    if not os.path.exists(args.file):
+        print(f"finman: ledger '{args.file}' not found", file=sys.stderr)
+        return 1
+
+    findata = FinancialData(args.file)
+    years = args.years or findata.get_archivable_years()
+    try:
+        for year in years:
+            if args.restore:
+                print(f"Restored {findata.restore_year(year)} transactions of {year}")
+                continue
+            count = findata.archive_year(year, args.format)
+            if count:
+                archive = next(a for a in findata.get_archives() if a["year"] == year)
+                print(f"Archived {count} transactions of {year} to {archive['file']}")
+            else:
+                print(f"No transactions to archive in {year}")
+    except ValueError as e:
+        print(f"finman: {e}", file=sys.stderr)
+        return 1
+    if not years:
+        print("No closed years with transactions to archive")
+    return 0
+
+def run_replay(args):
+    from finman.util.recording import format_replay, read_recording, replay
+    try:
+        header, events = read_recording(args.recording)
+    except (OSError, ValueError) as e:
+        print(f"finman: cannot replay '{args.recording}': {getattr(e, 'strerror', None) or e}", file=sys.stderr)
+        return 1
+    if not os.path.exists(args.file):
+        print(f"finman: ledger '{args.file}' not found", file=sys.stderr)
+        return 1
+
+    # Only needed here, kept out of the TUI's startup imports
+    import glob
+    import shutil
+    import tempfile
+
+    # The session may edit the ledger, it is replayed on a copy next to its archives
+    workdir = tempfile.mkdtemp()
+    try:
+        stem = os.path.splitext(args.file)[0]
+        for path in [args.file] + [p for suffix, _ in ARCHIVE_FORMATS.values() for p in glob.glob(f"{glob.escape(stem)}.*{suffix}")]:
+            shutil.copy(path, workdir)
+        ledger = os.path.join(workdir, os.path.basename(args.file))
+        FinancialData.default_file_path = ledger
+        FinancialData.ledger_paths = [ledger] + args.ledger
+        Scene.search_delay = header.get("search_delay", Scene.search_delay)
+        results = replay(header, events, realtime=args.speed == "original")
+    finally:
+        TASKS.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.stdout.write(format_replay(results, args.events))
+    return 0
+
+def run_tui(recorder=None):
     screen = curses.initscr() # creates the screen object we will be working with
     curses_init(screen)
-    #args = parser.parse_args()
-    #parser.add_argument('filename', help='Input file to process')
-    #args = parser.parse_args()
-    #try:
-    #    with open(args.filename, 'r') as f:
-    #        data = json.load(f)
-    #    
-    #    # Do something with the data
-    #    if args.pretty:
-    #        print(json.dumps(data, indent=2))
-    #    else:
-    #        print(data)
-    
+    if recorder is not None:
+        recorder.begin(screen)
+
     input = -1
     main_menu = MainMenu(screen,None)
     current_scene = main_menu
     current_scene.on_enter()
 
+    # Paint the main menu before touching the ledger, then load it in the
+    # background while the user is still choosing a scene
+    current_scene.full_pass(input)
+    FinancialData.preload()
+
     while True:
+        # Finished background tasks update their scenes before the frame
+        TASKS.drain()
         scene = current_scene.full_pass(input)
 
         if scene != None:
@@ -39,6 +280,8 @@ def main():
 
         # check for key presses
         input = screen.getch()
+        if recorder is not None and input != -1:
+            recorder.record(input, screen)
 
     curses_exit()
     
@@ -60,4 +303,4 @@ def curses_exit(screen):
     curses.endwin()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,9 +1,15 @@
 import curses
-from finman.util.menus import build_menu
+from finman.util.menus import build_menu, build_menu_row, fit_pad
 from finman.ui.scene import Scene
 from finman.util.dialog import Dialog
 from finman.ui.budget_editor import BudgetEditor
-from finman.logic.financial_data import FinancialData
+from finman.logic.financial_data import FinancialData, ChangeKind
+from finman.logic.usage import get_budget_periods
+from finman.util.lru import LRUCache
+
+# Sorted, filtered and formatted items per query, keyed by the ledger
+# generation so any change to the ledger misses
+QUERY_CACHE = LRUCache("budget", maxsize=64)
 
 
 class Budget(Scene):
@@ -13,28 +19,40 @@ class Budget(Scene):
         self.search_text = ""
         self.sort_window = curses.newwin(1, 1, 3, 0)
         self.sort_selected = 0
-        self.budget_pad = curses.newpad(10000, 500)
+        self.budget_pad = curses.newpad(1, 500)  # Grown to fit the items in update_selection
         self.budget_border = curses.newwin(1, 1, 3, 21)
         self.budget_selected = 0
         self.scroll_offset = 0
         self.help_window = curses.newwin(1, 1, 0, 0)
         self.sort_options = ["Name-Ascending", "Name-Descending", "Amount-Ascending", "Amount-Descending"]
         self.findata = FinancialData()
+        self.tag_groups = []  # (tag_item, subtag_items) for the current period
         self.budget_items = []  # Flattened list of budget items
+        self.formatted_items = []
+        self.pad_stale = True  # Whole pad needs repainting, not just the selection
+        self.painted_selected = 0
         self.pending_delete = None
+        self.pending_merge = None  # (tag item, target tag ids by dialog option) while one is chosen
         self.pending_add = False
         self.last_dialog = None
+        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)
 
         # Current period viewing
         self.available_periods = self._get_available_periods()
         self.current_period_index = 0 if self.available_periods else -1
+        self.periods_stale = False  # Set when budgets were added or removed
+        self.findata.subscribe(self._on_data_changed)
 
     def _get_available_periods(self):
         """Get list of available budget periods sorted by date."""
-        periods = []
-        for budget in self.findata.get_all_budgets():
-            periods.append((budget["year"], budget["month"]))
-        return sorted(periods)
+        return get_budget_periods(self.findata)
+
+    def _on_data_changed(self, event):
+        """Invalidate only what a change to the ledger actually affects."""
+        if event.kind in (ChangeKind.BUDGET_ADDED, ChangeKind.BUDGET_REMOVED):
+            self.periods_stale = True
+        if self._get_current_period() in event.affected_periods():
+            self.invalidate(data=True)
 
     def _get_current_period(self):
         """Get the currently selected period."""
@@ -42,8 +60,8 @@ class Budget(Scene):
             return self.available_periods[self.current_period_index]
         return None
 
-    def _get_sorted_budget_items(self):
-        """Get budget items (tags and subtags) sorted based on current sort selection."""
+    def _get_budget_tag_groups(self):
+        """Get budget items (tags and subtags) for the current period, grouped by tag."""
         # Get current period
         current_period = self._get_current_period()
         if not current_period:
@@ -83,6 +101,12 @@ class Budget(Scene):
 
             tag_groups.append((tag_item, subtag_items))
 
+        return tag_groups
+
+    def _get_sorted_budget_items(self):
+        """Get budget items (tags and subtags) sorted based on current sort selection."""
+        tag_groups = self.tag_groups
+
         # Sort tag groups based on selection (sort by parent tag properties)
         if self.sort_selected == 0:  # Name-Ascending
             tag_groups = sorted(tag_groups, key=lambda g: g[0]["name"].lower())
@@ -157,6 +181,7 @@ class Budget(Scene):
                     rel_y = my - sort_y - 1  # -1 for border
                     if 0 <= rel_y < len(self.sort_options):
                         self.sort_selected = rel_y
+                        self.invalidate(query=True)
 
                 # Check click in budget area (right panel)
                 budget_y, budget_x = self.budget_border.getbegyx()
@@ -168,6 +193,7 @@ class Budget(Scene):
                     clicked_index = rel_y + self.scroll_offset
                     if 0 <= clicked_index < len(self.budget_items):
                         self.budget_selected = clicked_index
+                        self.invalidate(selection=True)
                         # Double-click to edit
                         if bstate & curses.BUTTON1_DOUBLE_CLICKED:
                             selected_item = self.budget_items[self.budget_selected]
@@ -194,12 +220,14 @@ class Budget(Scene):
                                 self.current_period_index = (self.current_period_index - 1) % len(self.available_periods)
                                 self.budget_selected = 0
                                 self.scroll_offset = 0
+                                self.invalidate(data=True)
                         else:
                             # Next period
                             if self.available_periods:
                                 self.current_period_index = (self.current_period_index + 1) % len(self.available_periods)
                                 self.budget_selected = 0
                                 self.scroll_offset = 0
+                                self.invalidate(data=True)
             except:
                 pass
         # Left arrow: previous period
@@ -208,18 +236,22 @@ class Budget(Scene):
                 self.current_period_index = (self.current_period_index - 1) % len(self.available_periods)
                 self.budget_selected = 0  # Reset selection
                 self.scroll_offset = 0
+                self.invalidate(data=True)
         # Right arrow: next period
         elif input == curses.KEY_RIGHT:
             if self.available_periods:
                 self.current_period_index = (self.current_period_index + 1) % len(self.available_periods)
                 self.budget_selected = 0  # Reset selection
                 self.scroll_offset = 0
+                self.invalidate(data=True)
         # Tab: cycle forward through sort options
         elif input == 9:  # Tab
             self.sort_selected = (self.sort_selected + 1) % len(self.sort_options)
+            self.invalidate(query=True)
         # Shift+Tab: cycle backward through sort options
         elif input == 353:  # Shift+Tab
             self.sort_selected = (self.sort_selected - 1) % len(self.sort_options)
+            self.invalidate(query=True)
         # 'a' key: Add new tag or subtag
         elif input == ord('a'):
             # Show dialog to choose between tag and subtag
@@ -248,10 +280,27 @@ class Budget(Scene):
             if self.budget_items and self.budget_selected < len(self.budget_items):
                 selected_item = self.budget_items[self.budget_selected]
                 item_type = "tag" if selected_item["type"] == "tag" else "subtag"
+                # Transactions booked under the item would be left without a budget line,
+                # offer to move them to another tag first
+                if item_type == "tag":
+                    references = self.findata.count_references(
+                        selected_item["year"], selected_item["month"], selected_item["id"])
+                    can_merge = len(self.tag_groups) > 1
+                else:
+                    references = self.findata.count_references(
+                        selected_item["year"], selected_item["month"],
+                        selected_item["parent_id"], selected_item["id"])
+                    can_merge = True
+                if references:
+                    message = f"{references} transactions use {selected_item['name']}"
+                    options = (["Merge", "Delete", "Cancel"] if can_merge else ["Delete", "Cancel"])
+                else:
+                    message = f"Delete {item_type}: {selected_item['name']}?"
+                    options = ["Yes", "No"]
                 dialog = Dialog(
                     self.screen, self,
-                    message=f"Delete {item_type}: {selected_item['name']}?",
-                    options=["Yes", "No"],
+                    message=message,
+                    options=options,
                     portion=4
                 )
                 self.last_dialog = dialog
@@ -264,37 +313,69 @@ class Budget(Scene):
         elif input in (curses.KEY_BACKSPACE, 127, 8):
             if self.search_text:
                 self.search_text = self.search_text[:-1]
+                self.invalidate(query=True)
         # Navigation controls
         elif input == curses.KEY_UP:
             self.budget_selected = max(0, self.budget_selected - 1)
+            self.invalidate(selection=True)
         elif input == curses.KEY_DOWN:
             self.budget_selected += 1
+            self.invalidate(selection=True)
         # Printable characters: add to search text
         elif 32 <= input <= 126:
             self.search_text += chr(input)
-
-    def update(self):
-        if self.change_scene:
-            scene = self.change_scene
-            return scene
-
-        # Get sorted and filtered budget items
-        sorted_items = self._get_sorted_budget_items()
-        self.budget_items = self._filter_by_search(sorted_items)
-        formatted_items = [self._format_budget_item(i) for i in self.budget_items]
-
-        # Keep budget_selected within bounds
-        if formatted_items:
-            self.budget_selected = max(0, min(self.budget_selected, len(formatted_items) - 1))
-        else:
-            self.budget_selected = 0
-
+            self.invalidate(query=True)
+
+    def update_data(self):
+        # Budget items only change with the period or the ledger
+        self.tag_groups = self._get_budget_tag_groups()
+
+    def update_query(self):
+        # Get sorted and filtered budget items, unless this query was seen before
+        key = (self.findata.file_path, self.findata.generation, self._get_current_period(),
+               self.sort_selected, self.search_text)
+        cached = QUERY_CACHE.get(key)
+        if cached is None:
+            sorted_items = self._get_sorted_budget_items()
+            budget_items = self._filter_by_search(sorted_items)
+            cached = (budget_items, [self._format_budget_item(i) for i in budget_items])
+            QUERY_CACHE.put(key, cached)
+        self.budget_items, self.formatted_items = cached
+        self.pad_stale = True
+        self._draw_header()
+
+    def update_layout(self):
         num_rows, num_cols = self.screen.getmaxyx()
 
         # Search bar at top: 3 rows, full width
         self.search_window.resize(3, num_cols)
         self.search_window.mvwin(0, 0)
-        self.search_window.clear()
+
+        # Help window at bottom
+        help_text = "a: Add | Enter: Edit | Ctrl+D: Delete/Merge | ←/→: Period | Tab: Sort | Type: Search | Esc: Back"
+        self.help_window.resize(1, num_cols)
+        self.help_window.mvwin(num_rows - 1, 0)
+        self.help_window.erase()
+        self.help_window.addstr(0, 2, help_text[:num_cols - 4])
+
+        # Sort window below search bar: left side, 20 columns (leave space for help bar)
+        self.sort_window.resize(num_rows - 4, 20)
+        self.sort_window.mvwin(3, 0)
+
+        # Budget border window below search bar: right side, remaining width (leave space for help bar)
+        self.budget_border.resize(num_rows - 4, num_cols - 20)
+        self.budget_border.mvwin(3, 20)
+        self.budget_border.erase()
+        self.budget_border.box()
+
+        self._draw_header()
+        # The pad content is still valid, it only has to be copied to the terminal again
+        self.budget_pad.touchwin()
+
+    def _draw_header(self):
+        """Draw the search bar and sort menu, which reflect the current query."""
+        num_rows, num_cols = self.screen.getmaxyx()
+        self.search_window.erase()
         self.search_window.box()
 
         # Display period, search text and sort mode in search bar
@@ -313,38 +394,39 @@ class Budget(Scene):
         if len(status) < num_cols - 4:
             self.search_window.addstr(1, num_cols - len(status) - 2, status)
 
-        # Help window at bottom
-        help_text = "a: Add | Enter: Edit | Ctrl+D: Delete | ←/→: Period | Tab: Sort | Type: Search | Esc: Back"
-        self.help_window.resize(1, num_cols)
-        self.help_window.mvwin(num_rows - 1, 0)
-        self.help_window.clear()
-        self.help_window.addstr(0, 2, help_text[:num_cols - 4])
-
-        # Sort window below search bar: left side, 20 columns (leave space for help bar)
-        self.sort_window.resize(num_rows - 4, 20)
-        self.sort_window.mvwin(3, 0)
-        self.sort_window.clear()
+        self.sort_window.erase()
         self.sort_window.box()
+        build_menu(self.sort_window, self.sort_options, self.sort_selected, row_off=1, col_off=1)
 
-        # Budget border window below search bar: right side, remaining width (leave space for help bar)
-        self.budget_border.resize(num_rows - 4, num_cols - 20)
-        self.budget_border.mvwin(3, 20)
-        self.budget_border.clear()
-        self.budget_border.box()
-
-        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+    def update_selection(self):
+        formatted_items = self.formatted_items
 
-        build_menu(self.sort_window, self.sort_options, self.sort_selected, row_off=1, col_off=1)
+        # Keep budget_selected within bounds
+        if formatted_items:
+            self.budget_selected = max(0, min(self.budget_selected, len(formatted_items) - 1))
+        else:
+            self.budget_selected = 0
 
         # Display budget items using pad
-        if formatted_items:
+        if self.pad_stale:
             # Clear pad and draw all budget items
-            self.budget_pad.clear()
+            # Size the pad to the items, but never shorter than the viewport so it covers old rows
+            num_rows, num_cols = self.screen.getmaxyx()
+            fit_pad(self.budget_pad, max(len(formatted_items), num_rows - 4 - 2))
+            self.budget_pad.erase()
             build_menu(self.budget_pad, formatted_items, self.budget_selected, row_off=0, col_off=0)
+            self.pad_stale = False
+        elif self.painted_selected != self.budget_selected:
+            # Only the previously and newly selected rows look different
+            build_menu_row(self.budget_pad, formatted_items, self.painted_selected, self.budget_selected)
+            build_menu_row(self.budget_pad, formatted_items, self.budget_selected, self.budget_selected)
+        self.painted_selected = self.budget_selected
+
+        if formatted_items:
+            num_rows, num_cols = self.screen.getmaxyx()
 
             # Calculate viewport dimensions (inside border)
             viewport_height = num_rows - 4 - 2  # Screen height - top bar - help bar - borders
-            viewport_width = num_cols - 20 - 2   # Screen width - left panel - borders
 
             # Adjust scroll offset to keep selected item visible
             if self.budget_selected < self.scroll_offset:
@@ -356,46 +438,47 @@ class Budget(Scene):
             max_scroll = max(0, len(formatted_items) - viewport_height)
             self.scroll_offset = max(0, min(self.scroll_offset, max_scroll))
 
-        return None
-
     def render(self):
-        self.screen.clear()
-        self.screen.refresh()
+        self.begin_render()
         self.search_window.refresh()
         self.sort_window.refresh()
         self.budget_border.refresh()
         self.help_window.refresh()
 
-        # Refresh pad to show visible portion
+        # Refresh pad to show visible portion, even when empty so old rows are cleared
         num_rows, num_cols = self.screen.getmaxyx()
-        if self.budget_items:
-            # Calculate viewport coordinates (inside border)
-            pad_top = self.scroll_offset
-            pad_left = 0
-            screen_top = 3 + 1  # Below search bar + border
-            screen_left = 20 + 1  # After sort window + border
-            screen_bottom = num_rows - 1 - 1 - 1  # Bottom of screen - help bar - border
-            screen_right = num_cols - 1 - 1  # Right of screen - border
-
-            self.budget_pad.refresh(
-                pad_top, pad_left,
-                screen_top, screen_left,
-                screen_bottom, screen_right
-            )
 
-    def on_enter(self):
-        # Refresh available periods in case new budgets were added
-        old_periods = self.available_periods
-        self.available_periods = self._get_available_periods()
+        # Calculate viewport coordinates (inside border)
+        pad_top = self.scroll_offset
+        pad_left = 0
+        screen_top = 3 + 1  # Below search bar + border
+        screen_left = 20 + 1  # After sort window + border
+        screen_bottom = num_rows - 1 - 1 - 1  # Bottom of screen - help bar - border
+        screen_right = num_cols - 1 - 1  # Right of screen - border
+
+        self.budget_pad.refresh(
+            pad_top, pad_left,
+            screen_top, screen_left,
+            screen_bottom, screen_right
+        )
 
-        # If periods changed, adjust current index
-        if old_periods != self.available_periods:
-            if not self.available_periods:
+    def on_enter(self):
+        # Refresh available periods only if budgets were added or removed
+        if self.periods_stale:
+            current_period = self._get_current_period()
+            self.available_periods = self._get_available_periods()
+            self.periods_stale = False
+
+            # Keep showing the same period if it still exists, otherwise adjust current index
+            if current_period in self.available_periods:
+                self.current_period_index = self.available_periods.index(current_period)
+            elif not self.available_periods:
                 self.current_period_index = -1
             elif self.current_period_index >= len(self.available_periods):
                 self.current_period_index = len(self.available_periods) - 1
             elif self.current_period_index < 0:
                 self.current_period_index = 0
+            self.invalidate(data=True)
 
         # Check if we're returning from an add dialog
         if self.pending_add and self.last_dialog:
@@ -411,18 +494,51 @@ class Budget(Scene):
         # Check if we're returning from a delete confirmation dialog
         elif self.pending_delete and self.last_dialog:
             result = self.last_dialog.get_result()
-            if result == "Yes":
+            item = self.pending_delete
+            if result in ("Yes", "Delete"):
                 # Delete the tag or subtag
-                item = self.pending_delete
                 if item["type"] == "tag":
                     self.findata.remove_tag(item["year"], item["month"], item["id"])
                 else:  # subtag
                     self.findata.remove_subtag(item["year"], item["month"], item["parent_id"], item["id"])
+            elif result == "Merge" and item["type"] == "subtag":
+                # A subtag's transactions go to its parent tag
+                self.findata.merge_subtag(item["year"], item["month"], item["parent_id"], item["id"])
             # Clear pending delete and dialog reference
             self.pending_delete = None
             self.last_dialog = None
+            if result == "Merge" and item["type"] == "tag":
+                self._choose_merge_target(item)
+
+        # Check if we're returning from choosing the tag to merge into
+        elif self.pending_merge and self.last_dialog:
+            item, targets = self.pending_merge
+            target_tag_id = targets.get(self.last_dialog.get_result())
+            if target_tag_id is not None:
+                self.findata.merge_tag(item["year"], item["month"], item["id"], target_tag_id)
+            self.pending_merge = None
+            self.last_dialog = None
 
         super().on_enter()
 
+    def _choose_merge_target(self, item):
+        """Ask which tag of the period a tag's transactions should move to."""
+        num_rows, num_cols = self.screen.getmaxyx()
+        # As many tags as fit between the dialog's message and help rows
+        room = max(1, num_rows - 6)
+        targets = {}
+        for tag_item, _ in sorted(self.tag_groups, key=lambda g: g[0]["name"].lower()):
+            if tag_item["id"] != item["id"] and len(targets) < room:
+                targets[f"{tag_item['name']} [{tag_item['id']}]"[:num_cols - 4]] = tag_item["id"]
+        dialog = Dialog(
+            self.screen, self,
+            message=f"Merge {item['name']} into:",
+            options=list(targets) + ["Cancel"],
+            portion=1
+        )
+        self.pending_merge = (item, targets)
+        self.last_dialog = dialog
+        self.change_scene = dialog
+
     def on_exit(self):
         super().on_exit()
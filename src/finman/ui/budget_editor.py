@@ -82,14 +82,8 @@ class BudgetEditor(Scene):
         self.popup_window = curses.newwin(self.popup_height, self.popup_width, start_y, start_x)
 
     def _get_available_parent_tags(self):
-        """Get list of available parent tags from all budgets."""
-        tags = {}
-        for budget in self.findata.get_all_budgets():
-            for tag in budget.get("tags", []):
-                tag_id = tag["id"]
-                if tag_id not in tags:
-                    tags[tag_id] = tag["name"]
-        return tags
+        """Get the tags of all budgets from the ledger's tag catalog."""
+        return self.findata.get_tag_catalog()
 
     def _get_parent_tag_list(self):
         """Get list of parent tag IDs."""
@@ -97,6 +91,8 @@ class BudgetEditor(Scene):
 
     def handle_input(self, input):
         field_name = self.field_names[self.current_field]
+        # Every key moves between or edits fields, so the form has to be redrawn
+        self.invalidate(selection=True)
 
         # Mouse handling
         if input == curses.KEY_MOUSE:
@@ -243,10 +239,7 @@ class BudgetEditor(Scene):
                 message_color="error"
             )
 
-    def update(self):
-        if self.change_scene:
-            return self.change_scene
-
+    def update_layout(self):
         num_rows, num_cols = self.screen.getmaxyx()
         popup_height = min(18, num_rows - 4)
         popup_width = min(60, num_cols - 4)
@@ -256,7 +249,10 @@ class BudgetEditor(Scene):
         # Resize and reposition popup
         self.popup_window.resize(popup_height, popup_width)
         self.popup_window.mvwin(start_y, start_x)
-        self.popup_window.clear()
+
+    def update_selection(self):
+        popup_height, popup_width = self.popup_window.getmaxyx()
+        self.popup_window.erase()
         self.popup_window.box()
 
         # Title
@@ -284,7 +280,7 @@ class BudgetEditor(Scene):
             if field_name == "parent_tag":
                 tag_id = self.fields.get("parent_tag", "")
                 if tag_id and tag_id in self.available_parent_tags:
-                    value = f"{tag_id} ({self.available_parent_tags[tag_id]})"
+                    value = f"{tag_id} ({self.available_parent_tags[tag_id]['name']})"
                 else:
                     value = "(select with ←/→)" if not tag_id else tag_id
             else:
@@ -305,11 +301,8 @@ class BudgetEditor(Scene):
         if row < popup_height - 2:
             self.popup_window.addstr(popup_height - 2, 2, instructions[:popup_width - 4])
 
-        return None
-
     def render(self):
-        self.screen.clear()
-        self.screen.refresh()
+        self.begin_render()
         self.popup_window.refresh()
 
     def on_enter(self):
@@ -0,0 +1,155 @@
+import curses
+from functools import partial
+from finman.util.menus import fit_pad
+from finman.util.tasks import TASKS, PLACEHOLDER
+from finman.ui.scene import Scene
+from finman.logic.financial_data import FinancialData
+from finman.logic.consolidated import SUMMARY_CACHE, consolidate, consolidated_periods, summarize_ledger
+
+
+class Consolidated(Scene):
+    """Budget and spending totals of every open ledger for one period."""
+
+    def __init__(self, screen, pred_scene):
+        super().__init__(screen, pred_scene)
+        self.title_window = curses.newwin(3, 1, 0, 0)
+        self.rows_pad = curses.newpad(1, 500)  # Sized to the ledgers in update_selection
+        self.rows_border = curses.newwin(1, 1, 3, 0)
+        self.help_window = curses.newwin(1, 1, 0, 0)
+        self.paths = FinancialData.ledger_paths or [FinancialData().file_path]
+        self.pending = set()  # Ledgers being summarized on the task pool
+        self.periods = []
+        self.current_period = None
+        self.rows = []
+
+        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+        curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)
+        curses.init_pair(3, curses.COLOR_GREEN, curses.COLOR_BLACK)
+        curses.init_pair(4, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+
+    def _on_summary(self, path, stamp, summary):
+        SUMMARY_CACHE.store(path, stamp, summary)
+        self.pending.discard(path)
+        self.invalidate(query=True)
+
+    def _change_period(self, step):
+        if self.periods:
+            index = self.periods.index(self.current_period) if self.current_period in self.periods else 0
+            self.current_period = self.periods[(index + step) % len(self.periods)]
+            self.invalidate(query=True)
+
+    def handle_input(self, input):
+        if input == curses.KEY_LEFT:
+            self._change_period(-1)
+        elif input == curses.KEY_RIGHT:
+            self._change_period(1)
+        elif input == 27:
+            self.change_scene = self.pred_scene
+
+    def update_data(self):
+        # Every ledger is summarized in its own process, ledgers that were not
+        # saved since their last summary come straight from the cache
+        for path, stamp in SUMMARY_CACHE.stale(self.paths):
+            self.pending.add(path)
+            TASKS.submit(("consolidated", path), summarize_ledger, path,
+                         callback=partial(self._on_summary, path, stamp), process=True)
+
+    def update_query(self):
+        summaries = {}
+        for path in self.paths:
+            summary = SUMMARY_CACHE.get(path)
+            if summary is not None:
+                summaries[path] = summary
+        self.periods = consolidated_periods(summaries)
+        if self.current_period not in self.periods:
+            # Start on the most recent period
+            self.current_period = self.periods[-1] if self.periods else None
+        self.rows = consolidate(summaries, *self.current_period) if self.current_period else []
+        self._draw_title()
+
+    def update_layout(self):
+        num_rows, num_cols = self.screen.getmaxyx()
+
+        self.title_window.resize(3, num_cols)
+        self.title_window.mvwin(0, 0)
+
+        help_text = "←/→: Period | Esc: Back"
+        self.help_window.resize(1, num_cols)
+        self.help_window.mvwin(num_rows - 1, 0)
+        self.help_window.erase()
+        self.help_window.addstr(0, 2, help_text[:num_cols - 4])
+
+        self.rows_border.resize(num_rows - 4, num_cols)
+        self.rows_border.mvwin(3, 0)
+        self.rows_border.erase()
+        self.rows_border.box()
+
+        self._draw_title()
+        self.rows_pad.touchwin()
+
+    def _draw_title(self):
+        num_rows, num_cols = self.screen.getmaxyx()
+        self.title_window.erase()
+        self.title_window.box()
+        title = f"Consolidated: {len(self.paths)} ledgers"
+        if self.current_period:
+            year, month = self.current_period
+            status = f"Period: {year}-{month:02d} | ←/→ to change period"
+        else:
+            status = "No budgets"
+        self.title_window.addstr(1, 2, title[:num_cols - 4], curses.color_pair(1))
+        if len(title) + len(status) < num_cols - 6:
+            self.title_window.addstr(1, num_cols - len(status) - 2, status)
+
+    def _format_row(self, row):
+        """Format a ledger or total row like an Overview item."""
+        filled = max(0, min(int(row["percentage"] / 100.0 * 12), 12))
+        progress_bar = f"[{'#' * filled}{' ' * (12 - filled)}]"
+        return (f"{row['name'][-40:]:<40} | ${row['spent']:>10.2f} / ${row['budget']:>10.2f} {progress_bar} "
+                f"{row['percentage']:>5.1f}% | YTD ${row['ytd']:>10.2f}")
+
+    def update_selection(self):
+        num_rows, num_cols = self.screen.getmaxyx()
+        fit_pad(self.rows_pad, max(len(self.rows) + 2, num_rows - 4 - 2))
+        self.rows_pad.erase()
+        for idx, row in enumerate(self.rows):
+            if row is self.rows[-1]:
+                # Total row, separated from the ledgers
+                idx += 1
+                attr = curses.color_pair(1) | curses.A_BOLD
+            elif row["percentage"] < 50:
+                attr = curses.color_pair(3)
+            elif row["percentage"] < 80:
+                attr = curses.color_pair(4)
+            else:
+                attr = curses.color_pair(2)
+            try:
+                self.rows_pad.addstr(idx, 0, self._format_row(row), attr)
+            except:
+                pass
+        if self.pending:
+            try:
+                self.rows_pad.addstr(len(self.rows) + 1 if self.rows else 0, 0, PLACEHOLDER)
+            except:
+                pass
+
+    def render(self):
+        self.begin_render()
+        self.title_window.refresh()
+        self.rows_border.refresh()
+        self.help_window.refresh()
+
+        num_rows, num_cols = self.screen.getmaxyx()
+        self.rows_pad.refresh(
+            0, 0,
+            3 + 1, 0 + 1,
+            num_rows - 1 - 1 - 1, num_cols - 1 - 1
+        )
+
+    def on_enter(self):
+        # Ledgers may have been saved since the scene was last shown
+        self.invalidate(data=True)
+        super().on_enter()
+
+    def on_exit(self):
+        super().on_exit()
@@ -0,0 +1,165 @@
+import curses
+from finman.util.menus import build_menu, fit_pad
+from finman.util.dialog import Dialog
+from finman.util.tasks import TASKS, BACKGROUND_THRESHOLD, PLACEHOLDER
+from finman.ui.scene import Scene
+from finman.ui.transaction_editor import TransactionEditor
+from finman.logic.financial_data import FinancialData
+from finman.logic.transaction_query import format_transaction
+
+
+class Duplicates(Scene):
+    """Review of transactions sharing a date, amount and description."""
+
+    def __init__(self, screen, pred_scene):
+        super().__init__(screen, pred_scene)
+        self.title_window = curses.newwin(3, 1, 0, 0)
+        self.rows_pad = curses.newpad(1, 500)  # Sized to the rows in update_selection
+        self.rows_border = curses.newwin(1, 1, 3, 0)
+        self.help_window = curses.newwin(1, 1, 0, 0)
+        self.findata = FinancialData()
+        self.groups = []  # Lists of suspected duplicate transactions
+        self.transactions = []  # Every transaction of every group, in display order
+        self.rows = []
+        self.selected = 0
+        self.scroll_offset = 0
+        self.data_pending = False  # Set while a background task collects the groups
+        self.pending_delete = None
+        self.last_dialog = None
+        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+        self.findata.subscribe(self._on_data_changed)
+
+    def _on_data_changed(self, event):
+        if event.is_transaction_change() or event.is_rule_change() or event.is_archive_change():
+            self.invalidate(data=True)
+
+    def _load_groups(self):
+        """Duplicate groups on the task pool, the ledger lock keeps mutations out meanwhile."""
+        with FinancialData._lock:
+            return self.findata.get_duplicate_groups()
+
+    def _on_groups_done(self, groups):
+        self.groups = groups
+        self.data_pending = False
+        self.invalidate(query=True)
+
+    def handle_input(self, input):
+        if input == curses.KEY_UP:
+            self.selected = max(0, self.selected - 1)
+            self.invalidate(selection=True)
+        elif input == curses.KEY_DOWN:
+            self.selected += 1
+            self.invalidate(selection=True)
+        elif input == curses.KEY_ENTER or input == 10 or input == 13:
+            if self.selected < len(self.transactions):
+                self.change_scene = TransactionEditor(self.screen, self, mode="edit",
+                                                      transaction=self.transactions[self.selected])
+        elif input == 4:  # Ctrl+D
+            if self.selected < len(self.transactions):
+                transaction = self.transactions[self.selected]
+                dialog = Dialog(
+                    self.screen, self,
+                    message=f"Delete transaction: {transaction['description']}?",
+                    options=["Yes", "No"],
+                    portion=4
+                )
+                self.last_dialog = dialog
+                self.change_scene = dialog
+                self.pending_delete = transaction
+        elif input == 27:
+            self.change_scene = self.pred_scene
+
+    def update_data(self):
+        # The fingerprint index holds the groups already, listing them is one pass over the ledger
+        if self.findata.get_transaction_count() > BACKGROUND_THRESHOLD:
+            self.groups = []
+            self.data_pending = True
+            TASKS.submit("duplicates.data", self._load_groups, callback=self._on_groups_done)
+        else:
+            TASKS.cancel("duplicates.data")
+            self._on_groups_done(self.findata.get_duplicate_groups())
+
+    def update_query(self):
+        self.transactions = []
+        self.rows = []
+        for number, group in enumerate(self.groups, start=1):
+            for transaction in group:
+                self.transactions.append(transaction)
+                self.rows.append(f"{number:>4}. {format_transaction(transaction)}")
+        self._draw_title()
+
+    def update_layout(self):
+        num_rows, num_cols = self.screen.getmaxyx()
+
+        self.title_window.resize(3, num_cols)
+        self.title_window.mvwin(0, 0)
+
+        help_text = "↑/↓: Navigate | Enter: Edit | Ctrl+D: Delete | Esc: Back"
+        self.help_window.resize(1, num_cols)
+        self.help_window.mvwin(num_rows - 1, 0)
+        self.help_window.erase()
+        self.help_window.addstr(0, 2, help_text[:num_cols - 4])
+
+        self.rows_border.resize(num_rows - 4, num_cols)
+        self.rows_border.mvwin(3, 0)
+        self.rows_border.erase()
+        self.rows_border.box()
+
+        self._draw_title()
+        self.rows_pad.touchwin()
+
+    def _draw_title(self):
+        num_rows, num_cols = self.screen.getmaxyx()
+        self.title_window.erase()
+        self.title_window.box()
+        title = "Suspected duplicates"
+        if self.data_pending:
+            status = PLACEHOLDER
+        else:
+            status = f"{len(self.groups)} groups, {len(self.transactions)} transactions"
+        self.title_window.addstr(1, 2, title[:num_cols - 4], curses.color_pair(1))
+        if len(title) + len(status) < num_cols - 6:
+            self.title_window.addstr(1, num_cols - len(status) - 2, status)
+
+    def update_selection(self):
+        self.selected = max(0, min(self.selected, len(self.rows) - 1))
+
+        num_rows, num_cols = self.screen.getmaxyx()
+        viewport_height = num_rows - 4 - 2
+        fit_pad(self.rows_pad, max(len(self.rows), viewport_height))
+        self.rows_pad.erase()
+        if self.rows:
+            build_menu(self.rows_pad, self.rows, self.selected)
+        elif not self.data_pending:
+            self.rows_pad.addstr(0, 0, "No suspected duplicates")
+
+        # Keep the selection visible
+        if self.selected < self.scroll_offset:
+            self.scroll_offset = self.selected
+        elif self.selected >= self.scroll_offset + viewport_height:
+            self.scroll_offset = self.selected - viewport_height + 1
+        self.scroll_offset = max(0, min(self.scroll_offset, max(0, len(self.rows) - viewport_height)))
+
+    def render(self):
+        self.begin_render()
+        self.title_window.refresh()
+        self.rows_border.refresh()
+        self.help_window.refresh()
+
+        num_rows, num_cols = self.screen.getmaxyx()
+        self.rows_pad.refresh(
+            self.scroll_offset, 0,
+            3 + 1, 0 + 1,
+            num_rows - 1 - 1 - 1, num_cols - 1 - 1
+        )
+
+    def on_enter(self):
+        if self.pending_delete and self.last_dialog:
+            if self.last_dialog.get_result() == "Yes":
+                self.findata.remove_transaction(self.pending_delete["id"])
+            self.pending_delete = None
+            self.last_dialog = None
+        super().on_enter()
+
+    def on_exit(self):
+        super().on_exit()
@@ -1,15 +1,17 @@
 import curses
 from finman.ui.scene import Scene
+from finman.util.menus import fit_pad
 
 
 class Help(Scene):
     def __init__(self, screen, pred_scene):
         super().__init__(screen, pred_scene)
-        self.help_content_pad = curses.newpad(1000, 500)
+        self.help_content_pad = curses.newpad(1, 500)  # Sized to the help text in update_data
         self.help_border = curses.newwin(1, 1, 3, 0)
         self.title_window = curses.newwin(1, 1, 0, 0)
         self.help_bar_window = curses.newwin(1, 1, 0, 0)
         self.scroll_offset = 0
+        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)
 
         # Help content
         self.help_lines = [
@@ -21,6 +23,9 @@ class Help(Scene):
             "  View budget usage for a specific period with visual progress bars.",
             "  - Color coding: Green (<50%), Yellow (50-80%), Red (80%+)",
             "  - Shows spending vs budget for all tags and subtags",
+            "  - YTD column shows spending from January through the viewed month",
+            "  - While a period runs, → shows the spending projected by its end",
+            "    and +amount the projected overrun of the budget",
             "  - Navigate between periods with ←/→ arrows",
             "",
             "  Controls:",
@@ -28,21 +33,27 @@ class Help(Scene):
             "    ←/→        - Change period (month/year)",
             "    Tab        - Cycle through sort options",
             "    Type       - Search/filter by name or tag ID",
+            "    Enter      - Search without waiting for typing to pause",
+            "    Ctrl+F     - Switch between exact and fuzzy search",
             "    Esc        - Return to main menu",
             "",
             "═══════════════════════════════════════════════════════════════════════",
             "",
             "TRANSACTIONS:",
             "  Manage all your financial transactions.",
+            "  Opens on the last 3 months, scrolling past the oldest transaction",
+            "  loads 3 more. Years archived with `finman archive` are read-only.",
             "",
             "  Controls:",
             "    ↑/↓        - Navigate through transactions",
             "    a          - Add new transaction",
-            "    Enter      - Edit selected transaction",
+            "    Enter      - Edit selected transaction, or search while typing",
             "    Ctrl+D     - Delete selected transaction",
             "    Tab        - Cycle through sort options (Date/Amount/Tag)",
             "    Type       - Search by description, amount, or tag",
+            "    Ctrl+F     - Switch between exact and fuzzy search",
             "    #tag       - Filter by specific tag (e.g., #food or #food/dining)",
+            "    Ctrl+W     - Switch between recent months and every transaction",
             "    Esc        - Return to main menu",
             "",
             "  Transaction Editor:",
@@ -50,6 +61,35 @@ class Help(Scene):
             "    ←/→            - Select tag/subtag from dropdown",
             "    Enter          - Save transaction",
             "    Esc            - Cancel",
+            "    Typing a description suggests the tag and subtag similar",
+            "    transactions were booked under, until one is picked with ←/→.",
+            "",
+            "  Recurring Transactions:",
+            "    Set Repeat to weekly, monthly or yearly when adding a transaction,",
+            "    and optionally an Until date. Occurrences are marked with ↻.",
+            "    Editing an occurrence turns it into a regular transaction,",
+            "    deleting one only skips that date.",
+            "",
+            "═══════════════════════════════════════════════════════════════════════",
+            "",
+            "CONSOLIDATED:",
+            "  Totals of every ledger given with --ledger, shown in the main menu",
+            "  when finman was started with more than one ledger.",
+            "  - Budget, spending and YTD spending per ledger, plus their total",
+            "  - Navigate between periods with ←/→ arrows",
+            "",
+            "═══════════════════════════════════════════════════════════════════════",
+            "",
+            "DUPLICATES:",
+            "  Groups of transactions with the same date, amount and description,",
+            "  likely entered twice or imported from overlapping statements.",
+            "  Adding a transaction that matches one warns right away.",
+            "",
+            "  Controls:",
+            "    ↑/↓        - Navigate through transactions",
+            "    Enter      - Edit selected transaction",
+            "    Ctrl+D     - Delete selected transaction",
+            "    Esc        - Return to main menu",
             "",
             "═══════════════════════════════════════════════════════════════════════",
             "",
@@ -62,7 +102,8 @@ class Help(Scene):
             "    ←/→        - Change period (month/year)",
             "    a          - Add new tag or subtag",
             "    Enter      - Edit selected tag/subtag",
-            "    Ctrl+D     - Delete selected tag/subtag",
+            "    Ctrl+D     - Delete selected tag/subtag, or merge it when",
+            "                 transactions still use it",
             "    Tab        - Cycle through sort options",
             "    Type       - Search/filter by name or ID",
             "    Esc        - Return to main menu",
@@ -82,6 +123,8 @@ class Help(Scene):
             "  • Progress bars in Overview show how much of your budget you've used",
             "  • Click with mouse to select items and navigate (double-click to edit)",
             "  • All changes are automatically saved to budget_data.json",
+            "  • Ctrl+U undoes the last change and Ctrl+R redoes it, in every screen",
+            "  • Start with finman --profile and press F12 to show frame timings",
             "",
             "═══════════════════════════════════════════════════════════════════════",
             "",
@@ -96,8 +139,10 @@ class Help(Scene):
                 # Allow scrolling with mouse wheel or clicking
                 if bstate & curses.BUTTON4_PRESSED:  # Scroll up
                     self.scroll_offset = max(0, self.scroll_offset - 3)
+                    self.invalidate(selection=True)
                 elif bstate & curses.BUTTON5_PRESSED:  # Scroll down
                     self.scroll_offset += 3
+                    self.invalidate(selection=True)
             except:
                 pass
         # Escape key
@@ -106,26 +151,41 @@ class Help(Scene):
         # Navigation controls
         elif input == curses.KEY_UP:
             self.scroll_offset = max(0, self.scroll_offset - 1)
+            self.invalidate(selection=True)
         elif input == curses.KEY_DOWN:
             self.scroll_offset += 1
+            self.invalidate(selection=True)
         elif input == curses.KEY_PPAGE:  # Page Up
             self.scroll_offset = max(0, self.scroll_offset - 10)
+            self.invalidate(selection=True)
         elif input == curses.KEY_NPAGE:  # Page Down
             self.scroll_offset += 10
+            self.invalidate(selection=True)
 
-    def update(self):
-        if self.change_scene:
-            scene = self.change_scene
-            return scene
+    def update_data(self):
+        # The help text never changes, so the pad is only populated once
+        fit_pad(self.help_content_pad, len(self.help_lines))
+        self.help_content_pad.erase()
+        for idx, line in enumerate(self.help_lines):
+            try:
+                # Add some color to section headers
+                if line and (line.startswith("FINMAN") or "═══" in line):
+                    self.help_content_pad.addstr(idx, 2, line, curses.color_pair(1))
+                elif line.endswith(":") and not line.startswith(" "):
+                    self.help_content_pad.addstr(idx, 2, line, curses.color_pair(1) | curses.A_BOLD)
+                else:
+                    self.help_content_pad.addstr(idx, 2, line)
+            except:
+                pass
 
+    def update_layout(self):
         num_rows, num_cols = self.screen.getmaxyx()
 
         # Title window at top
         self.title_window.resize(3, num_cols)
         self.title_window.mvwin(0, 0)
-        self.title_window.clear()
+        self.title_window.erase()
         self.title_window.box()
-        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)
         title = "Help & Instructions"
         self.title_window.addstr(1, (num_cols - len(title)) // 2, title, curses.color_pair(1))
 
@@ -133,39 +193,28 @@ class Help(Scene):
         help_text = "↑/↓/PgUp/PgDn: Scroll | Esc: Back to Menu"
         self.help_bar_window.resize(1, num_cols)
         self.help_bar_window.mvwin(num_rows - 1, 0)
-        self.help_bar_window.clear()
+        self.help_bar_window.erase()
         self.help_bar_window.addstr(0, 2, help_text[:num_cols - 4])
 
         # Help content border
         self.help_border.resize(num_rows - 4, num_cols)
         self.help_border.mvwin(3, 0)
-        self.help_border.clear()
+        self.help_border.erase()
         self.help_border.box()
 
-        # Populate help content pad
-        self.help_content_pad.clear()
-        for idx, line in enumerate(self.help_lines):
-            try:
-                # Add some color to section headers
-                if line and (line.startswith("FINMAN") or "═══" in line):
-                    self.help_content_pad.addstr(idx, 2, line, curses.color_pair(1))
-                elif line.endswith(":") and not line.startswith(" "):
-                    self.help_content_pad.addstr(idx, 2, line, curses.color_pair(1) | curses.A_BOLD)
-                else:
-                    self.help_content_pad.addstr(idx, 2, line)
-            except:
-                pass
+        # The pad content is still valid, it only has to be copied to the terminal again
+        self.help_content_pad.touchwin()
+
+    def update_selection(self):
+        num_rows, num_cols = self.screen.getmaxyx()
 
         # Limit scroll offset
         viewport_height = num_rows - 4 - 2
         max_scroll = max(0, len(self.help_lines) - viewport_height)
         self.scroll_offset = max(0, min(self.scroll_offset, max_scroll))
 
-        return None
-
     def render(self):
-        self.screen.clear()
-        self.screen.refresh()
+        self.begin_render()
         self.title_window.refresh()
         self.help_border.refresh()
         self.help_bar_window.refresh()
@@ -188,7 +237,7 @@ class Help(Scene):
         )
 
     def on_enter(self):
-        self.needs_render = True
+        self.invalidate(layout=True)
 
     def on_exit(self):
         super().on_exit()
@@ -1,10 +1,20 @@
 import curses # imports curses a barebones highly portable tui library
+import importlib
 from finman.util.menus import build_menu
 from finman.ui.scene import Scene
-from finman.ui.transactions import Transactions
-from finman.ui.budget import Budget
-from finman.ui.overview import Overview
-from finman.ui.help import Help
+from finman.logic.financial_data import FinancialData
+
+# Module and class of the scene behind each menu option. Scene modules are
+# only imported when their option is first selected to keep startup fast
+SCENES = [
+    ("finman.ui.overview", "Overview"),
+    ("finman.ui.transactions", "Transactions"),
+    ("finman.ui.budget", "Budget"),
+    ("finman.ui.duplicates", "Duplicates"),
+    ("finman.ui.help", "Help"),
+]
+# Listed after Overview when more than one ledger was given on the command line
+CONSOLIDATED_SCENE = ("finman.ui.consolidated", "Consolidated")
 
 
 class MainMenu(Scene):
@@ -12,13 +22,18 @@ class MainMenu(Scene):
         super().__init__(screen,None)
         self.entered = False
         self.selected = 0
-        self.options = ["Overview", "Transations", "Budget", "Help"]
+        self.options = ["Overview", "Transations", "Budget", "Duplicates", "Help"]
+        self.scenes = list(SCENES)
+        if len(FinancialData.ledger_paths) > 1:
+            self.options.insert(1, "Consolidated")
+            self.scenes.insert(1, CONSOLIDATED_SCENE)
         self.menu_window = curses.newwin(1, 1, 3, 0)
         self.title_window = curses.newwin(1, 1, 0, 0)
         self.help_window = curses.newwin(1, 1, 0, 0)
         self.name = "Finman"
         self.tagline = "The Financial Management App"
         self.fullname = self.name + ": " + self.tagline
+        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)
         pass
 
     def handle_input(self, input):
@@ -38,66 +53,58 @@ class MainMenu(Scene):
 
                     if 0 <= clicked_option < len(self.options):
                         self.selected = clicked_option
+                        self.invalidate(selection=True)
                         # On click, trigger selection
                         if bstate & curses.BUTTON1_CLICKED:
-                            if self.selected == 0:
-                                self.change_scene = Overview(self.screen,self)
-                            elif self.selected == 1:
-                                self.change_scene = Transactions(self.screen,self)
-                            elif self.selected == 2:
-                                self.change_scene = Budget(self.screen,self)
-                            elif self.selected == 3:
-                                self.change_scene = Help(self.screen,self)
+                            self.change_scene = self._open_scene(self.selected)
             except:
                 pass
         elif input == curses.KEY_ENTER or input == 10 or input == 13:
-            if self.selected == 0:
-                self.change_scene = Overview(self.screen,self)
-            elif self.selected == 1:
-                self.change_scene = Transactions(self.screen,self)
-            elif self.selected == 2:
-                self.change_scene = Budget(self.screen,self)
-            elif self.selected == 3:
-                self.change_scene = Help(self.screen,self)
+            self.change_scene = self._open_scene(self.selected)
         elif input == 27:
             exit()
         elif input == curses.KEY_DOWN:
             self.selected = (self.selected+1)%len(self.options)
+            self.invalidate(selection=True)
         elif input == curses.KEY_UP:
             self.selected = (self.selected-1)%len(self.options)
+            self.invalidate(selection=True)
 
-    def update(self):
-        if self.change_scene:
-            scene = self.change_scene
-            return scene
+    def _open_scene(self, index):
+        """Import the scene module for a menu option on first use and construct the scene."""
+        module_name, class_name = self.scenes[index]
+        module = importlib.import_module(module_name)
+        return getattr(module, class_name)(self.screen,self)
 
+    def update_layout(self):
         num_rows, num_cols = self.screen.getmaxyx()
         # resize the title_window to take up 3 rows two for the border and one for the title itself
         self.title_window.resize(3,num_cols)
+        self.title_window.erase()
         # add a border to the title_window
         self.title_window.box()
         # center the title in the title window
-        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)
         self.title_window.addstr(1,(num_cols-len(self.fullname))//2,self.fullname,curses.color_pair(1))
 
         # Help window at bottom
         help_text = "↑/↓: Navigate | Enter: Select | Esc: Quit"
         self.help_window.resize(1, num_cols)
         self.help_window.mvwin(num_rows - 1, 0)
-        self.help_window.clear()
+        self.help_window.erase()
         self.help_window.addstr(0, 2, help_text[:num_cols - 4])
 
+        # resize the menu window if needed (leave space for help bar)
+        self.menu_window.resize(num_rows-4, num_cols)
+        self.menu_window.erase()
         # border the menu window
         self.menu_window.box()
-        # resize it if needed (leave space for help bar)
-        self.menu_window.resize(num_rows-4, num_cols)
+
+    def update_selection(self):
         # convience function to make menu
         build_menu(self.menu_window,self.options,self.selected,row_cen=1,col_cen=1)
-        return None
 
     def render(self):
-        self.screen.clear()
-        self.screen.refresh()
+        self.begin_render()
         self.menu_window.refresh()
         self.title_window.refresh()
         self.help_window.refresh()
@@ -1,7 +1,17 @@
 import curses
-from finman.util.menus import build_menu
+from finman.util.menus import build_menu, fit_pad
 from finman.ui.scene import Scene
-from finman.logic.financial_data import FinancialData
+from finman.logic.financial_data import FinancialData, ChangeKind
+from finman.logic.usage import get_usage_groups, get_budget_periods
+from finman.logic.forecast import HISTORY_YEARS
+from finman.util.tasks import TASKS, BACKGROUND_THRESHOLD, PLACEHOLDER
+from finman.util.lru import LRUCache
+from finman.logic.fuzzy import SEARCH_MODES, TrigramIndex
+from functools import partial
+
+# Usage groups per period and sorted, filtered items per query, keyed by the
+# ledger generation so any change to the ledger misses
+QUERY_CACHE = LRUCache("overview", maxsize=64)
 
 
 class Overview(Scene):
@@ -9,27 +19,56 @@ class Overview(Scene):
         super().__init__(screen, pred_scene)
         self.search_window = curses.newwin(3, 1, 0, 0)
         self.search_text = ""
+        self.search_mode = 0  # Index into SEARCH_MODES
         self.sort_window = curses.newwin(1, 1, 3, 0)
         self.sort_selected = 0
-        self.overview_pad = curses.newpad(10000, 500)
+        self.overview_pad = curses.newpad(1, 500)  # Grown to fit the items in update_selection
         self.overview_border = curses.newwin(1, 1, 3, 21)
         self.overview_selected = 0
         self.scroll_offset = 0
         self.help_window = curses.newwin(1, 1, 0, 0)
         self.sort_options = ["Name-Ascending", "Name-Descending", "Usage-Ascending", "Usage-Descending"]
         self.findata = FinancialData()
+        self.tag_groups = []  # (tag_item, subtag_items) with usage data for the current period
         self.overview_items = []  # Flattened list of budget items with usage data
+        self.pad_stale = True  # Whole pad needs repainting, not just the selection
+        self.data_pending = False  # Set while a background task computes the usage
+        self.painted_selected = 0
+
+        # Initialize color pairs
+        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)  # Selection highlight
+        curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)     # High usage (80%+)
+        curses.init_pair(3, curses.COLOR_GREEN, curses.COLOR_BLACK)   # Low usage (<50%)
+        curses.init_pair(4, curses.COLOR_YELLOW, curses.COLOR_BLACK)  # Medium usage (50-80%)
 
         # Current period viewing
         self.available_periods = self._get_available_periods()
         self.current_period_index = 0 if self.available_periods else -1
+        self.periods_stale = False  # Set when budgets were added or removed
+        self.findata.subscribe(self._on_data_changed)
 
     def _get_available_periods(self):
         """Get list of available budget periods sorted by date."""
-        periods = []
-        for budget in self.findata.get_all_budgets():
-            periods.append((budget["year"], budget["month"]))
-        return sorted(periods)
+        return get_budget_periods(self.findata)
+
+    def _on_data_changed(self, event):
+        """Invalidate only what a change to the ledger actually affects."""
+        if event.kind in (ChangeKind.BUDGET_ADDED, ChangeKind.BUDGET_REMOVED):
+            self.periods_stale = True
+        current_period = self._get_current_period()
+        if current_period is None:
+            return
+        if event.is_rule_change() or event.is_archive_change():
+            self.invalidate(data=True)
+        elif event.is_transaction_change():
+            # The YTD column also covers earlier months of the same year, the
+            # projection the same month of the years before
+            year, month = current_period
+            if any((y == year and m <= month) or (m == month and year - HISTORY_YEARS <= y < year)
+                   for y, m in event.affected_periods()):
+                self.invalidate(data=True)
+        elif current_period in event.affected_periods():
+            self.invalidate(data=True)
 
     def _get_current_period(self):
         """Get the currently selected period."""
@@ -37,70 +76,30 @@ class Overview(Scene):
             return self.available_periods[self.current_period_index]
         return None
 
-    def _calculate_tag_spending(self, year, month, tag_id, subtag_id=None):
-        """Calculate total spending for a tag or subtag in a given period."""
-        transactions = self.findata.get_transactions_by_date(year, month)
-        total = 0.0
-
-        for transaction in transactions:
-            if transaction["tagId"] == tag_id:
-                if subtag_id is None:
-                    # For parent tags, only count transactions without subtags
-                    if not transaction.get("subtagId"):
-                        total += transaction["amount"]
-                else:
-                    # For subtags, match both tag and subtag
-                    if transaction.get("subtagId") == subtag_id:
-                        total += transaction["amount"]
-
-        return total
-
-    def _get_sorted_overview_items(self):
-        """Get overview items (tags and subtags) with usage data."""
+    def _get_overview_tag_groups(self):
+        """Get overview items (tags and subtags) with usage data, grouped by tag."""
         # Get current period
         current_period = self._get_current_period()
         if not current_period:
             return []
 
         year, month = current_period
+        return get_usage_groups(self.findata, year, month)
 
-        # Get budget for current period
-        budget = self.findata.get_budget(year, month)
-        if not budget:
-            return []
+    def _load_tag_groups(self, year, month):
+        """Usage of a period on the task pool, the ledger lock keeps mutations out meanwhile."""
+        with FinancialData._lock:
+            return get_usage_groups(self.findata, year, month)
 
-        # Build overview items with spending data
-        tag_groups = []
-        for tag in budget.get("tags", []):
-            tag_spending = self._calculate_tag_spending(year, month, tag["id"])
-            tag_item = {
-                "type": "tag",
-                "year": year,
-                "month": month,
-                "id": tag["id"],
-                "name": tag["name"],
-                "maxAmount": tag["maxAmount"],
-                "spent": tag_spending,
-                "percentage": (tag_spending / tag["maxAmount"] * 100) if tag["maxAmount"] > 0 else 0,
-                "parent_id": None
-            }
-
-            subtag_items = []
-            for subtag in tag.get("subTags", []):
-                subtag_spending = self._calculate_tag_spending(year, month, tag["id"], subtag["id"])
-                subtag_items.append({
-                    "type": "subtag",
-                    "year": year,
-                    "month": month,
-                    "id": subtag["id"],
-                    "name": subtag["name"],
-                    "maxAmount": subtag["maxAmount"],
-                    "spent": subtag_spending,
-                    "percentage": (subtag_spending / subtag["maxAmount"] * 100) if subtag["maxAmount"] > 0 else 0,
-                    "parent_id": tag["id"]
-                })
-
-            tag_groups.append((tag_item, subtag_items))
+    def _on_data_done(self, key, tag_groups):
+        QUERY_CACHE.put(key, tag_groups)
+        self.tag_groups = tag_groups
+        self.data_pending = False
+        self.invalidate(query=True)
+
+    def _get_sorted_overview_items(self):
+        """Get overview items (tags and subtags) sorted based on current sort selection."""
+        tag_groups = self.tag_groups
 
         # Sort tag groups based on selection
         if self.sort_selected == 0:  # Name-Ascending
@@ -125,6 +124,11 @@ class Overview(Scene):
         if not self.search_text:
             return items
 
+        if SEARCH_MODES[self.search_mode] == "fuzzy":
+            # Ranked by how well the name or id matches, ties keep the sort order
+            index = TrigramIndex([f"{item['name']} {item['id']}" for item in items])
+            return [items[doc_id] for doc_id, _ in index.search(self.search_text)]
+
         search_lower = self.search_text.lower()
         filtered = []
 
@@ -171,11 +175,19 @@ class Overview(Scene):
         budget = f"${item['maxAmount']:>8.2f}"
         progress_bar = self._get_progress_bar(item["percentage"], width=12)
         percentage_str = f"{item['percentage']:>5.1f}%"
+        ytd = f"YTD ${item['ytd']:>9.2f}"
+        # Projected month end spending while the period runs, with any overrun of the budget
+        projection = ""
+        if item["projected"] is not None:
+            overrun = item["projected"] - item["maxAmount"]
+            overrun_str = f"+{overrun:.2f}" if overrun > 0 else ""
+            projection = f" → ${item['projected']:>8.2f} {overrun_str:<9}"
 
         # Get color attribute
         color_pair = self._get_color_for_percentage(item["percentage"])
 
-        return (f"{item_id:<15} | {name:<25} | {spent} / {budget} {progress_bar} {percentage_str}", color_pair)
+        return (f"{item_id:<15} | {name:<25} | {spent} / {budget} {progress_bar} {percentage_str}{projection} | {ytd}",
+                color_pair)
 
     def handle_input(self, input):
         # Mouse handling
@@ -191,6 +203,7 @@ class Overview(Scene):
                     rel_y = my - sort_y - 1
                     if 0 <= rel_y < len(self.sort_options):
                         self.sort_selected = rel_y
+                        self.invalidate(query=True)
 
                 # Check click in overview area (right panel)
                 overview_y, overview_x = self.overview_border.getbegyx()
@@ -201,6 +214,7 @@ class Overview(Scene):
                     clicked_index = rel_y + self.scroll_offset
                     if 0 <= clicked_index < len(self.overview_items):
                         self.overview_selected = clicked_index
+                        self.invalidate(selection=True)
 
                 # Check click in search bar for period navigation
                 search_y, search_x = self.search_window.getbegyx()
@@ -214,12 +228,14 @@ class Overview(Scene):
                                 self.current_period_index = (self.current_period_index - 1) % len(self.available_periods)
                                 self.overview_selected = 0
                                 self.scroll_offset = 0
+                                self.invalidate(data=True)
                         else:
                             # Next period
                             if self.available_periods:
                                 self.current_period_index = (self.current_period_index + 1) % len(self.available_periods)
                                 self.overview_selected = 0
                                 self.scroll_offset = 0
+                                self.invalidate(data=True)
             except:
                 pass
         # Left arrow: previous period
@@ -228,18 +244,29 @@ class Overview(Scene):
                 self.current_period_index = (self.current_period_index - 1) % len(self.available_periods)
                 self.overview_selected = 0
                 self.scroll_offset = 0
+                self.invalidate(data=True)
         # Right arrow: next period
         elif input == curses.KEY_RIGHT:
             if self.available_periods:
                 self.current_period_index = (self.current_period_index + 1) % len(self.available_periods)
                 self.overview_selected = 0
                 self.scroll_offset = 0
+                self.invalidate(data=True)
         # Tab: cycle forward through sort options
         elif input == 9:  # Tab
             self.sort_selected = (self.sort_selected + 1) % len(self.sort_options)
+            self.invalidate(query=True)
         # Shift+Tab: cycle backward through sort options
         elif input == 353:  # Shift+Tab
             self.sort_selected = (self.sort_selected - 1) % len(self.sort_options)
+            self.invalidate(query=True)
+        # Ctrl+F: switch between exact and fuzzy search
+        elif input == 6:  # Ctrl+F
+            self.search_mode = (self.search_mode + 1) % len(SEARCH_MODES)
+            self.invalidate(query=True)
+        # Enter: evaluate the search without waiting for typing to pause
+        elif input == curses.KEY_ENTER or input == 10 or input == 13:
+            self.flush_query()
         # Escape key
         elif input == 27:
             self.change_scene = self.pred_scene
@@ -247,36 +274,81 @@ class Overview(Scene):
         elif input in (curses.KEY_BACKSPACE, 127, 8):
             if self.search_text:
                 self.search_text = self.search_text[:-1]
+                self._draw_header()
+                self.defer_query()
         # Navigation controls
         elif input == curses.KEY_UP:
             self.overview_selected = max(0, self.overview_selected - 1)
+            self.invalidate(selection=True)
         elif input == curses.KEY_DOWN:
             self.overview_selected += 1
+            self.invalidate(selection=True)
         # Printable characters: add to search text
         elif 32 <= input <= 126:
             self.search_text += chr(input)
+            self._draw_header()
+            self.defer_query()
 
-    def update(self):
-        if self.change_scene:
-            scene = self.change_scene
-            return scene
-
-        # Get sorted and filtered overview items
-        sorted_items = self._get_sorted_overview_items()
-        self.overview_items = self._filter_by_search(sorted_items)
-
-        # Keep overview_selected within bounds
-        if self.overview_items:
-            self.overview_selected = max(0, min(self.overview_selected, len(self.overview_items) - 1))
+    def update_data(self):
+        # Spending only changes with the period or the ledger
+        current_period = self._get_current_period()
+        key = ("usage", self.findata.file_path, self.findata.generation, current_period)
+        cached = QUERY_CACHE.get(key)
+        if cached is None and current_period and self.findata.get_transaction_count() > BACKGROUND_THRESHOLD:
+            # Large ledgers are aggregated on the task pool, a newer period replaces the pending job
+            self.tag_groups = []
+            self.data_pending = True
+            TASKS.submit("overview.data", self._load_tag_groups, *current_period,
+                         callback=partial(self._on_data_done, key))
         else:
-            self.overview_selected = 0
-
+            TASKS.cancel("overview.data")
+            self._on_data_done(key, self._get_overview_tag_groups() if cached is None else cached)
+
+    def update_query(self):
+        # Get sorted and filtered overview items, unless this query was seen before
+        key = ("items", self.findata.file_path, self.findata.generation, self._get_current_period(),
+               self.sort_selected, self.search_text, self.search_mode)
+        items = None if self.data_pending else QUERY_CACHE.get(key)
+        if items is None:
+            items = self._filter_by_search(self._get_sorted_overview_items())
+            if not self.data_pending:
+                QUERY_CACHE.put(key, items)
+        self.overview_items = items
+        self.pad_stale = True
+        self._draw_header()
+
+    def update_layout(self):
         num_rows, num_cols = self.screen.getmaxyx()
 
         # Search bar at top: 3 rows, full width
         self.search_window.resize(3, num_cols)
         self.search_window.mvwin(0, 0)
-        self.search_window.clear()
+
+        # Help window at bottom
+        help_text = "↑/↓: Navigate | ←/→: Period | Tab: Sort | Type: Search | Ctrl+F: Fuzzy | Esc: Back"
+        self.help_window.resize(1, num_cols)
+        self.help_window.mvwin(num_rows - 1, 0)
+        self.help_window.erase()
+        self.help_window.addstr(0, 2, help_text[:num_cols - 4])
+
+        # Sort window below search bar: left side, 20 columns
+        self.sort_window.resize(num_rows - 4, 20)
+        self.sort_window.mvwin(3, 0)
+
+        # Overview border window below search bar: right side, remaining width
+        self.overview_border.resize(num_rows - 4, num_cols - 20)
+        self.overview_border.mvwin(3, 20)
+        self.overview_border.erase()
+        self.overview_border.box()
+
+        self._draw_header()
+        # The pad content is still valid, it only has to be copied to the terminal again
+        self.overview_pad.touchwin()
+
+    def _draw_header(self):
+        """Draw the search bar and sort menu, which reflect the current query."""
+        num_rows, num_cols = self.screen.getmaxyx()
+        self.search_window.erase()
         self.search_window.box()
 
         # Display period, search text and sort mode in search bar
@@ -288,63 +360,68 @@ class Overview(Scene):
             period_display = "No budgets"
 
         sort_mode = self.sort_options[self.sort_selected]
-        search_display = f"Search: {self.search_text}" if self.search_text else "Search: (type to filter)"
+        search_label = "Fuzzy search" if SEARCH_MODES[self.search_mode] == "fuzzy" else "Search"
+        search_display = f"{search_label}: {self.search_text}" if self.search_text else f"{search_label}: (type to filter)"
         status = f"Period: {period_display} | Sort: {sort_mode} | ←/→ to change period"
 
         self.search_window.addstr(1, 2, search_display[:num_cols - 4])
         if len(status) < num_cols - 4:
             self.search_window.addstr(1, num_cols - len(status) - 2, status)
 
-        # Help window at bottom
-        help_text = "↑/↓: Navigate | ←/→: Period | Tab: Sort | Type: Search | Esc: Back"
-        self.help_window.resize(1, num_cols)
-        self.help_window.mvwin(num_rows - 1, 0)
-        self.help_window.clear()
-        self.help_window.addstr(0, 2, help_text[:num_cols - 4])
-
-        # Sort window below search bar: left side, 20 columns
-        self.sort_window.resize(num_rows - 4, 20)
-        self.sort_window.mvwin(3, 0)
-        self.sort_window.clear()
+        self.sort_window.erase()
         self.sort_window.box()
+        build_menu(self.sort_window, self.sort_options, self.sort_selected, row_off=1, col_off=1)
 
-        # Overview border window below search bar: right side, remaining width
-        self.overview_border.resize(num_rows - 4, num_cols - 20)
-        self.overview_border.mvwin(3, 20)
-        self.overview_border.clear()
-        self.overview_border.box()
+    def _draw_overview_row(self, idx):
+        """Draw a single overview item into the pad."""
+        if idx >= len(self.overview_items):
+            return
+        item = self.overview_items[idx]
+        text, color_pair = self._format_overview_item(item, idx == self.overview_selected)
 
-        # Initialize color pairs
-        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)  # Selection highlight
-        curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)     # High usage (80%+)
-        curses.init_pair(3, curses.COLOR_GREEN, curses.COLOR_BLACK)   # Low usage (<50%)
-        curses.init_pair(4, curses.COLOR_YELLOW, curses.COLOR_BLACK)  # Medium usage (50-80%)
+        # Apply color and highlight if selected
+        if idx == self.overview_selected:
+            attr = curses.color_pair(1) | curses.A_REVERSE
+        else:
+            attr = curses.color_pair(color_pair)
 
-        build_menu(self.sort_window, self.sort_options, self.sort_selected, row_off=1, col_off=1)
+        try:
+            self.overview_pad.move(idx, 0)
+            self.overview_pad.clrtoeol()
+            self.overview_pad.addstr(idx, 0, text, attr)
+        except:
+            pass
 
-        # Display overview items using pad with colors
+    def update_selection(self):
+        # Keep overview_selected within bounds, pending usage keeps it for its results
         if self.overview_items:
-            # Clear pad
-            self.overview_pad.clear()
-
-            # Draw all overview items with colors
-            for idx, item in enumerate(self.overview_items):
-                text, color_pair = self._format_overview_item(item, idx == self.overview_selected)
+            self.overview_selected = max(0, min(self.overview_selected, len(self.overview_items) - 1))
+        elif not self.data_pending:
+            self.overview_selected = 0
 
-                # Apply color and highlight if selected
-                if idx == self.overview_selected:
-                    attr = curses.color_pair(1) | curses.A_REVERSE
-                else:
-                    attr = curses.color_pair(color_pair)
+        # Display overview items using pad with colors
+        if self.pad_stale:
+            # Clear pad and draw all overview items with colors
+            # Size the pad to the items, but never shorter than the viewport so it covers old rows
+            num_rows, num_cols = self.screen.getmaxyx()
+            fit_pad(self.overview_pad, max(len(self.overview_items), num_rows - 4 - 2))
+            self.overview_pad.erase()
+            for idx in range(len(self.overview_items)):
+                self._draw_overview_row(idx)
+            if self.data_pending:
+                self.overview_pad.addstr(0, 0, PLACEHOLDER)
+            self.pad_stale = False
+        elif self.painted_selected != self.overview_selected:
+            # Only the previously and newly selected rows look different
+            self._draw_overview_row(self.painted_selected)
+            self._draw_overview_row(self.overview_selected)
+        self.painted_selected = self.overview_selected
 
-                try:
-                    self.overview_pad.addstr(idx, 0, text, attr)
-                except:
-                    pass
+        if self.overview_items:
+            num_rows, num_cols = self.screen.getmaxyx()
 
             # Calculate viewport dimensions
             viewport_height = num_rows - 4 - 2
-            viewport_width = num_cols - 20 - 2
 
             # Adjust scroll offset to keep selected item visible
             if self.overview_selected < self.scroll_offset:
@@ -356,48 +433,49 @@ class Overview(Scene):
             max_scroll = max(0, len(self.overview_items) - viewport_height)
             self.scroll_offset = max(0, min(self.scroll_offset, max_scroll))
 
-        return None
-
     def render(self):
-        self.screen.clear()
-        self.screen.refresh()
+        self.begin_render()
         self.search_window.refresh()
         self.sort_window.refresh()
         self.overview_border.refresh()
         self.help_window.refresh()
 
-        # Refresh pad to show visible portion
+        # Refresh pad to show visible portion, even when empty so old rows are cleared
         num_rows, num_cols = self.screen.getmaxyx()
-        if self.overview_items:
-            # Calculate viewport coordinates
-            pad_top = self.scroll_offset
-            pad_left = 0
-            screen_top = 3 + 1
-            screen_left = 20 + 1
-            screen_bottom = num_rows - 1 - 1 - 1
-            screen_right = num_cols - 1 - 1
-
-            self.overview_pad.refresh(
-                pad_top, pad_left,
-                screen_top, screen_left,
-                screen_bottom, screen_right
-            )
 
-    def on_enter(self):
-        # Refresh available periods in case new budgets were added
-        old_periods = self.available_periods
-        self.available_periods = self._get_available_periods()
+        # Calculate viewport coordinates
+        pad_top = self.scroll_offset
+        pad_left = 0
+        screen_top = 3 + 1
+        screen_left = 20 + 1
+        screen_bottom = num_rows - 1 - 1 - 1
+        screen_right = num_cols - 1 - 1
 
-        # If periods changed, adjust current index
-        if old_periods != self.available_periods:
-            if not self.available_periods:
+        self.overview_pad.refresh(
+            pad_top, pad_left,
+            screen_top, screen_left,
+            screen_bottom, screen_right
+        )
+
+    def on_enter(self):
+        # Refresh available periods only if budgets were added or removed
+        if self.periods_stale:
+            current_period = self._get_current_period()
+            self.available_periods = self._get_available_periods()
+            self.periods_stale = False
+
+            # Keep showing the same period if it still exists, otherwise adjust current index
+            if current_period in self.available_periods:
+                self.current_period_index = self.available_periods.index(current_period)
+            elif not self.available_periods:
                 self.current_period_index = -1
             elif self.current_period_index >= len(self.available_periods):
                 self.current_period_index = len(self.available_periods) - 1
             elif self.current_period_index < 0:
                 self.current_period_index = 0
+            self.invalidate(data=True)
 
-        self.needs_render = True
+        super().on_enter()
 
     def on_exit(self):
         super().on_exit()
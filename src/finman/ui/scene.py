@@ -1,49 +1,177 @@
 import curses # imports curses a barebones highly portable tui library
+import time
+from finman.util.profiler import PROFILER
+from finman.logic.financial_data import FinancialData
+from finman.util.tasks import TASKS
+
+# Undo and redo the latest ledger change from any scene. Ctrl+Z is left to
+# the terminal, which suspends finman with it
+UNDO_KEY = 21  # Ctrl+U
+REDO_KEY = 18  # Ctrl+R
 
 class Scene():
+    # Seconds a changed search waits for typing to pause before it is
+    # evaluated, set from --search-delay. 0 evaluates every keystroke
+    search_delay = 0.15
+
     def __init__(self,screen,pred_scene):
         self.change_scene = None
         self.pred_scene = pred_scene
         self.screen = screen
         self.needs_render = True  # Flag to track if rendering is needed
+
+        # Invalidation flags for the update phases, every phase starts stale.
+        # data: the model changed, query: search/sort/period changed,
+        # layout: the terminal was resized or the scene was (re)entered,
+        # selection: the cursor or scroll position moved
+        self.data_dirty = True
+        self.query_dirty = True
+        self.layout_dirty = True
+        self.selection_dirty = True
+        # Set when the layout phase ran so render() repaints the whole terminal
+        self.full_repaint = True
         pass
 
+    def invalidate(self, data=False, query=False, layout=False, selection=False):
+        """Mark update phases as stale so the next update() re-runs them."""
+        self.data_dirty = self.data_dirty or data
+        self.query_dirty = self.query_dirty or query
+        self.layout_dirty = self.layout_dirty or layout
+        self.selection_dirty = self.selection_dirty or selection
+        self.needs_render = True
+
+    def defer_query(self):
+        """Re-run the query phase once no key changed the search for search_delay seconds.
+
+        Keystrokes only echo the search text meanwhile, so typing a word
+        evaluates the search once instead of once per character.
+        """
+        if self.search_delay <= 0:
+            self.invalidate(query=True)
+        else:
+            TASKS.debounce(self._search_key(), self.search_delay, lambda: self.invalidate(query=True))
+
+    def flush_query(self):
+        """Evaluate a deferred search right away, False if none is waiting."""
+        if not self.search_pending():
+            return False
+        TASKS.cancel(self._search_key())
+        self.invalidate(query=True)
+        return True
+
+    def search_pending(self):
+        """True while a deferred search waits for the typing pause."""
+        return TASKS.pending(self._search_key())
+
+    def _search_key(self):
+        return f"{type(self).__name__.lower()}.search"
+
     def handle_input(self,input):
         pass
 
-    def update(self):
+    def update_data(self):
+        """Phase 1: reload whatever the scene derives from the model."""
+        pass
+
+    def update_layout(self):
+        """Phase 2: resize and move windows and draw static chrome."""
+        pass
+
+    def update_query(self):
+        """Phase 3: re-sort and re-filter the scene's items."""
+        pass
+
+    def update_selection(self):
+        """Phase 4: paint items, the cursor and the scroll position."""
         pass
 
+    def update(self):
+        if self.change_scene:
+            return self.change_scene
+
+        # Each phase only runs when it is stale, a stale phase makes the
+        # phases that depend on it stale as well
+        if self.data_dirty:
+            self.update_data()
+            self.query_dirty = True
+        if self.layout_dirty:
+            self.update_layout()
+            self.selection_dirty = True
+            self.full_repaint = True
+        if self.query_dirty:
+            self.update_query()
+            self.selection_dirty = True
+        if self.selection_dirty:
+            self.update_selection()
+
+        self.data_dirty = False
+        self.query_dirty = False
+        self.layout_dirty = False
+        self.selection_dirty = False
+        return None
+
     def render(self):
         pass
 
+    def begin_render(self):
+        """Clear the terminal, but only on frames where the layout was rebuilt."""
+        if self.full_repaint:
+            self.screen.clear()
+            self.screen.refresh()
+            self.full_repaint = False
+
     def full_pass(self,input):
+        frame_start = time.perf_counter() if PROFILER.enabled else 0
+
         # Only process input and mark for render if there's actual input
         if input != -1:  # -1 means no input (nodelay mode)
             # Handle terminal resize
             if input == curses.KEY_RESIZE:
-                self.needs_render = True
+                self.invalidate(layout=True)
+            elif input == curses.KEY_F12 and PROFILER.enabled:
+                PROFILER.toggle_overlay()
+                # Repaint whatever the overlay was covering
+                self.invalidate(layout=True)
+            elif input in (UNDO_KEY, REDO_KEY):
+                with PROFILER.phase("input"):
+                    findata = FinancialData()
+                    changed = findata.redo() if input == REDO_KEY else findata.undo()
+                if changed:
+                    # Subscribed scenes were invalidated by the change event, entering
+                    # again also picks up budget periods the change added or removed
+                    self.on_enter()
+                else:
+                    try:
+                        curses.beep()  # Nothing left to undo or redo
+                    except:
+                        pass
             else:
-                self.handle_input(input)
+                with PROFILER.phase("input"):
+                    self.handle_input(input)
                 self.needs_render = True
 
         # Only update and render when needed
         scene = None
         if self.needs_render or self.change_scene is not None:
-            scene = self.update()
+            with PROFILER.phase("update"):
+                scene = self.update()
             if self.needs_render:
-                self.render()
+                with PROFILER.phase("render"):
+                    self.render()
                 self.needs_render = False
+                if PROFILER.enabled:
+                    PROFILER.record_frame(time.perf_counter() - frame_start)
+                    if PROFILER.overlay_visible:
+                        PROFILER.draw_overlay(self.screen)
 
         return scene
 
     def on_enter(self):
-        self.needs_render = True  # Force render when entering scene
+        # Another scene drew over the terminal, so rebuild the layout. Scenes
+        # showing ledger data subscribe to FinancialData to invalidate it
+        self.invalidate(layout=True)
         pass
 
     def on_exit(self):
         self.change_scene = None
         pass
-
-
-
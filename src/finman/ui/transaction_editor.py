@@ -2,7 +2,12 @@ import curses
 from finman.ui.scene import Scene
 from finman.util.dialog import Dialog
 from finman.logic.financial_data import FinancialData
-from datetime import datetime
+from finman.logic.recurring import SCHEDULES, parse_date
+from finman.util.tasks import TASKS, BACKGROUND_THRESHOLD
+from datetime import date, datetime
+
+# Choices of the repeat field, anything but "never" saves a recurring rule
+REPEAT_OPTIONS = ["never"] + SCHEDULES
 
 
 class TransactionEditor(Scene):
@@ -20,6 +25,9 @@ class TransactionEditor(Scene):
 
         # Field names and current field index
         self.field_names = ["year", "month", "day", "amount", "description", "tag", "subtag"]
+        if mode == "add":
+            # New transactions can repeat, edits always apply to a single transaction
+            self.field_names += ["repeat", "until"]
         self.current_field = 0
 
         # Initialize field values
@@ -44,10 +52,18 @@ class TransactionEditor(Scene):
                 "amount": "",
                 "description": "",
                 "tag": "",
-                "subtag": ""
+                "subtag": "",
+                "repeat": "never",
+                "until": ""
             }
             self.transaction_id = self._generate_transaction_id()
 
+        # Set while the tag fields hold a suggestion for the description rather than a choice
+        self.tag_suggested = False
+        if mode == "add" and self.findata.get_transaction_count() > BACKGROUND_THRESHOLD:
+            # Learning the tags of a large ledger takes a moment, do it while the date is entered
+            TASKS.submit("editor.categorizer", self._load_categorizer, callback=self._on_categorizer_done)
+
         # Get available tags from budgets
         self.available_tags = self._get_available_tags()
         self.tag_selected_index = 0
@@ -72,25 +88,51 @@ class TransactionEditor(Scene):
             counter += 1
 
     def _get_available_tags(self):
-        """Get list of available tags from all budgets."""
-        tags = {}
-        for budget in self.findata.get_all_budgets():
-            for tag in budget.get("tags", []):
-                tag_id = tag["id"]
-                if tag_id not in tags:
-                    tags[tag_id] = {
-                        "name": tag["name"],
-                        "subtags": []
-                    }
-                # Collect all possible subtags
-                for subtag in tag.get("subTags", []):
-                    subtag_id = subtag["id"]
-                    if subtag_id not in [st["id"] for st in tags[tag_id]["subtags"]]:
-                        tags[tag_id]["subtags"].append({
-                            "id": subtag_id,
-                            "name": subtag["name"]
-                        })
-        return tags
+        """Get the tags and subtags of all budgets from the ledger's tag catalog."""
+        return self.findata.get_tag_catalog()
+
+    def _generate_rule_id(self):
+        """Generate a unique recurring rule ID."""
+        existing_ids = [r["id"] for r in self.findata.get_all_rules()]
+        counter = 1
+        while True:
+            new_id = f"rule_{counter:03d}"
+            if new_id not in existing_ids:
+                return new_id
+            counter += 1
+
+    def _is_field_shown(self, field_name):
+        """Subtag is hidden for tags without subtags, until for transactions that don't repeat."""
+        if field_name == "subtag":
+            return bool(self._get_subtag_list())
+        if field_name == "until":
+            return self.fields["repeat"] != "never"
+        return True
+
+    def _load_categorizer(self):
+        with FinancialData._lock:
+            return self.findata.get_categorizer()
+
+    def _on_categorizer_done(self, categorizer):
+        self._suggest_tag()
+        self.invalidate(selection=True)
+
+    def _suggest_tag(self):
+        """Pre-fill the tag fields from the description, unless a tag was picked by hand."""
+        if self.mode != "add" or (self.fields["tag"] and not self.tag_suggested):
+            return
+        if TASKS.pending("editor.categorizer"):
+            return  # Suggested once the categorizer is ready
+        category = self.findata.suggest_category(self.fields["description"])
+        if category is not None and category[0] in self.available_tags:
+            self.fields["tag"] = category[0]
+            subtags = self.available_tags[category[0]]["subtags"]
+            self.fields["subtag"] = category[1] if category[1] in subtags else ""
+            self.tag_suggested = True
+        elif self.tag_suggested:
+            # The description no longer suggests anything
+            self.fields["tag"] = self.fields["subtag"] = ""
+            self.tag_suggested = False
 
     def _get_tag_list(self):
         """Get list of tag IDs."""
@@ -100,11 +142,13 @@ class TransactionEditor(Scene):
         """Get list of subtag IDs for currently selected tag."""
         current_tag = self.fields.get("tag", "")
         if current_tag and current_tag in self.available_tags:
-            return [st["id"] for st in self.available_tags[current_tag]["subtags"]]
+            return list(self.available_tags[current_tag]["subtags"].keys())
         return []
 
     def handle_input(self, input):
         field_name = self.field_names[self.current_field]
+        # Every key moves between or edits fields, so the form has to be redrawn
+        self.invalidate(selection=True)
 
         # Mouse handling
         if input == curses.KEY_MOUSE:
@@ -120,7 +164,7 @@ class TransactionEditor(Scene):
                     # Map row to field index, accounting for skipped fields
                     field_row = 0
                     for i, fname in enumerate(self.field_names):
-                        if fname == "subtag" and not self._get_subtag_list():
+                        if not self._is_field_shown(fname):
                             continue
                         if field_row == rel_y:
                             self.current_field = i
@@ -131,15 +175,15 @@ class TransactionEditor(Scene):
         # Up arrow: move to previous field
         elif input == curses.KEY_UP:
             self.current_field = (self.current_field - 1) % len(self.field_names)
-            # Skip subtag field if current tag has no subtags
-            if self.field_names[self.current_field] == "subtag" and not self._get_subtag_list():
+            # Skip hidden fields, like subtag when the current tag has no subtags
+            while not self._is_field_shown(self.field_names[self.current_field]):
                 self.current_field = (self.current_field - 1) % len(self.field_names)
 
         # Down arrow: move to next field
         elif input == curses.KEY_DOWN:
             self.current_field = (self.current_field + 1) % len(self.field_names)
-            # Skip subtag field if current tag has no subtags
-            if self.field_names[self.current_field] == "subtag" and not self._get_subtag_list():
+            # Skip hidden fields, like subtag when the current tag has no subtags
+            while not self._is_field_shown(self.field_names[self.current_field]):
                 self.current_field = (self.current_field + 1) % len(self.field_names)
 
         # Enter: save transaction
@@ -152,6 +196,8 @@ class TransactionEditor(Scene):
 
         # For tag and subtag fields: use left/right to cycle options
         elif field_name == "tag":
+            if input in (curses.KEY_LEFT, curses.KEY_RIGHT):
+                self.tag_suggested = False
             if input == curses.KEY_LEFT:
                 tag_list = self._get_tag_list()
                 if tag_list:
@@ -176,6 +222,8 @@ class TransactionEditor(Scene):
                     self.fields["subtag"] = ""  # Reset subtag when tag changes
 
         elif field_name == "subtag":
+            if input in (curses.KEY_LEFT, curses.KEY_RIGHT):
+                self.tag_suggested = False
             if input == curses.KEY_LEFT:
                 subtag_list = self._get_subtag_list()
                 if subtag_list:
@@ -197,13 +245,21 @@ class TransactionEditor(Scene):
                         idx = 0
                     self.fields["subtag"] = subtag_list[idx]
 
+        elif field_name == "repeat":
+            if input in (curses.KEY_LEFT, curses.KEY_RIGHT):
+                step = 1 if input == curses.KEY_RIGHT else -1
+                idx = REPEAT_OPTIONS.index(self.fields["repeat"])
+                self.fields["repeat"] = REPEAT_OPTIONS[(idx + step) % len(REPEAT_OPTIONS)]
+
         # For text input fields: handle characters and backspace
-        elif field_name in ["year", "month", "day", "amount", "description"]:
+        elif field_name in ["year", "month", "day", "amount", "description", "until"]:
             if input in (curses.KEY_BACKSPACE, 127, 8):
                 if self.fields[field_name]:
                     self.fields[field_name] = self.fields[field_name][:-1]
             elif 32 <= input <= 126:  # Printable characters
                 self.fields[field_name] += chr(input)
+            if field_name == "description":
+                self._suggest_tag()
 
     def _save_transaction(self):
         """Validate and save the transaction."""
@@ -254,11 +310,32 @@ class TransactionEditor(Scene):
                 raise ValueError("Amount must be greater than 0")
 
             # Save transaction
-            if self.mode == "add":
-                self.findata.add_transaction(
+            if self.mode == "add" and self.fields["repeat"] != "never":
+                try:
+                    start = date(year, month, day)
+                except ValueError:
+                    raise ValueError("Date must be a valid date to repeat from")
+                until = self.fields["until"]
+                if until:
+                    parse_date(until)
+                self.findata.add_rule(
+                    self._generate_rule_id(), amount, description, tag_id, subtag_id,
+                    start.isoformat(), schedule=self.fields["repeat"], end=until or None
+                )
+            elif self.mode == "add":
+                duplicates = self.findata.add_transaction(
                     self.transaction_id, year, month, day,
                     amount, description, tag_id, subtag_id
                 )
+                if duplicates:
+                    # Added anyway, the user can remove it from the Duplicates review
+                    self.change_scene = Dialog(
+                        self.screen, self.pred_scene,
+                        message=f"Possible duplicate of {', '.join(duplicates)}, same date, amount and description",
+                        options=["OK"],
+                        portion=4
+                    )
+                    return
             else:  # edit mode
                 self.findata.edit_transaction(
                     self.transaction_id,
@@ -280,10 +357,7 @@ class TransactionEditor(Scene):
                 message_color="error"
             )
 
-    def update(self):
-        if self.change_scene:
-            return self.change_scene
-
+    def update_layout(self):
         num_rows, num_cols = self.screen.getmaxyx()
         popup_height = min(20, num_rows - 4)
         popup_width = min(60, num_cols - 4)
@@ -293,7 +367,10 @@ class TransactionEditor(Scene):
         # Resize and reposition popup
         self.popup_window.resize(popup_height, popup_width)
         self.popup_window.mvwin(start_y, start_x)
-        self.popup_window.clear()
+
+    def update_selection(self):
+        popup_height, popup_width = self.popup_window.getmaxyx()
+        self.popup_window.erase()
         self.popup_window.box()
 
         # Title
@@ -303,8 +380,8 @@ class TransactionEditor(Scene):
         # Display fields
         row = 3
         for i, field_name in enumerate(self.field_names):
-            # Skip subtag if no subtags available
-            if field_name == "subtag" and not self._get_subtag_list():
+            # Skip fields that don't apply, like subtag if no subtags are available
+            if not self._is_field_shown(field_name):
                 continue
 
             # Field label
@@ -315,6 +392,8 @@ class TransactionEditor(Scene):
                 tag_id = self.fields.get("tag", "")
                 if tag_id and tag_id in self.available_tags:
                     value = f"{tag_id} ({self.available_tags[tag_id]['name']})"
+                    if self.tag_suggested:
+                        value += " - suggested"
                 else:
                     value = "(select with ←/→)" if not tag_id else tag_id
             elif field_name == "subtag":
@@ -322,13 +401,17 @@ class TransactionEditor(Scene):
                 current_tag = self.fields.get("tag", "")
                 if subtag_id and current_tag in self.available_tags:
                     subtags = self.available_tags[current_tag]["subtags"]
-                    subtag_obj = next((st for st in subtags if st["id"] == subtag_id), None)
+                    subtag_obj = subtags.get(subtag_id)
                     if subtag_obj:
                         value = f"{subtag_id} ({subtag_obj['name']})"
                     else:
                         value = subtag_id
                 else:
                     value = "(optional, use ←/→)"
+            elif field_name == "repeat":
+                value = f"{self.fields['repeat']} (use ←/→)"
+            elif field_name == "until":
+                value = self.fields["until"] or "(optional, YYYY-MM-DD)"
             else:
                 value = self.fields.get(field_name, "")
 
@@ -343,15 +426,12 @@ class TransactionEditor(Scene):
             row += 1
 
         # Instructions
-        instructions = "↑/↓: Navigate | ←/→: Select tag/subtag | Enter: Save | Esc: Cancel"
+        instructions = "↑/↓: Navigate | ←/→: Select tag/subtag/repeat | Enter: Save | Esc: Cancel"
         if row < popup_height - 2:
             self.popup_window.addstr(popup_height - 2, 2, instructions[:popup_width - 4])
 
-        return None
-
     def render(self):
-        self.screen.clear()
-        self.screen.refresh()
+        self.begin_render()
         self.popup_window.refresh()
 
     def on_enter(self):
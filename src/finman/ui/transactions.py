@@ -1,10 +1,24 @@
 import curses # imports curses, a barebones highly portable tui library
 from curses import textpad
-from finman.util.menus import build_menu
+from finman.util.menus import build_menu, build_menu_row, fit_pad
 from finman.ui.scene import Scene
 from finman.util.dialog import Dialog
 from finman.ui.transaction_editor import TransactionEditor
 from finman.logic.financial_data import FinancialData
+from finman.logic.transaction_query import SORT_OPTIONS, WINDOW_MONTHS, build_search_index, query_transactions, shift_period
+from finman.logic.fuzzy import SEARCH_MODES
+from finman.util.tasks import TASKS, BACKGROUND_THRESHOLD, PLACEHOLDER
+from finman.util.lru import LRUCache
+from functools import partial
+
+# Sorted, filtered and formatted transactions per query, keyed by the ledger
+# generation so any change to the ledger misses. Kept small, as an entry
+# holds a formatted row for every transaction
+QUERY_CACHE = LRUCache("transactions", maxsize=16)
+
+# Rows painted into the pad at a time around the viewport, curses pads
+# cannot be taller than 32767 rows and painting rows nobody scrolls to is wasted
+PAD_ROWS = 1000
 
 
 
@@ -14,98 +28,96 @@ class Transactions(Scene):
         self.search_window = curses.newwin(3, 1, 0, 0)
         self.search_text = ""
         self.search_active = True
+        self.search_mode = 0  # Index into SEARCH_MODES
+        self.search_index = None  # (transactions, generation, index) of the fuzzy search index
         self.sort_window = curses.newwin(1, 1, 3, 0)
         self.sort_selected = 0
-        self.transactions_pad = curses.newpad(10000, 500)
+        self.transactions_pad = curses.newpad(1, 500)  # Grown to fit the items in update_selection
         self.transactions_border = curses.newwin(1, 1, 3, 21)
         self.transactions_selected = 0
         self.scroll_offset = 0
+        self.pad_base = 0  # Index of the transaction painted on the pad's first row
+        self.windowed = True  # Only the months from window_start on are loaded
+        self.window_start = None  # (year, month), None until the ledger's span is known
+        self.span = None  # (year, month) of the oldest and newest transaction
+        self.anchor = None  # (transaction id, offset) to select once the next query is done
         self.help_window = curses.newwin(1, 1, 0, 0)
-        self.left_options = ["Date-Ascending","Date-Descending","Quan-Ascending","Quan-Descending"]
+        self.left_options = SORT_OPTIONS
         self.findata = FinancialData()
+        self.transactions = []
         self.sorted_transactions = []
+        self.formatted_transactions = []
+        self.pad_stale = True  # Whole pad needs repainting, not just the selection
+        self.query_pending = False  # Set while a background task sorts and filters
+        self.data_pending = False  # Set while a background task decompresses archived years
+        self.painted_selected = 0
         self.pending_delete = None
         self.last_dialog = None
+        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+        self.findata.subscribe(self._on_data_changed)
         pass
 
-    def _get_sorted_transactions(self):
-        """Get transactions sorted based on current sort selection."""
-        transactions = self.findata.get_all_transactions()
-
-        if self.sort_selected == 0:  # Date-Ascending
-            return sorted(transactions, key=lambda t: (t['year'], t['month'], t['day']))
-        elif self.sort_selected == 1:  # Date-Descending
-            return sorted(transactions, key=lambda t: (t['year'], t['month'], t['day']), reverse=True)
-        elif self.sort_selected == 2:  # Quan-Ascending
-            return sorted(transactions, key=lambda t: t['amount'])
-        elif self.sort_selected == 3:  # Quan-Descending
-            return sorted(transactions, key=lambda t: t['amount'], reverse=True)
-
-        return transactions
-
-    def _format_transaction(self, transaction):
-        """Format a transaction for display."""
-        date = f"{transaction['year']}-{transaction['month']:02d}-{transaction['day']:02d}"
-        amount = f"${transaction['amount']:.2f}"
-        description = transaction['description']
-        tag = transaction.get('tagId', '')
-        subtag = transaction.get('subtagId', '')
-
-        # Format tags
-        if subtag:
-            tags = f"#{tag}/{subtag}"
-        else:
-            tags = f"#{tag}"
-
-        return f"{date} | {amount:>10} | {description} {tags}"
-
-    def _filter_by_search(self, transactions):
-        """Filter transactions based on search text."""
-        if not self.search_text:
-            return transactions
-
-        search_lower = self.search_text.lower()
-        filtered = []
-
-        # Check if searching by tag (#tag or #tag/subtag)
-        if search_lower.startswith('#'):
-            tag_search = search_lower[1:]  # Remove the #
-
-            for transaction in transactions:
-                tag = transaction.get('tagId', '').lower()
-                subtag = transaction.get('subtagId', '').lower() if transaction.get('subtagId') else ''
-
-                # Check if matches tag or tag/subtag format
-                if '/' in tag_search:
-                    # Searching for specific tag/subtag
-                    if tag_search == f"{tag}/{subtag}":
-                        filtered.append(transaction)
-                else:
-                    # Searching for just tag
-                    if tag_search in tag or tag_search in subtag:
-                        filtered.append(transaction)
-            return filtered
-
-        # Regular search (non-tag)
-        for transaction in transactions:
-            # Check if search text appears in description
-            if search_lower in transaction['description'].lower():
-                filtered.append(transaction)
-                continue
-
-            # Check if search text appears in date
-            date = f"{transaction['year']}-{transaction['month']:02d}-{transaction['day']:02d}"
-            if search_lower in date:
-                filtered.append(transaction)
-                continue
-
-            # Check if search text appears in amount
-            amount = f"{transaction['amount']:.2f}"
-            if search_lower in amount:
-                filtered.append(transaction)
-                continue
-
-        return filtered
+    def _on_data_changed(self, event):
+        """Reload the ledger only when a transaction, recurring rule or archived year changed."""
+        if event.is_transaction_change() or event.is_rule_change() or event.is_archive_change():
+            self.invalidate(data=True)
+
+    def _load_transactions(self):
+        """Every transaction on the task pool, the ledger lock keeps mutations out meanwhile."""
+        with FinancialData._lock:
+            return self.findata.get_all_transactions()
+
+    def _on_transactions_loaded(self, transactions):
+        self.transactions = transactions
+        self.data_pending = False
+        self.invalidate(query=True)
+
+    def _on_query_done(self, key, result):
+        """Show the sorted, filtered and formatted transactions of a query."""
+        QUERY_CACHE.put(key, result)
+        self.sorted_transactions, self.formatted_transactions = result
+        self.query_pending = False
+        self.pad_stale = True
+        if self.anchor is not None:
+            # Keep the cursor where it was before the window grew
+            transaction_id, offset = self.anchor
+            self.anchor = None
+            for i, transaction in enumerate(self.sorted_transactions):
+                if transaction["id"] == transaction_id:
+                    self.transactions_selected = max(0, i + offset)
+                    break
+        self.invalidate(selection=True)
+
+    def _extend_window(self, edge):
+        """Load WINDOW_MONTHS older months once the cursor moves past the edge transaction."""
+        if not self.windowed or self.window_start is None or self.window_start <= self.span[0]:
+            return False
+        self.window_start = max(self.span[0], shift_period(self.window_start, -WINDOW_MONTHS))
+        # Older transactions are listed above the edge when sorted by ascending date
+        self.anchor = (self.sorted_transactions[edge]["id"], -1 if edge == 0 else 1)
+        self.invalidate(data=True)
+        return True
+
+    def _on_index_done(self, transactions, generation, index):
+        self.search_index = (transactions, generation, index)
+        self.invalidate(query=True)
+
+    def _fuzzy_index(self):
+        """Trigram index of the loaded transactions, or None while it is being built."""
+        generation = self.findata.generation
+        if self.search_index is not None:
+            transactions, indexed_generation, index = self.search_index
+            if transactions is self.transactions and indexed_generation == generation:
+                return index
+        if len(self.transactions) > BACKGROUND_THRESHOLD:
+            # Built once per ledger change, further keystrokes wait for it
+            if not TASKS.pending("transactions.index"):
+                TASKS.submit("transactions.index", build_search_index, list(self.transactions),
+                             callback=partial(self._on_index_done, self.transactions, generation))
+            return None
+        index = build_search_index(self.transactions)
+        self.search_index = (self.transactions, generation, index)
+        return index
 
     def handle_input(self,input):
         # Mouse handling
@@ -121,6 +133,7 @@ class Transactions(Scene):
                     rel_y = my - sort_y - 1  # -1 for border
                     if 0 <= rel_y < len(self.left_options):
                         self.sort_selected = rel_y
+                        self.invalidate(query=True)
 
                 # Check click in transactions area (right panel)
                 trans_y, trans_x = self.transactions_border.getbegyx()
@@ -132,6 +145,7 @@ class Transactions(Scene):
                     clicked_index = rel_y + self.scroll_offset
                     if 0 <= clicked_index < len(self.sorted_transactions):
                         self.transactions_selected = clicked_index
+                        self.invalidate(selection=True)
                         # Double-click to edit
                         if bstate & curses.BUTTON1_DOUBLE_CLICKED:
                             selected_transaction = self.sorted_transactions[self.transactions_selected]
@@ -141,15 +155,24 @@ class Transactions(Scene):
         # Tab: cycle forward through sort options
         elif input == 9:  # Tab
             self.sort_selected = (self.sort_selected + 1) % len(self.left_options)
+            self.invalidate(query=True)
         # Shift+Tab: cycle backward through sort options
         elif input == 353:  # Shift+Tab (curses.KEY_BTAB)
             self.sort_selected = (self.sort_selected - 1) % len(self.left_options)
+            self.invalidate(query=True)
+        # Ctrl+F: switch between exact and fuzzy search
+        elif input == 6:  # Ctrl+F
+            self.search_mode = (self.search_mode + 1) % len(SEARCH_MODES)
+            self.invalidate(query=True)
         # 'a' key: Add new transaction
         elif input == ord('a'):
             self.change_scene = TransactionEditor(self.screen, self, mode="add")
         # Enter key: Edit selected transaction
         elif input == curses.KEY_ENTER or input == 10 or input == 13:
-            if self.sorted_transactions and self.transactions_selected < len(self.sorted_transactions):
+            # Enter while typing evaluates the search instead of editing a stale selection
+            if self.flush_query():
+                pass
+            elif self.sorted_transactions and self.transactions_selected < len(self.sorted_transactions):
                 selected_transaction = self.sorted_transactions[self.transactions_selected]
                 self.change_scene = TransactionEditor(self.screen, self, mode="edit", transaction=selected_transaction)
         # Ctrl+D: Delete selected transaction
@@ -174,82 +197,157 @@ class Transactions(Scene):
         elif input in (curses.KEY_BACKSPACE, 127, 8):
             if self.search_text:
                 self.search_text = self.search_text[:-1]
+                self._draw_header()
+                self.defer_query()
         # Navigation controls for transactions
         elif input == curses.KEY_UP:
-            self.transactions_selected = max(0, self.transactions_selected - 1)
+            # Oldest first, scrolling past the top loads earlier months
+            if not (self.sort_selected == 0 and self.transactions_selected == 0 and self.sorted_transactions
+                    and not self.query_pending and self._extend_window(0)):
+                self.transactions_selected = max(0, self.transactions_selected - 1)
+                self.invalidate(selection=True)
         elif input == curses.KEY_DOWN:
-            # Bounds checking happens in update()
-            self.transactions_selected += 1
+            # Otherwise scrolling past the bottom does
+            last = len(self.sorted_transactions) - 1
+            if not (self.sort_selected != 0 and self.transactions_selected == last and last >= 0
+                    and not self.query_pending and self._extend_window(last)):
+                # Bounds checking happens in update_selection()
+                self.transactions_selected += 1
+                self.invalidate(selection=True)
+        # Ctrl+W: switch between the window of recent months and every transaction
+        elif input == 23:
+            self.windowed = not self.windowed
+            self.window_start = None
+            self.invalidate(data=True)
         # Printable characters: add to search text
         elif 32 <= input <= 126:  # Printable ASCII characters
             self.search_text += chr(input)
-
-    def update(self):
-        if self.change_scene:
-            scene = self.change_scene
-            return scene
-
-        # Get sorted and filtered transactions
-        sorted_trans = self._get_sorted_transactions()
-        self.sorted_transactions = self._filter_by_search(sorted_trans)
-        formatted_transactions = [self._format_transaction(t) for t in self.sorted_transactions]
-
-        # Keep transactions_selected within bounds
-        if formatted_transactions:
-            self.transactions_selected = max(0, min(self.transactions_selected, len(formatted_transactions) - 1))
+            self._draw_header()
+            self.defer_query()
+
+    def update_data(self):
+        if self.windowed:
+            # Only the window is read from the date index, older months are loaded as the list is scrolled
+            TASKS.cancel("transactions.data")
+            self.data_pending = False
+            self.span = self.findata.get_transaction_span()
+            if self.span is None:
+                self.window_start = None
+                self.transactions = []
+                return
+            if self.window_start is None:
+                self.window_start = max(self.span[0], shift_period(self.span[1], 1 - WINDOW_MONTHS))
+            # The window always reaches the newest transaction, even one added since
+            self.transactions = self.findata.get_transactions_between(self.window_start, self.span[1])
+        elif self.findata.has_unloaded_archives():
+            # Archived years are decompressed once per session, off the main thread
+            self.transactions = []
+            self.data_pending = True
+            TASKS.submit("transactions.data", self._load_transactions, callback=self._on_transactions_loaded)
         else:
-            self.transactions_selected = 0
+            TASKS.cancel("transactions.data")
+            self.data_pending = False
+            self.transactions = self.findata.get_all_transactions()
+
+    def update_query(self):
+        if self.data_pending:
+            # The query runs again once the transactions are loaded
+            TASKS.cancel("transactions.query")
+            self.sorted_transactions, self.formatted_transactions = [], []
+            self.query_pending = True
+            self.pad_stale = True
+            self._draw_header()
+            return
+        fuzzy = (SEARCH_MODES[self.search_mode] == "fuzzy" and bool(self.search_text)
+                 and not self.search_text.startswith('#'))
+        window = self.window_start if self.windowed else None
+        key = (self.findata.file_path, self.findata.generation, window, self.sort_selected, self.search_text, fuzzy)
+        cached = QUERY_CACHE.get(key)
+        index = self._fuzzy_index() if fuzzy and cached is None else None
+        if cached is not None:
+            TASKS.cancel("transactions.query")
+            self._on_query_done(key, cached)
+        elif fuzzy and index is None:
+            # The index is still being built, its callback queries again
+            TASKS.cancel("transactions.query")
+            self.sorted_transactions, self.formatted_transactions = [], []
+            self.query_pending = True
+            self.pad_stale = True
+        elif len(self.transactions) > BACKGROUND_THRESHOLD:
+            # Large ledgers are sorted on the task pool so typing stays responsive,
+            # a newer query replaces the pending one
+            self.sorted_transactions, self.formatted_transactions = [], []
+            self.query_pending = True
+            self.pad_stale = True
+            TASKS.submit("transactions.query", query_transactions, list(self.transactions),
+                         self.sort_selected, self.search_text, index, callback=partial(self._on_query_done, key))
+        else:
+            TASKS.cancel("transactions.query")
+            self._on_query_done(key, query_transactions(self.transactions, self.sort_selected, self.search_text, index))
+        self._draw_header()
 
+    def update_layout(self):
         num_rows, num_cols = self.screen.getmaxyx()
 
         # Search bar at top: 3 rows, full width
         self.search_window.resize(3, num_cols)
         self.search_window.mvwin(0, 0)
-        self.search_window.clear()
-        self.search_window.box()
-
-        # Display search text and sort mode in search bar
-        sort_mode = self.left_options[self.sort_selected]
-        search_display = f"Search: {self.search_text}" if self.search_text else "Search: (type to filter)"
-        status = f"Sort: {sort_mode}"
-
-        self.search_window.addstr(1, 2, search_display[:num_cols - 4])
-        if len(status) < num_cols - 4:
-            self.search_window.addstr(1, num_cols - len(status) - 2, status)
 
         # Help window at bottom
-        help_text = "a: Add | Enter: Edit | Ctrl+D: Delete | Tab: Sort | Type: Search | #tag: Filter | Esc: Back"
+        help_text = "a: Add | Enter: Edit | Ctrl+D: Delete | Tab: Sort | Type: Search | Ctrl+F: Fuzzy | #tag: Filter | Ctrl+W: All/Recent | Esc: Back"
         self.help_window.resize(1, num_cols)
         self.help_window.mvwin(num_rows - 1, 0)
-        self.help_window.clear()
+        self.help_window.erase()
         self.help_window.addstr(0, 2, help_text[:num_cols - 4])
 
         # Sort window below search bar: left side, 20 columns (leave space for help bar)
         self.sort_window.resize(num_rows - 4, 20)
         self.sort_window.mvwin(3, 0)
-        self.sort_window.clear()
-        self.sort_window.box()
 
         # Transactions border window below search bar: right side, remaining width (leave space for help bar)
         self.transactions_border.resize(num_rows - 4, num_cols - 20)
         self.transactions_border.mvwin(3, 20)
-        self.transactions_border.clear()
+        self.transactions_border.erase()
         self.transactions_border.box()
 
-        curses.init_pair(1, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+        self._draw_header()
+        # The pad content is still valid, it only has to be copied to the terminal again
+        self.transactions_pad.touchwin()
+
+    def _draw_header(self):
+        """Draw the search bar and sort menu, which reflect the current query."""
+        num_rows, num_cols = self.screen.getmaxyx()
+        self.search_window.erase()
+        self.search_window.box()
 
+        # Display search text and sort mode in search bar
+        sort_mode = self.left_options[self.sort_selected]
+        search_label = "Fuzzy search" if SEARCH_MODES[self.search_mode] == "fuzzy" else "Search"
+        search_display = f"{search_label}: {self.search_text}" if self.search_text else f"{search_label}: (type to filter)"
+        status = f"Sort: {sort_mode}"
+        if self.windowed and self.window_start is not None:
+            status = f"From {self.window_start[0]}-{self.window_start[1]:02d} | {status}"
+
+        self.search_window.addstr(1, 2, search_display[:num_cols - 4])
+        if len(status) < num_cols - 4:
+            self.search_window.addstr(1, num_cols - len(status) - 2, status)
+
+        self.sort_window.erase()
+        self.sort_window.box()
         build_menu(self.sort_window, self.left_options, self.sort_selected, row_off=1, col_off=1)
 
-        # Display transactions using pad
-        if formatted_transactions:
-            # Clear pad and draw all transactions
-            self.transactions_pad.clear()
-            build_menu(self.transactions_pad, formatted_transactions, self.transactions_selected, row_off=0, col_off=0)
+    def update_selection(self):
+        formatted_transactions = self.formatted_transactions
+        num_rows, num_cols = self.screen.getmaxyx()
+        viewport_height = num_rows - 4 - 2  # Screen height - top bar - help bar - borders
 
-            # Calculate viewport dimensions (inside border)
-            viewport_height = num_rows - 4 - 2  # Screen height - top bar - help bar - borders
-            viewport_width = num_cols - 20 - 2   # Screen width - left panel - borders
+        # Keep transactions_selected within bounds, a pending query keeps it for its results
+        if formatted_transactions:
+            self.transactions_selected = max(0, min(self.transactions_selected, len(formatted_transactions) - 1))
+        elif not self.query_pending:
+            self.transactions_selected = 0
 
+        if formatted_transactions:
             # Adjust scroll offset to keep selected item visible
             if self.transactions_selected < self.scroll_offset:
                 self.scroll_offset = self.transactions_selected
@@ -260,33 +358,54 @@ class Transactions(Scene):
             max_scroll = max(0, len(formatted_transactions) - viewport_height)
             self.scroll_offset = max(0, min(self.scroll_offset, max_scroll))
 
-        pass
-        return None
+        # The pad holds PAD_ROWS rows, centered on the viewport again once it scrolls past them
+        if not self.pad_base <= self.scroll_offset <= self.pad_base + PAD_ROWS - viewport_height:
+            self.pad_base = max(0, self.scroll_offset - (PAD_ROWS - viewport_height) // 2)
+            self.pad_stale = True
+        rows = formatted_transactions[self.pad_base:self.pad_base + PAD_ROWS]
+        selected = self.transactions_selected - self.pad_base
+
+        # Display transactions using pad
+        if self.pad_stale:
+            # Clear pad and draw the rows it holds
+            # Size the pad to the rows, but never shorter than the viewport so it covers old rows
+            fit_pad(self.transactions_pad, max(len(rows), viewport_height))
+            self.transactions_pad.erase()
+            build_menu(self.transactions_pad, rows, selected, row_off=0, col_off=0)
+            if self.query_pending:
+                self.transactions_pad.addstr(0, 0, PLACEHOLDER)
+            self.pad_stale = False
+        elif self.painted_selected != self.transactions_selected:
+            # Only the previously and newly selected rows look different
+            painted = self.painted_selected - self.pad_base
+            if 0 <= painted < len(rows):
+                build_menu_row(self.transactions_pad, rows, painted, selected)
+            build_menu_row(self.transactions_pad, rows, selected, selected)
+        self.painted_selected = self.transactions_selected
 
     def render(self):
-        self.screen.clear()
-        self.screen.refresh()
+        self.begin_render()
         self.search_window.refresh()
         self.sort_window.refresh()
         self.transactions_border.refresh()
         self.help_window.refresh()
 
-        # Refresh pad to show visible portion
+        # Refresh pad to show visible portion, even when empty so old rows are cleared
         num_rows, num_cols = self.screen.getmaxyx()
-        if self.sorted_transactions:
-            # Calculate viewport coordinates (inside border)
-            pad_top = self.scroll_offset
-            pad_left = 0
-            screen_top = 3 + 1  # Below search bar + border
-            screen_left = 20 + 1  # After sort window + border
-            screen_bottom = num_rows - 1 - 1 - 1  # Bottom of screen - help bar - border
-            screen_right = num_cols - 1 - 1  # Right of screen - border
-
-            self.transactions_pad.refresh(
-                pad_top, pad_left,
-                screen_top, screen_left,
-                screen_bottom, screen_right
-            )
+
+        # Calculate viewport coordinates (inside border)
+        pad_top = self.scroll_offset - self.pad_base
+        pad_left = 0
+        screen_top = 3 + 1  # Below search bar + border
+        screen_left = 20 + 1  # After sort window + border
+        screen_bottom = num_rows - 1 - 1 - 1  # Bottom of screen - help bar - border
+        screen_right = num_cols - 1 - 1  # Right of screen - border
+
+        self.transactions_pad.refresh(
+            pad_top, pad_left,
+            screen_top, screen_left,
+            screen_bottom, screen_right
+        )
 
         pass
 
@@ -294,12 +413,23 @@ class Transactions(Scene):
         # Check if we're returning from a delete confirmation dialog
         if self.pending_delete and self.last_dialog:
             result = self.last_dialog.get_result()
-            if result == "Yes":
-                # Delete the transaction
-                self.findata.remove_transaction(self.pending_delete["id"])
             # Clear pending delete and dialog reference
+            transaction = self.pending_delete
             self.pending_delete = None
             self.last_dialog = None
+            if result == "Yes":
+                # Delete the transaction
+                try:
+                    self.findata.remove_transaction(transaction["id"])
+                except ValueError as e:
+                    # Archived transactions are read-only
+                    self.change_scene = Dialog(
+                        self.screen, self,
+                        message=f"Error: {str(e)}",
+                        options=["OK"],
+                        portion=4,
+                        message_color="error"
+                    )
         super().on_enter()
 
     def on_exit(self):
@@ -44,6 +44,7 @@ class Dialog(Scene):
                     rel_y = my - win_y - 3  # -3 for border and message
                     if self.options and 0 <= rel_y < len(self.options):
                         self.selected = rel_y
+                        self.invalidate(selection=True)
                         # On click, select and confirm
                         if bstate & curses.BUTTON1_CLICKED:
                             self.result = self.options[self.selected]
@@ -59,16 +60,13 @@ class Dialog(Scene):
             # Cycle through options
             if self.options:
                 self.selected = (self.selected + 1) % len(self.options)
+                self.invalidate(selection=True)
         elif input == ord('a'):
             self.change_scene = self.pred_scene
         elif input == 27:  # Escape key
             self.change_scene = self.pred_scene
 
-    def update(self):
-        if self.change_scene:
-            scene = self.change_scene
-            return scene
-
+    def update_layout(self):
         num_rows, num_cols = self.screen.getmaxyx()
         dialog_height = num_rows // self.portion
         dialog_width = num_cols // self.portion
@@ -78,6 +76,7 @@ class Dialog(Scene):
         # Resize and reposition the dialog window
         self.dialog_window.resize(dialog_height, dialog_width)
         self.dialog_window.mvwin(start_y, start_x)
+        self.dialog_window.erase()
 
         # Add a border to the dialog window
         self.dialog_window.box()
@@ -89,20 +88,18 @@ class Dialog(Scene):
             else:
                 self.dialog_window.addstr(1, 2, self.message[:dialog_width - 4])
 
-        # Build menu with options if provided
-        if self.options:
-            build_menu(self.dialog_window, self.options, self.selected, row_off=3, col_off=2)
-
         # Display help text at bottom
         help_text = "Tab: Navigate | Enter: Select | Esc: Cancel"
         if dialog_height > 5:  # Only show if there's room
             self.dialog_window.addstr(dialog_height - 2, 2, help_text[:dialog_width - 4])
 
-        return None
+    def update_selection(self):
+        # Build menu with options if provided
+        if self.options:
+            build_menu(self.dialog_window, self.options, self.selected, row_off=3, col_off=2)
 
     def render(self):
-        self.screen.clear()
-        self.screen.refresh()
+        self.begin_render()
         self.dialog_window.refresh()
 
     def on_enter(self):
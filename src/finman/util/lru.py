@@ -0,0 +1,50 @@
+from collections import OrderedDict
+
+# Every cache created, so their counters can be shown together
+CACHES = []
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry.
+
+    Scenes key their query results by the ledger generation and the query
+    parameters, every ledger mutation bumps the generation so stale entries
+    are never hit again and simply age out.
+    """
+
+    def __init__(self, name, maxsize=64):
+        self.name = name
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        CACHES.append(self)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """Cached value for key, counted as a hit or a miss."""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "maxsize": self.maxsize}
+
+
+def cache_stats():
+    """Counters of every cache by name."""
+    return {cache.name: cache.stats() for cache in CACHES}
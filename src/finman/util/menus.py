@@ -19,3 +19,20 @@ def build_menu(window,elements,selected,border=0,row_cen=0,col_cen=0,row_off=0,c
         else:
             window.addstr(row,col,elements[x])
     pass
+
+def fit_pad(pad,rows,cols=500):
+    # resizes a pad to hold the given number of rows, pads are allocated per cell
+    # so sizing them to their content is much cheaper than a fixed 10000 row pad
+    rows = max(rows,1)
+    if pad.getmaxyx() != (rows,cols):
+        pad.resize(rows,cols)
+
+def build_menu_row(window,elements,x,selected,row_off=0,col_off=0):
+    # redraws a single row of a menu drawn by build_menu, used when only the selection moved
+    row = x + row_off
+    window.move(row,col_off)
+    window.clrtoeol()
+    if x == selected:
+        window.addstr(row,col_off,elements[x],curses.A_STANDOUT)
+    else:
+        window.addstr(row,col_off,elements[x])
@@ -0,0 +1,122 @@
+import curses
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+from finman.util.lru import cache_stats
+
+# Phases timed by the profiler, in the order they run during a frame
+PHASES = ["input", "update", "render", "save"]
+# Number of recent frames kept for the rolling percentiles
+FRAME_WINDOW = 240
+
+
+class Profiler:
+    """Opt-in frame and hot path instrumentation.
+
+    Scene.full_pass and FinancialData report into the shared PROFILER below,
+    which does nothing until enable() is called (finman --profile).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.overlay_visible = False
+        self.frames = deque(maxlen=FRAME_WINDOW)  # Seconds per rendered frame
+        self.last = {phase: 0.0 for phase in PHASES}  # Seconds spent in each phase, most recent call
+        self.totals = {phase: 0.0 for phase in PHASES}
+        self.counts = {phase: 0 for phase in PHASES}
+        self.counters = {"frames": 0, "saves": 0, "bytes_written": 0}
+        self.overlay_window = None
+        self._cprofile = None
+        self._cprofile_path = None
+
+    def enable(self, pstats_path=None):
+        """Start recording, and capture a cProfile of the session if pstats_path is given."""
+        self.enabled = True
+        if pstats_path:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile_path = pstats_path
+            self._cprofile.enable()
+
+    def finish(self):
+        """Stop the cProfile capture and write it to the pstats file."""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self._cprofile_path)
+            self._cprofile = None
+
+    def phase(self, name):
+        """Context manager timing its body as one call of a phase, a no-op while disabled."""
+        if not self.enabled:
+            return _NULL_PHASE
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.last[name] = elapsed
+            self.totals[name] += elapsed
+            self.counts[name] += 1
+
+    def record_frame(self, seconds):
+        self.frames.append(seconds)
+        self.counters["frames"] += 1
+
+    def record_save(self, bytes_written):
+        self.counters["saves"] += 1
+        self.counters["bytes_written"] += bytes_written
+
+    def percentile(self, fraction):
+        """Frame time in seconds at fraction (0.5 = p50) of the recent frames."""
+        if not self.frames:
+            return 0.0
+        ordered = sorted(self.frames)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def overlay_lines(self):
+        ms = lambda seconds: f"{seconds * 1000:.2f}"
+        lines = [
+            f" frame p50 {ms(self.percentile(0.5))}ms p99 {ms(self.percentile(0.99))}ms (n={len(self.frames)}) ",
+            " last " + " ".join(f"{phase} {ms(self.last[phase])}" for phase in PHASES) + " ms ",
+            f" frames {self.counters['frames']} saves {self.counters['saves']} "
+            f"written {self.counters['bytes_written']}B ",
+        ]
+        caches = cache_stats()
+        if caches:
+            # Hits/misses of the scene query caches created so far
+            lines.append(" cache " + " ".join(f"{name} {stats['hits']}/{stats['misses']}"
+                                              for name, stats in caches.items()) + " ")
+        return lines
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+
+    def draw_overlay(self, screen):
+        """Draw the stats box over the top right corner of the terminal."""
+        lines = self.overlay_lines()
+        width = max(len(line) for line in lines)
+        num_rows, num_cols = screen.getmaxyx()
+        if num_cols < width or num_rows < len(lines):
+            return
+        try:
+            if self.overlay_window is None:
+                self.overlay_window = curses.newwin(len(lines), width, 0, num_cols - width)
+            else:
+                self.overlay_window.resize(len(lines), width)
+                self.overlay_window.mvwin(0, num_cols - width)
+            self.overlay_window.erase()
+            for row, line in enumerate(lines):
+                self.overlay_window.insstr(row, 0, line, curses.A_REVERSE)
+            self.overlay_window.touchwin()
+            self.overlay_window.refresh()
+        except:
+            pass
+
+
+_NULL_PHASE = nullcontext()
+PROFILER = Profiler()
@@ -0,0 +1,195 @@
+import curses
+import json
+import time
+
+from finman.util.tasks import TASKS
+
+# Layout of the recording files, bumped when replay can no longer read older ones
+RECORDING_VERSION = 1
+# Seconds between idle frames while replaying at the recorded pace, as napms(8) in the main loop
+FRAME_INTERVAL = 0.008
+# Names of keys in the replay report, curses.keyname() needs a terminal
+SPECIAL_KEYS = {9: "Tab", 10: "Enter", 13: "Enter", 27: "Esc", 32: "Space", 127: "Backspace"}
+CURSES_KEYS = {value: name[4:] for name, value in vars(curses).items()
+               if name.startswith("KEY_") and name not in ("KEY_MIN", "KEY_MAX")}
+
+
+class SessionRecorder:
+    """Writes the input of a TUI session to a file as JSON lines (finman --record).
+
+    The first line describes the session: terminal size, ledger and search
+    delay. Every key after it is a line with its time in seconds since the
+    session started, mouse events carry what getmouse() returned and resizes
+    the new terminal size. Lines are flushed as they are written, so the
+    session leading up to a crash is kept as well.
+    """
+
+    def __init__(self, path, **meta):
+        self.path = path
+        self.meta = meta
+        self.file = None
+        self.start = None
+        self.mouse = None
+        self._getmouse = None
+
+    def begin(self, screen):
+        """Write the header line and start timing, called once the terminal is set up."""
+        self.file = open(self.path, "w")
+        self.start = time.monotonic()
+        rows, cols = screen.getmaxyx()
+        header = {"version": RECORDING_VERSION, "started": time.time(), "rows": rows, "cols": cols}
+        header.update(self.meta)
+        self._write(header)
+        # Scenes read mouse events after the key was recorded, they get the recorded one
+        self._getmouse = curses.getmouse
+        curses.getmouse = self._recorded_mouse
+
+    def record(self, key, screen):
+        event = {"t": round(time.monotonic() - self.start, 4), "key": key}
+        if key == curses.KEY_MOUSE:
+            try:
+                self.mouse = self._getmouse()
+                event["mouse"] = list(self.mouse)
+            except curses.error:
+                self.mouse = None
+        elif key == curses.KEY_RESIZE:
+            event["size"] = list(screen.getmaxyx())
+        self._write(event)
+
+    def _recorded_mouse(self):
+        if self.mouse is None:
+            return self._getmouse()
+        mouse, self.mouse = self.mouse, None
+        return mouse
+
+    def _write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self._getmouse is not None:
+            curses.getmouse = self._getmouse
+            self._getmouse = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_recording(path):
+    """(header, events) of a recording file, raises ValueError when it is not one."""
+    with open(path) as f:
+        try:
+            lines = [json.loads(line) for line in f if line.strip()]
+        except json.JSONDecodeError:
+            lines = []
+    if not lines or not isinstance(lines[0], dict) or lines[0].get("version") != RECORDING_VERSION:
+        raise ValueError(f"'{path}' is not a finman recording of version {RECORDING_VERSION}")
+    return lines[0], lines[1:]
+
+
+def replay(header, events, realtime=True):
+    """Feed recorded events to the scenes on a virtual terminal, returning one result per event.
+
+    With realtime the events arrive at their recorded times and idle frames
+    run in between, as in the TUI. Otherwise they arrive back to back, only
+    waiting for background jobs and debounced searches where the user paused
+    longer than the search delay, so the same results are delivered as in
+    the recording, and the ledger is loaded before the first one.
+
+    Each result holds the seconds the event's frame took and, when the event
+    started background work, the seconds until it was delivered. For a key
+    that deferred a search, that is counted from the frame the search was
+    evaluated in, the typing pause it waited for is not latency.
+    """
+    from finman.logic.financial_data import FinancialData
+    from finman.util.virtual_screen import SceneDriver, virtual_terminal
+
+    pause = header.get("search_delay", 0)
+    results = []
+    with virtual_terminal(header["rows"], header["cols"]) as screen:
+        driver = SceneDriver(screen)
+        loading = FinancialData.preload()
+        if not realtime:
+            loading.join()
+        start = time.perf_counter()
+        try:
+            for index, event in enumerate(events):
+                if driver.exited:
+                    break
+                if realtime:
+                    _idle(driver, results, lambda: time.perf_counter() - start >= event["t"])
+                elif index and event["t"] - events[index - 1]["t"] >= pause:
+                    _idle(driver, results, lambda: not TASKS.busy())
+                if "size" in event:
+                    screen.resize_terminal(*event["size"])
+                if "mouse" in event:
+                    screen.mouse = tuple(event["mouse"])
+                frame_start = time.perf_counter()
+                driver.frame(event["key"])
+                now = time.perf_counter()
+                results.append({"t": event["t"], "key": event["key"], "scene": driver.scene.__class__.__name__,
+                                "frame": now - frame_start, "ready": None if TASKS.busy() else now - frame_start,
+                                "_start": frame_start})
+            _idle(driver, results, lambda: not TASKS.busy())
+        finally:
+            driver.close()
+    for result in results:
+        del result["_start"]
+    return results
+
+
+def _idle(driver, results, done, timeout=30.0):
+    """Run idle frames until done(), noting when the last event's background work was delivered."""
+    deadline = time.perf_counter() + timeout
+    while not done() and not driver.exited and time.perf_counter() < deadline:
+        time.sleep(FRAME_INTERVAL)
+        last = results[-1] if results and results[-1]["ready"] is None else None
+        deferred = last is not None and driver.scene.search_pending()
+        frame_start = time.perf_counter()
+        driver.frame(-1)
+        if deferred and not driver.scene.search_pending():
+            # The typing pause is over, the search is evaluated from this frame on
+            last["_start"] = frame_start
+        if last is not None and not TASKS.busy():
+            last["ready"] = time.perf_counter() - last["_start"]
+
+
+def format_replay(results, events=False):
+    """Text report of replay results, every event with events=True."""
+    lines = []
+    if events:
+        # ready is "-" when the event's background work was still running at the next event
+        for result in results:
+            ready = f"{result['ready'] * 1000:9.2f} ms" if result["ready"] is not None else "-"
+            lines.append(f"{result['t']:9.3f}s  {_key_name(result['key']):>12}  {result['scene']:<18} "
+                         f"frame {result['frame'] * 1000:8.2f} ms  ready {ready}")
+        lines.append("")
+    if not results:
+        return "No events replayed\n"
+    frames = sorted(result["frame"] for result in results)
+    ready = sorted(result["ready"] for result in results if result["ready"] is not None)
+    lines.append(f"{len(results)} events over {results[-1]['t']:.1f} s of recording")
+    lines.append(f"frame: p50 {_percentile(frames, 0.5) * 1000:.2f} ms  p99 {_percentile(frames, 0.99) * 1000:.2f} ms"
+                 f"  max {frames[-1] * 1000:.2f} ms  mean {sum(frames) / len(frames) * 1000:.2f} ms")
+    if ready:
+        lines.append(f"ready: p50 {_percentile(ready, 0.5) * 1000:.2f} ms  p99 {_percentile(ready, 0.99) * 1000:.2f} ms"
+                     f"  max {ready[-1] * 1000:.2f} ms")
+    lines.append("slowest events:")
+    for result in sorted(results, key=lambda r: r["ready"] or r["frame"], reverse=True)[:5]:
+        lines.append(f"  {result['t']:9.3f}s  {_key_name(result['key']):>12}  {result['scene']:<18} "
+                     f"{(result['ready'] or result['frame']) * 1000:.2f} ms")
+    return "\n".join(lines) + "\n"
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _key_name(key):
+    if key in SPECIAL_KEYS:
+        return SPECIAL_KEYS[key]
+    if 32 < key < 127:
+        return chr(key)
+    if 0 < key < 32:
+        return f"Ctrl+{chr(key + 64)}"
+    return CURSES_KEYS.get(key, str(key))
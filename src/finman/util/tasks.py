@@ -0,0 +1,119 @@
+import os
+import queue
+import time
+
+# Scenes hand their work to the pool once the ledger has more transactions
+# than this, smaller ledgers are computed within the frame so they never
+# flash a placeholder
+BACKGROUND_THRESHOLD = 5000
+# Shown by scenes in place of their items while a job is running
+PLACEHOLDER = "Computing…"
+
+
+class TaskExecutor:
+    """Runs jobs off the curses loop and hands their results back to it.
+
+    Jobs are submitted under a key. Submitting again under the same key makes
+    the earlier job stale: it is cancelled if it has not started yet and its
+    result is dropped otherwise. Results are delivered by drain(), which the
+    main loop calls every frame, so callbacks run on the main thread and may
+    touch scene state and curses. Debounced callbacks share the keys and are
+    called by drain() as well.
+    """
+
+    def __init__(self, workers=2, processes=None):
+        self.workers = workers
+        self.processes = processes or os.cpu_count() or 1
+        self._threads = None  # Created on first use, most sessions never need them
+        self._processes = None
+        self._results = queue.Queue()  # (key, job id, future, callback) of finished jobs
+        self._jobs = {}  # Key to (job id, future) of the current job
+        self._timers = {}  # Key to (monotonic due time, callback) of debounced callbacks
+        self._next_id = 0
+
+    def _pool(self, process):
+        # Imported with the first job, they add tens of milliseconds to the TUI start
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        if process:
+            if self._processes is None:
+                import multiprocessing
+                # Spawned rather than forked, a fork would copy the curses state
+                # and any lock a worker thread happened to hold
+                self._processes = ProcessPoolExecutor(max_workers=self.processes,
+                                                      mp_context=multiprocessing.get_context("spawn"))
+            return self._processes
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="finman-task")
+        return self._threads
+
+    def submit(self, key, fn, *args, callback=None, process=False):
+        """Run fn(*args) in the background, replacing any job pending under key.
+
+        Threads suit work that reads the ledger, process=True suits CPU heavy
+        work on picklable arguments, as a process does not share the ledger.
+        callback(result) is called from drain() once the job finished.
+        """
+        self.cancel(key)
+        self._next_id += 1
+        job_id = self._next_id
+        future = self._pool(process).submit(fn, *args)
+        self._jobs[key] = (job_id, future)
+        # Runs on the worker, so it only hands the future over to the main loop
+        future.add_done_callback(lambda f: self._results.put((key, job_id, f, callback)))
+        return job_id
+
+    def debounce(self, key, delay, callback):
+        """Call callback() from drain() once delay seconds pass without another debounce under key."""
+        self.cancel(key)
+        self._timers[key] = (time.monotonic() + delay, callback)
+
+    def cancel(self, key):
+        """Drop the job or debounced callback pending under key, a running job finishes but its result is ignored."""
+        self._timers.pop(key, None)
+        job = self._jobs.pop(key, None)
+        if job is not None:
+            job[1].cancel()
+
+    def pending(self, key):
+        return key in self._jobs or key in self._timers
+
+    def busy(self):
+        """True while any job or debounced callback has not been delivered yet."""
+        return bool(self._jobs or self._timers)
+
+    def drain(self):
+        """Deliver the results of finished jobs and due debounced callbacks, returns how many callbacks ran."""
+        delivered = 0
+        now = time.monotonic()
+        for key, (due, callback) in list(self._timers.items()):
+            if due <= now:
+                del self._timers[key]
+                callback()
+                delivered += 1
+        while True:
+            try:
+                key, job_id, future, callback = self._results.get_nowait()
+            except queue.Empty:
+                return delivered
+            current = self._jobs.get(key)
+            if current is None or current[0] != job_id:
+                continue  # Cancelled or replaced by a newer job
+            del self._jobs[key]
+            # Re-raises an exception of the job here, as if it ran in the frame
+            result = future.result()
+            if callback is not None:
+                callback(result)
+            delivered += 1
+
+    def shutdown(self):
+        """Cancel every job and stop the pools without waiting for running jobs."""
+        for key in list(self._jobs) + list(self._timers):
+            self.cancel(key)
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+
+
+# Shared by every scene, drained once per frame by the main loop
+TASKS = TaskExecutor()
@@ -0,0 +1,424 @@
+import curses
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from finman.util.profiler import PROFILER
+from finman.util.tasks import TASKS
+
+# Empty cell of a window or of the terminal: character and attributes
+BLANK = (" ", 0)
+# Characters box() draws, in place of the terminal's line drawing set
+BOX_CHARS = {"vertical": "│", "horizontal": "─", "corners": "┌┐└┘"}
+
+
+class VirtualWindow:
+    """A curses window or pad kept in memory.
+
+    Implements the window methods the scenes call with the same bounds
+    checks as ncurses, raising curses.error where a real window returns
+    ERR, so scenes take the same code paths as in a terminal. Like ncurses,
+    a window remembers the rows touched since its last refresh and
+    refresh() only copies those to the VirtualScreen's terminal, which
+    counts the calls and the cells written and drawn.
+    """
+
+    def __init__(self, terminal, rows, cols, y=0, x=0, pad=False):
+        self.terminal = terminal
+        self.rows, self.cols = rows, cols
+        self.y, self.x = y, x
+        self.pad = pad
+        self.cursor = (0, 0)
+        self.cells = [[BLANK] * cols for _ in range(rows)]
+        self.touched = set(range(rows))
+
+    def _record(self, name):
+        self.terminal.calls[name] += 1
+
+    def _error(self, name):
+        return curses.error(f"{name}() returned ERR")
+
+    def _put(self, name, y, x, text, attr):
+        """Write text at y, x wrapping at the right edge like waddstr."""
+        if not (0 <= y < self.rows and 0 <= x < self.cols):
+            raise self._error(name)
+        for char in text:
+            self.touched.add(y)
+            if char == "\n":
+                self.cells[y][x:] = [BLANK] * (self.cols - x)
+                y, x = y + 1, 0
+                if y == self.rows:
+                    self.cursor = (self.rows - 1, 0)
+                    raise self._error(name)
+                continue
+            self.cells[y][x] = (char, attr)
+            self.terminal.cells_written += 1
+            x += 1
+            if x == self.cols:
+                if y == self.rows - 1:
+                    # The bottom right cell is written, but the cursor cannot move past it
+                    self.cursor = (y, x - 1)
+                    raise self._error(name)
+                y, x = y + 1, 0
+        self.cursor = (y, x)
+
+    def _text_args(self, args):
+        """(y, x, text, attr) of the addstr(text[, attr]) and addstr(y, x, text[, attr]) forms."""
+        if len(args) >= 3:
+            y, x, text = args[:3]
+            attr = args[3] if len(args) > 3 else 0
+        else:
+            (y, x), text = self.cursor, args[0]
+            attr = args[1] if len(args) > 1 else 0
+        return y, x, str(text), attr
+
+    def addstr(self, *args):
+        self._record("addstr")
+        self._put("addwstr", *self._text_args(args))
+
+    def addnstr(self, *args):
+        self._record("addnstr")
+        if len(args) >= 4:
+            args = args[:2] + (str(args[2])[:args[3]],) + args[4:]
+        else:
+            args = (str(args[0])[:args[1]],) + args[2:]
+        self._put("addnwstr", *self._text_args(args))
+
+    def addch(self, *args):
+        self._record("addch")
+        y, x, char, attr = self._text_args(args)
+        self._put("waddch", y, x, char if isinstance(char, str) else chr(char), attr)
+
+    def insstr(self, *args):
+        """Insert text before the cursor, cut off at the right edge without moving the cursor."""
+        self._record("insstr")
+        y, x, text, attr = self._text_args(args)
+        if not (0 <= y < self.rows and 0 <= x < self.cols):
+            raise self._error("inswstr")
+        inserted = [(char, attr) for char in text[:self.cols - x]]
+        self.cells[y][x:] = (inserted + self.cells[y][x:])[:self.cols - x]
+        self.touched.add(y)
+        self.terminal.cells_written += len(inserted)
+
+    def box(self, *args):
+        self._record("box")
+        vertical, horizontal = BOX_CHARS["vertical"], BOX_CHARS["horizontal"]
+        top_left, top_right, bottom_left, bottom_right = BOX_CHARS["corners"]
+        last_row, last_col = self.rows - 1, self.cols - 1
+        for x in range(1, last_col):
+            self.cells[0][x] = self.cells[last_row][x] = (horizontal, 0)
+        for y in range(1, last_row):
+            self.cells[y][0] = self.cells[y][last_col] = (vertical, 0)
+        self.cells[0][0], self.cells[0][last_col] = (top_left, 0), (top_right, 0)
+        self.cells[last_row][0], self.cells[last_row][last_col] = (bottom_left, 0), (bottom_right, 0)
+        self.touched.update(range(self.rows))
+        self.terminal.cells_written += 2 * (self.rows + self.cols) - 4
+
+    def erase(self):
+        self._record("erase")
+        self.cells = [[BLANK] * self.cols for _ in range(self.rows)]
+        self.touched.update(range(self.rows))
+        self.cursor = (0, 0)
+
+    def clear(self):
+        """Erase the window and repaint the whole terminal on its next refresh."""
+        self._record("clear")
+        self.erase()
+        self.terminal.clear_pending = True
+
+    def clrtoeol(self):
+        self._record("clrtoeol")
+        y, x = self.cursor
+        self.cells[y][x:] = [BLANK] * (self.cols - x)
+        self.touched.add(y)
+
+    def move(self, y, x):
+        self._record("move")
+        if not (0 <= y < self.rows and 0 <= x < self.cols):
+            raise self._error("wmove")
+        self.cursor = (y, x)
+
+    def getyx(self):
+        return self.cursor
+
+    def getmaxyx(self):
+        return self.rows, self.cols
+
+    def getbegyx(self):
+        return self.y, self.x
+
+    def resize(self, rows, cols):
+        self._record("resize")
+        if rows <= 0 or cols <= 0:
+            raise self._error("wresize")
+        self.cells = [(row[:cols] + [BLANK] * (cols - len(row)))[:cols] for row in self.cells[:rows]]
+        self.cells += [[BLANK] * cols for _ in range(rows - len(self.cells))]
+        self.rows, self.cols = rows, cols
+        self.touched = set(range(rows))
+        self.cursor = (min(self.cursor[0], rows - 1), min(self.cursor[1], cols - 1))
+
+    def mvwin(self, y, x):
+        """Move the window, it has to stay inside the terminal."""
+        self._record("mvwin")
+        if self.pad or y < 0 or x < 0 or y + self.rows > self.terminal.rows or x + self.cols > self.terminal.cols:
+            raise self._error("mvwin")
+        self.y, self.x = y, x
+        self.touched.update(range(self.rows))
+
+    def refresh(self, *args):
+        """Copy the touched rows of the window, or of a region of a pad, to the terminal and update it."""
+        self.noutrefresh(*args)
+        self.terminal.doupdate()
+
+    def noutrefresh(self, *args):
+        self._record("refresh")
+        if self.pad:
+            if len(args) != 6:
+                raise curses.error("refresh() for a pad requires 6 arguments")
+            pad_row, pad_col, top, left, bottom, right = args
+            pad_row, pad_col, top, left = max(pad_row, 0), max(pad_col, 0), max(top, 0), max(left, 0)
+            if bottom < top or right < left or bottom >= self.terminal.rows or right >= self.terminal.cols:
+                raise self._error("prefresh")
+            rows = min(bottom - top + 1, self.rows - pad_row)
+            cols = min(right - left + 1, self.cols - pad_col)
+        else:
+            pad_row, pad_col, top, left = 0, 0, self.y, self.x
+            rows = min(self.rows, self.terminal.rows - top)
+            cols = min(self.cols, self.terminal.cols - left)
+        cols = max(cols, 0)
+        copied = [row for row in range(pad_row, pad_row + rows) if row in self.touched]
+        self.terminal.copy(self.cells, copied, pad_row, pad_col, top, left, cols)
+        # A pad keeps the touched rows outside the region for a later refresh
+        self.touched.difference_update(copied if self.pad else range(self.rows))
+
+    def touchwin(self):
+        self._record("touchwin")
+        self.touched.update(range(self.rows))
+
+    def keypad(self, flag):
+        pass
+
+    def nodelay(self, flag):
+        pass
+
+    def bkgd(self, *args):
+        pass
+
+    def attron(self, attr):
+        pass
+
+    def attroff(self, attr):
+        pass
+
+    def text(self, row):
+        """Characters of a row of the window, for checks on what a scene drew."""
+        return "".join(char for char, _ in self.cells[row])
+
+
+class VirtualScreen(VirtualWindow):
+    """The standard screen of a headless terminal, handed to scenes instead of initscr().
+
+    Besides being the full size window scenes draw their chrome on, it holds
+    the terminal: the cells refreshed windows copied to it and the cells it
+    displays. doupdate() brings the display up to date and counts the cells
+    that changed, which is what curses would send to a real terminal. The
+    screen also holds the scripted key presses returned by getch() and the
+    counters of window method calls and cells written to windows.
+    """
+
+    def __init__(self, rows=40, cols=140):
+        self.calls = Counter()
+        self.cells_written = 0
+        self.cells_drawn = 0
+        self.clear_pending = False
+        self.keys = []
+        self.mouse = None  # (id, x, y, z, bstate) returned by getmouse()
+        self.pairs = {}
+        self.virtual = [[BLANK] * cols for _ in range(rows)]
+        self.display = [[BLANK] * cols for _ in range(rows)]
+        self.changed_rows = set()
+        super().__init__(self, rows, cols)
+
+    def getch(self):
+        return self.keys.pop(0) if self.keys else -1
+
+    def resize_terminal(self, rows, cols):
+        """Change the terminal size like resizing its window does, scenes learn of it from KEY_RESIZE."""
+        self.resize(rows, cols)
+        self.virtual = [[BLANK] * cols for _ in range(rows)]
+        self.display = [[BLANK] * cols for _ in range(rows)]
+        self.changed_rows = set()
+        self.clear_pending = True
+        curses.LINES, curses.COLS = rows, cols
+
+    def copy(self, cells, rows, pad_row, pad_col, top, left, cols):
+        """Copy cols cells of the given window rows to the terminal, pad_row lands on top."""
+        for row in rows:
+            self.virtual[top + row - pad_row][left:left + cols] = cells[row][pad_col:pad_col + cols]
+            self.changed_rows.add(top + row - pad_row)
+
+    def doupdate(self):
+        """Display the copied cells, after a clear() the whole terminal is drawn again."""
+        rows = self.changed_rows
+        if self.clear_pending:
+            self.display = [[BLANK] * self.cols for _ in range(self.rows)]
+            self.clear_pending = False
+            self.calls["repaint"] += 1
+            rows = range(self.rows)
+        for row in rows:
+            source, target = self.virtual[row], self.display[row]
+            self.cells_drawn += sum(1 for old, new in zip(target, source) if old != new)
+            self.display[row] = list(source)
+        self.changed_rows = set()
+
+    def lines(self):
+        """Characters currently shown by the terminal, one string per row."""
+        return ["".join(char for char, _ in row) for row in self.display]
+
+    def stats(self):
+        """Counters so far, subtract two of them for the cost of the frames in between."""
+        return {"draw_calls": sum(self.calls.values()), "cells_written": self.cells_written,
+                "cells_drawn": self.cells_drawn}
+
+    # Module level curses functions, installed by virtual_terminal()
+
+    def newwin(self, *args):
+        if len(args) == 2:
+            rows, cols, y, x = 0, 0, args[0], args[1]
+        else:
+            rows, cols = args[:2]
+            y, x = args[2:] if len(args) == 4 else (0, 0)
+        return VirtualWindow(self, rows or self.rows - y, cols or self.cols - x, y, x)
+
+    def newpad(self, rows, cols):
+        return VirtualWindow(self, rows, cols, pad=True)
+
+    def init_pair(self, pair, foreground, background):
+        self.pairs[pair] = (foreground, background)
+
+    def getmouse(self):
+        if self.mouse is None:
+            raise curses.error("getmouse() returned ERR")
+        mouse, self.mouse = self.mouse, None
+        return mouse
+
+
+@contextmanager
+def virtual_terminal(rows=40, cols=140):
+    """Replace the curses functions the scenes call with a VirtualScreen of rows x cols.
+
+    Yields the screen, the real curses functions are restored on exit:
+
+        with virtual_terminal() as screen:
+            driver = SceneDriver(screen)
+            driver.press(curses.KEY_DOWN, "\\n")
+    """
+    screen = VirtualScreen(rows, cols)
+    replacements = {
+        "initscr": lambda: screen,
+        "newwin": screen.newwin,
+        "newpad": screen.newpad,
+        "init_pair": screen.init_pair,
+        "color_pair": lambda pair: pair << 8,
+        "pair_number": lambda attr: (attr >> 8) & 0xff,
+        "getmouse": screen.getmouse,
+        "mousemask": lambda mask: (mask, 0),
+        "curs_set": lambda visibility: 1,
+        "has_colors": lambda: True,
+        "doupdate": screen.doupdate,
+        "napms": lambda ms: 0,
+        "beep": lambda: screen.calls.update(["beep"]),
+        "LINES": rows,
+        "COLS": cols,
+    }
+    for name in ("start_color", "use_default_colors", "noecho", "echo", "cbreak", "nocbreak",
+                 "endwin"):
+        replacements[name] = lambda *args: None
+    missing = object()
+    originals = {name: getattr(curses, name, missing) for name in replacements}
+    for name, replacement in replacements.items():
+        setattr(curses, name, replacement)
+    try:
+        yield screen
+    finally:
+        for name, original in originals.items():
+            if original is missing:
+                delattr(curses, name)
+            else:
+                setattr(curses, name, original)
+
+
+class SceneDriver:
+    """Run scenes on a VirtualScreen the way finman's main loop does, feeding scripted input.
+
+    Every full_pass is recorded in frames with the key it handled, the scene,
+    the seconds spent in its update and render phases and the draw calls,
+    cells written and cells drawn, so the cost of a scripted session can be
+    measured without a terminal. Background jobs run as in the TUI, settle()
+    waits for them.
+    """
+
+    def __init__(self, screen, scene_class=None):
+        if scene_class is None:
+            from finman.ui.main_menu import MainMenu
+            scene_class = MainMenu
+        self.screen = screen
+        self.frames = []
+        self.exited = False
+        # The phase timings come from the profiler, restored by close()
+        self._profiling = PROFILER.enabled
+        PROFILER.enabled = True
+        self.scene = scene_class(screen, None)
+        self.scene.on_enter()
+        self.frame(-1)
+
+    def close(self):
+        PROFILER.enabled = self._profiling
+
+    def frame(self, key):
+        """One iteration of the main loop with key as the pressed key, -1 for none."""
+        while not self.exited:
+            TASKS.drain()
+            before, totals, updates = self.screen.stats(), dict(PROFILER.totals), PROFILER.counts["update"]
+            try:
+                scene = self.scene.full_pass(key)
+            except SystemExit:
+                # Esc on the main menu quits finman
+                scene, self.exited = None, True
+            # Idle frames that neither handled a key nor updated the scene are left out
+            if key != -1 or PROFILER.counts["update"] != updates:
+                after = self.screen.stats()
+                record = {"key": key, "scene": type(self.scene).__name__}
+                record.update({phase: PROFILER.totals[phase] - totals[phase] for phase in ("update", "render")})
+                record.update({name: after[name] - before[name] for name in after})
+                self.frames.append(record)
+            if scene is None:
+                return
+            # Like the main loop, the new scene is rendered right away
+            self.scene.on_exit()
+            self.scene = scene
+            self.scene.on_enter()
+            key = -1
+
+    def press(self, *keys):
+        """Feed keys one frame each, a string is typed one character per frame."""
+        for key in keys:
+            for code in ([ord(char) for char in key] if isinstance(key, str) else [key]):
+                self.frame(code)
+
+    def resize(self, rows, cols):
+        self.screen.resize_terminal(rows, cols)
+        self.frame(curses.KEY_RESIZE)
+
+    def click(self, y, x, bstate=curses.BUTTON1_CLICKED):
+        self.screen.mouse = (0, x, y, 0, bstate)
+        self.frame(curses.KEY_MOUSE)
+
+    def settle(self, timeout=30.0):
+        """Run empty frames until every background job and debounced search was delivered."""
+        deadline = time.monotonic() + timeout
+        while TASKS.busy():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"background tasks still running after {timeout} seconds")
+            time.sleep(0.001)
+            self.frame(-1)
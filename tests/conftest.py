@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The tests run straight from a checkout, like the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from finman.logic.financial_data import FinancialData  # noqa: E402
+
+
+def ledger_dict(transactions=()):
+    """A ledger with one budget for 2025-01 and the given transactions."""
+    return {
+        "budgets": [{
+            "year": 2025, "month": 1,
+            "tags": [
+                {"id": "food", "name": "Food", "maxAmount": 600.0,
+                 "subTags": [{"id": "groceries", "name": "Groceries", "maxAmount": 400.0}]},
+                {"id": "rent", "name": "Rent", "maxAmount": 1000.0, "subTags": []},
+            ],
+        }],
+        "transactions": list(transactions),
+    }
+
+
+def transaction(id, day, amount, description="grocery store", tag="food", subtag="groceries", month=1, year=2025):
+    return {"id": id, "year": year, "month": month, "day": day, "amount": amount,
+            "description": description, "tagId": tag, "subtagId": subtag}
+
+
+def write_ledger(path, transactions=()):
+    with open(path, "w") as f:
+        json.dump(ledger_dict(transactions), f)
+
+
+def ledger_changes(findata):
+    """(name, change) pairs editing the ledger fixture in every way a derived index sees.
+
+    Meant to be applied in order: adds, edits moving a transaction between
+    fingerprints, removals, a batch, a tag merge, recurring occurrences and undo.
+    """
+    return [
+        ("add", lambda: findata.add_transaction("dup_1", 2025, 1, 5, 120.0, "Grocery  Store!", "food", "groceries")),
+        ("edit date and amount", lambda: findata.edit_transaction("txn_2", day=5, amount=120.0)),
+        ("edit description", lambda: findata.edit_transaction("dup_1", description="corner shop")),
+        ("remove", lambda: findata.remove_transaction("txn_2")),
+        ("undo", findata.undo),
+        ("redo", findata.redo),
+        ("add batch", lambda: findata.add_transactions([
+            transaction("batch_1", 12, 4.5, "coffee", "food", None),
+            transaction("batch_2", 12, 4.5, "Coffee", "food", None)])),
+        ("merge tag", lambda: findata.merge_tag(2025, 1, "food", "rent")),
+        ("undo merge", findata.undo),
+        ("redo merge", findata.redo),
+        ("add rule", lambda: findata.add_rule("rule_1", 30.0, "gym", "rent", None, "2025-01-05")),
+        ("edit occurrence", lambda: findata.edit_transaction("rule_1@2025-02-05", amount=35.0)),
+        ("remove occurrence", lambda: findata.remove_transaction("rule_1@2025-03-05")),
+        ("undo occurrence", findata.undo),
+    ]
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    """Path of a small ledger that is the default ledger for the test, forgotten afterwards."""
+    path = str(tmp_path / "budget_data.json")
+    write_ledger(path, [transaction("txn_1", 5, 120.0), transaction("txn_2", 8, 90.7),
+                        transaction("txn_3", 20, 1000.0, "rent", "rent", None)])
+    default, paths = FinancialData.default_file_path, FinancialData.ledger_paths
+    FinancialData.default_file_path, FinancialData.ledger_paths = path, [path]
+    yield path
+    FinancialData.close(path)
+    FinancialData.default_file_path, FinancialData.ledger_paths = default, paths
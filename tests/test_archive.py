@@ -0,0 +1,73 @@
+import json
+from datetime import date
+
+import pytest
+
+from finman.logic.archive import summarize_year
+from finman.logic.financial_data import ChangeKind, FinancialData
+from finman.logic.forecast import project_period
+
+
+def test_partial_month_of_an_archived_year(ledger):
+    findata = FinancialData(ledger)
+    findata.archive_year(2025)
+    assert findata.get_spend_total((2025, 1, 5), (2025, 1, 10)) == 210.7
+    assert findata.get_spend_total((2025, 1, 9), (2025, 1, 31), "food") == 0.0
+    assert findata.get_archived_totals(2025, 1) == {("food", "groceries"): 210.7, ("rent", None): 1000.0}
+
+
+def test_monthly_summary_is_summarized_again(ledger):
+    FinancialData(ledger).archive_year(2025)
+    FinancialData.close(ledger)
+    # Summary as written before archives kept the day
+    with open(ledger) as f:
+        data = json.load(f)
+    data["archives"][0]["totals"] = [[month, tag_id, subtag_id, amount]
+                                     for month, _, tag_id, subtag_id, amount in data["archives"][0]["totals"]]
+    with open(ledger, "w") as f:
+        json.dump(data, f)
+
+    findata = FinancialData(ledger)
+    assert findata.get_spend_total((2025, 1, 5), (2025, 1, 10)) == 210.7
+    assert findata.get_archives()[0]["totals"] == summarize_year(findata.get_transactions_by_date(2025))
+
+
+def test_projection_reads_archived_days(ledger):
+    findata = FinancialData(ledger)
+    keys = [("food", "groceries"), ("rent", None)]
+    expected = project_period(findata, 2026, 1, keys, today=date(2026, 1, 10))
+    findata.archive_year(2025)
+    assert project_period(findata, 2026, 1, keys, today=date(2026, 1, 10)) == expected
+
+
+def test_archived_transactions_are_read_only_before_loading(ledger):
+    FinancialData(ledger).archive_year(2025)
+    FinancialData.close(ledger)
+    findata = FinancialData(ledger)
+    assert findata.has_unloaded_archives()
+    with pytest.raises(ValueError, match="2025 is archived"):
+        findata.edit_transaction("txn_1", amount=1.0)
+    FinancialData.close(ledger)
+    with pytest.raises(ValueError, match="2025 is archived"):
+        FinancialData(ledger).remove_transaction("txn_2")
+
+
+class Listener:
+    def __init__(self, findata):
+        self.events = []
+        findata.subscribe(self.on_change)
+
+    def on_change(self, event):
+        self.events.append(event)
+
+
+def test_archiving_notifies_subscribers(ledger):
+    findata = FinancialData(ledger)
+    listener = Listener(findata)
+    findata.get_date_index()
+    findata.archive_year(2025)
+    findata.restore_year(2025)
+    assert [event.kind for event in listener.events] == [ChangeKind.YEAR_ARCHIVED, ChangeKind.YEAR_RESTORED]
+    assert (2025, 12) in listener.events[0].affected_periods()
+    assert [event.generation for event in listener.events] == [1, 2]
+    assert len(findata.get_date_index()) == 3
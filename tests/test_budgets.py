@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from finman.logic.financial_data import FinancialData
+
+
+def test_budget_copies_do_not_change_the_ledger(ledger):
+    findata = FinancialData(ledger)
+    budget = findata.get_budget(2025, 1)
+    budget["tags"][0]["maxAmount"] = 1
+    budget["tags"][0]["subTags"].clear()
+    findata.get_all_budgets()[0]["tags"].pop()
+    assert findata.get_budget(2025, 1)["tags"][0]["maxAmount"] == 600.0
+    assert findata.get_budget(2025, 1)["tags"][0]["subTags"]
+    assert len(findata.get_budget(2025, 1)["tags"]) == 2
+    assert findata.get_budget_periods() == [(2025, 1)]
+
+
+def _tags(*specs):
+    """Tag trees from (id, amount, subtag ids) specs."""
+    return [{"id": tag_id, "name": tag_id.title(), "maxAmount": amount,
+             "subTags": [{"id": subtag_id, "name": subtag_id.title(), "maxAmount": 10.0} for subtag_id in subtags]}
+            for tag_id, amount, subtags in specs]
+
+
+def _year_of_budgets(findata):
+    """Budgets from February to June that inherit, edit, add, drop and reorder tags."""
+    findata.add_budget(2025, 2, _tags(("food", 600.0, ["groceries", "dining"]), ("rent", 1000.0, [])))
+    findata.add_budget(2025, 3, _tags(("food", 600.0, ["groceries", "dining"]), ("rent", 1000.0, [])))
+    findata.add_budget(2025, 4, _tags(("food", 650.0, ["groceries"]), ("rent", 1000.0, []), ("fun", 50.0, [])))
+    findata.add_budget(2025, 5, _tags(("food", 650.0, ["groceries"]), ("fun", 50.0, [])))
+    findata.add_budget(2025, 6, _tags(("fun", 50.0, []), ("food", 650.0, ["groceries"])))
+    return {period: findata.get_budget(*period) for period in findata.get_budget_periods()}
+
+
+def _stored(findata, year, month):
+    return next(b for b in findata.data["budgets"] if (b["year"], b["month"]) == (year, month))
+
+
+def test_budgets_are_stored_as_diffs(ledger):
+    findata = FinancialData(ledger)
+    _year_of_budgets(findata)
+    assert _stored(findata, 2025, 3) == {"year": 2025, "month": 3, "overrides": [], "removed": []}
+    assert [tag["id"] for tag in _stored(findata, 2025, 4)["overrides"]] == ["food", "fun"]
+    assert _stored(findata, 2025, 5)["removed"] == ["rent"]
+    # A reordering can not be a diff
+    assert "tags" in _stored(findata, 2025, 6)
+
+
+def test_budgets_survive_save_and_reload(ledger):
+    expected = _year_of_budgets(FinancialData(ledger))
+    FinancialData.close(ledger)
+    findata = FinancialData(ledger)
+    assert {period: findata.get_budget(*period) for period in findata.get_budget_periods()} == expected
+
+
+def test_full_budgets_are_compacted_on_load(ledger):
+    expected = _year_of_budgets(FinancialData(ledger))
+    FinancialData.close(ledger)
+    # A ledger written before budgets inherited stores every tag tree in full
+    with open(ledger) as f:
+        data = json.load(f)
+    data["budgets"] = list(expected.values())
+    with open(ledger, "w") as f:
+        json.dump(data, f)
+
+    findata = FinancialData(ledger)
+    assert {period: findata.get_budget(*period) for period in findata.get_budget_periods()} == expected
+    assert _stored(findata, 2025, 3) == {"year": 2025, "month": 3, "overrides": [], "removed": []}
+
+
+def test_editing_a_period_keeps_the_next_ones(ledger):
+    findata = FinancialData(ledger)
+    expected = _year_of_budgets(findata)
+    findata.edit_tag(2025, 3, "food", max_amount=700.0)
+    findata.remove_tag(2025, 3, "rent")
+    for period, budget in expected.items():
+        if period != (2025, 3):
+            assert findata.get_budget(*period) == budget, period
+    assert [tag["id"] for tag in findata.get_budget(2025, 3)["tags"]] == ["food"]
+
+    assert findata.undo() and findata.undo()
+    assert {period: findata.get_budget(*period) for period in findata.get_budget_periods()} == expected
+
+
+def test_removing_a_middle_period_keeps_the_others(ledger):
+    findata = FinancialData(ledger)
+    expected = _year_of_budgets(findata)
+    findata.remove_budget(2025, 4)
+    del expected[(2025, 4)]
+    assert {period: findata.get_budget(*period) for period in findata.get_budget_periods()} == expected
+
+    FinancialData.close(ledger)
+    findata = FinancialData(ledger)
+    assert {period: findata.get_budget(*period) for period in findata.get_budget_periods()} == expected
+
+
+def test_removing_a_missing_tag_changes_nothing(ledger):
+    findata = FinancialData(ledger)
+    with open(ledger) as f:
+        saved = f.read()
+    with pytest.raises(ValueError):
+        findata.remove_tag(2025, 1, "travel")
+    with pytest.raises(ValueError):
+        findata.remove_subtag(2025, 1, "food", "dining")
+    assert findata.generation == 0
+    assert not findata.undo()
+    with open(ledger) as f:
+        assert f.read() == saved
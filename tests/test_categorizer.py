@@ -0,0 +1,45 @@
+from finman.logic.categorizer import Categorizer
+from finman.logic.financial_data import FinancialData
+
+from tests.conftest import ledger_changes, transaction
+
+
+def _state(categorizer):
+    return ({key: dict(counts) for key, counts in categorizer.words.items()},
+            {key: dict(counts) for key, counts in categorizer.descriptions.items()})
+
+
+def test_known_description_wins_over_words():
+    categorizer = Categorizer([transaction("a", 1, 5.0, "corner shop", "food", "groceries"),
+                               transaction("b", 2, 5.0, "corner shop", "food", "groceries"),
+                               transaction("c", 3, 5.0, "Corner Shop", "fun", None),
+                               transaction("d", 4, 5.0, "shop rent", "rent", None)])
+    assert categorizer.suggest("corner  shop!") == ("food", "groceries")
+    assert categorizer.suggestions("corner shop") == [("food", "groceries"), ("fun", None)]
+    # "corner" only ever went to food and fun, "shop" is spread over every category
+    assert categorizer.suggest("corner bakery") == ("food", "groceries")
+    assert categorizer.suggest("bakery") is None
+
+
+def test_suggestions_follow_removals():
+    categorizer = Categorizer([transaction("a", 1, 5.0, "gym")])
+    assert categorizer.suggest("gym") == ("food", "groceries")
+    categorizer.remove(transaction("a", 1, 5.0, "gym"))
+    assert categorizer.suggest("gym") is None
+    assert _state(categorizer) == ({}, {})
+
+
+def test_changes_match_a_fresh_categorizer(ledger):
+    findata = FinancialData(ledger)
+    descriptions = ["grocery store", "corner shop", "coffee", "gym", "rent"]
+    for name, change in ledger_changes(findata):
+        categorizer = findata.get_categorizer()
+        # Fill the memo, a change must not leave stale suggestions behind
+        for description in descriptions:
+            categorizer.suggest(description)
+        change()
+        if findata.get_categorizer() is categorizer:
+            fresh = Categorizer(findata._live_transactions())
+            assert _state(categorizer) == _state(fresh), name
+            assert ([categorizer.suggest(d) for d in descriptions]
+                    == [fresh.suggest(d) for d in descriptions]), name
@@ -0,0 +1,38 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from finman.logic.consolidated import summarize_ledger
+from finman.logic.financial_data import FinancialData
+
+from tests.conftest import transaction, write_ledger
+
+
+def _add_rent(path):
+    write_ledger(path, [transaction("txn_1", 5, 120.0), transaction("txn_2", 8, 90.7),
+                        transaction("txn_3", 20, 1000.0, "rent", "rent", None),
+                        transaction("txn_4", 21, 1000.0, "rent", "rent", None)])
+
+
+def test_budget_counts_subtags_within_their_tag(ledger):
+    # Food's 400 for groceries is part of its 600
+    assert summarize_ledger(ledger)[(2025, 1)]["budget"] == 1600.0
+
+
+def test_summary_reads_the_saved_ledger(ledger):
+    assert summarize_ledger(ledger)[(2025, 1)]["spent"] == 1210.7
+    _add_rent(ledger)
+    assert summarize_ledger(ledger)[(2025, 1)]["spent"] == 2210.7
+
+
+def test_summary_leaves_the_shared_instance_alone(ledger):
+    findata = FinancialData(ledger)
+    summarize_ledger(ledger)
+    assert FinancialData(ledger) is findata
+
+
+def test_reused_worker_summarizes_the_saved_ledger(ledger):
+    # One spawned worker runs both jobs, as in the Consolidated scene's pool
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        assert pool.submit(summarize_ledger, ledger).result()[(2025, 1)]["spent"] == 1210.7
+        _add_rent(ledger)
+        assert pool.submit(summarize_ledger, ledger).result()[(2025, 1)]["spent"] == 2210.7
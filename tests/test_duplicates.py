@@ -0,0 +1,51 @@
+from finman.logic.duplicates import DuplicateIndex, fingerprint, normalize_description
+from finman.logic.financial_data import FinancialData
+
+from tests.conftest import ledger_changes, transaction
+
+
+def _state(index):
+    return {key: sorted(ids) for key, ids in index.ids.items()}
+
+
+def test_descriptions_compare_by_their_words():
+    assert normalize_description("  Coffee  Shop! ") == normalize_description("coffee shop") == "coffee shop"
+    assert fingerprint(2025, 1, 5, 4.5, "Coffee") == fingerprint(2025, 1, 5, 4.50000001, "coffee")
+
+
+def test_groups_and_matches():
+    index = DuplicateIndex([transaction("a", 5, 10.0), transaction("b", 5, 10.0, "Grocery store."),
+                            transaction("c", 6, 10.0), transaction("d", 1, 3.0, month=2),
+                            transaction("e", 1, 3.0, "grocery store", month=2)])
+    assert index.groups() == [["a", "b"], ["d", "e"]]
+    assert index.matches(fingerprint(2025, 1, 6, 10.0, "grocery store")) == ["c"]
+    index.remove(transaction("b", 5, 10.0, "Grocery store."))
+    index.remove(transaction("zzz", 5, 10.0))  # Not indexed, ignored
+    assert index.groups() == [["d", "e"]]
+    assert len(index) == 3
+
+
+def test_changes_match_a_fresh_index(ledger):
+    findata = FinancialData(ledger)
+    for name, change in ledger_changes(findata):
+        index = findata.get_duplicate_index()
+        change()
+        if findata.get_duplicate_index() is index:
+            # Updated from the change events rather than rebuilt
+            assert _state(index) == _state(DuplicateIndex(findata._live_transactions())), name
+
+
+def test_adding_flags_duplicates(ledger):
+    findata = FinancialData(ledger)
+    assert findata.add_transaction("dup_1", 2025, 1, 5, 120.0, "GROCERY store", "food", "groceries") == ["txn_1"]
+    flagged = findata.add_transactions([transaction("batch_1", 8, 90.7), transaction("batch_2", 8, 90.7)],
+                                       skip_duplicates=True)
+    assert flagged == {"batch_1": ["txn_2"], "batch_2": ["txn_2"]}
+    assert findata.get_transaction("batch_1") is None
+    assert [[t["id"] for t in group] for group in findata.get_duplicate_groups()] == [["txn_1", "dup_1"]]
+
+
+def test_hand_entered_bill_matches_its_occurrence(ledger):
+    findata = FinancialData(ledger)
+    findata.add_rule("rule_1", 30.0, "gym", "rent", None, "2025-01-05")
+    assert findata.find_duplicates(2025, 2, 5, 30.0, "Gym") == ["rule_1@2025-02-05"]
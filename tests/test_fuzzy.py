@@ -0,0 +1,47 @@
+import pytest
+
+from finman.logic.fuzzy import MIN_SIMILARITY, TrigramIndex, tokenize, trigrams
+
+TEXTS = ["grocery store", "Groceries #food", "corner shop", "coffee shop", "rent", "gym membership",
+         "Grocer's market", "shopping mall"]
+
+
+def _similarity(token, word):
+    if token in word:
+        return 1.0
+    grams, word_grams = trigrams(token), trigrams(word)
+    return 2 * len(grams & word_grams) / (len(grams) + len(word_grams))
+
+
+def _brute_force_search(texts, query):
+    """(text id, score) of the texts matching every token of query, comparing against every word."""
+    tokens = tokenize(query)
+    matches = []
+    for doc_id, text in enumerate(texts):
+        best = [max((_similarity(token, word) for word in tokenize(text)), default=0.0) for token in tokens]
+        if tokens and min(best) >= MIN_SIMILARITY:
+            matches.append((doc_id, sum(best) / len(tokens)))
+    return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+
+def test_trigrams_weigh_the_start_of_a_word():
+    assert trigrams("gym") == {"  g", " gy", "gym", "ym "}
+    assert tokenize("Grocer's  #food") == ["grocer", "s", "food"]
+
+
+@pytest.mark.parametrize("query", ["grocey", "grocery store", "shop", "sho", "cofee shp", "rent", "gmy",
+                                   "market grocer", "oc", "er", "s", "zzz", ""])
+def test_search_matches_brute_force(query):
+    index = TrigramIndex(TEXTS)
+    assert index.search(query) == pytest.approx(_brute_force_search(TEXTS, query))
+
+
+def test_adding_texts_matches_a_fresh_index():
+    index = TrigramIndex(TEXTS[:3])
+    for doc_id, text in enumerate(TEXTS[3:], 3):
+        index.add(doc_id, text)
+    fresh = TrigramIndex(TEXTS)
+    assert index.documents == fresh.documents
+    assert index.trigram_counts == fresh.trigram_counts
+    assert {gram: sorted(words) for gram, words in index.postings.items()} == \
+        {gram: sorted(words) for gram, words in fresh.postings.items()}
@@ -0,0 +1,57 @@
+from finman.logic.financial_data import FinancialData
+
+
+def _snapshot(findata):
+    return ({t["id"]: dict(t) for t in findata.get_all_transactions()},
+            {period: findata.get_budget(*period) for period in findata.get_budget_periods()})
+
+
+def test_undo_and_redo_every_change(ledger):
+    findata = FinancialData(ledger)
+    states = [_snapshot(findata)]
+    changes = [
+        lambda: findata.add_transaction("txn_4", 2025, 1, 12, 30.0, "bakery", "food", "groceries"),
+        lambda: findata.edit_transaction("txn_1", month=2, amount=125.0),
+        lambda: findata.remove_transaction("txn_2"),
+        lambda: findata.edit_tag(2025, 1, "food", max_amount=650.0),
+        lambda: findata.add_budget(2025, 2),
+        lambda: findata.add_tag(2025, 1, "fun", "Fun", 50.0),
+        lambda: findata.add_subtag(2025, 1, "food", "dining", "Dining", 100.0),
+        lambda: findata.edit_subtag(2025, 1, "food", "dining", max_amount=120.0),
+        lambda: findata.remove_tag(2025, 1, "rent"),
+        lambda: findata.merge_subtag(2025, 1, "food", "groceries"),
+        lambda: findata.merge_tag(2025, 1, "fun", "food"),
+    ]
+    for change in changes:
+        change()
+        states.append(_snapshot(findata))
+
+    for state in reversed(states[:-1]):
+        assert findata.undo()
+        assert _snapshot(findata) == state
+    assert not findata.undo()
+    for state in states[1:]:
+        assert findata.redo()
+        assert _snapshot(findata) == state
+    assert not findata.redo()
+
+
+def test_undo_is_saved(ledger):
+    findata = FinancialData(ledger)
+    findata.remove_transaction("txn_3")
+    findata.undo()
+    FinancialData.close(ledger)
+    assert FinancialData(ledger).get_transaction("txn_3") is not None
+
+
+def test_tag_changes_record_only_the_tag(ledger):
+    findata = FinancialData(ledger)
+    findata.edit_tag(2025, 1, "rent", max_amount=1100.0)
+    findata.remove_subtag(2025, 1, "food", "groceries")
+    [(entity, key, before, after)] = findata.history.undo_stack[-2]
+    assert (entity, key) == ("tag", (2025, 1, "rent"))
+    assert before == (1, {"id": "rent", "name": "Rent", "maxAmount": 1000.0, "subTags": []})
+    assert after == (1, {"id": "rent", "name": "Rent", "maxAmount": 1100.0, "subTags": []})
+    [(entity, key, before, after)] = findata.history.undo_stack[-1]
+    assert (entity, key) == ("tag", (2025, 1, "food"))
+    assert before[1]["subTags"] and not after[1]["subTags"]
@@ -0,0 +1,21 @@
+import curses
+
+from finman.ui.scene import Scene
+from finman.util.recording import replay
+from finman.util.tasks import TASKS
+
+
+def test_search_ready_leaves_out_typing_pause(ledger, monkeypatch):
+    monkeypatch.setattr(Scene, "search_delay", 0.5)
+    header = {"version": 1, "rows": 30, "cols": 120, "search_delay": 0.5}
+    events = [{"t": 0.05, "key": curses.KEY_DOWN}, {"t": 0.1, "key": 10}, {"t": 0.2, "key": ord("r")},
+              {"t": 0.25, "key": ord("e")}, {"t": 1.0, "key": 27}]
+    try:
+        results = replay(header, events)
+    finally:
+        TASKS.shutdown()
+    assert [result["scene"] for result in results] == ["MainMenu", "Transactions", "Transactions",
+                                                        "Transactions", "MainMenu"]
+    assert results[2]["ready"] is None
+    # Evaluated half a second after the last key, ready only counts the evaluation
+    assert results[3]["ready"] < 0.25
@@ -0,0 +1,92 @@
+from datetime import date
+
+import pytest
+
+from finman.logic.financial_data import FinancialData
+from finman.logic.recurring import expand_rule, split_occurrence_id
+
+
+def _rule(start, schedule="monthly", end=None, interval=1, skipped=()):
+    return {"id": "rule_001", "amount": 15.0, "description": "gym", "tagId": "fun", "subtagId": None,
+            "schedule": schedule, "interval": interval, "start": start, "end": end, "skipped": list(skipped)}
+
+
+def _dates(occurrences):
+    return [(t["year"], t["month"], t["day"]) for t in occurrences]
+
+
+def test_month_end_falls_on_the_last_day_of_shorter_months():
+    occurrences = expand_rule(_rule("2024-01-31"), date(2024, 1, 1), date(2024, 5, 31))
+    assert _dates(occurrences) == [(2024, 1, 31), (2024, 2, 29), (2024, 3, 31), (2024, 4, 30), (2024, 5, 31)]
+    yearly = expand_rule(_rule("2024-02-29", "yearly"), date(2024, 1, 1), date(2028, 12, 31))
+    assert _dates(yearly) == [(2024, 2, 29), (2025, 2, 28), (2026, 2, 28), (2027, 2, 28), (2028, 2, 29)]
+
+
+def test_only_the_requested_range_is_expanded():
+    occurrences = expand_rule(_rule("2020-01-15", interval=2), date(2025, 3, 1), date(2025, 8, 31))
+    assert _dates(occurrences) == [(2025, 3, 15), (2025, 5, 15), (2025, 7, 15)]
+    weekly = expand_rule(_rule("2025-01-06", "weekly"), date(2025, 2, 1), date(2025, 2, 14))
+    assert _dates(weekly) == [(2025, 2, 3), (2025, 2, 10)]
+
+
+def test_end_date_and_skipped_dates():
+    rule = _rule("2025-01-10", end="2025-04-10", skipped=["2025-02-10"])
+    occurrences = expand_rule(rule, date(2025, 1, 1), date(2025, 12, 31))
+    assert _dates(occurrences) == [(2025, 1, 10), (2025, 3, 10), (2025, 4, 10)]
+    assert occurrences[0]["id"] == "rule_001@2025-01-10" and occurrences[0]["recurring"] == "rule_001"
+
+
+def test_occurrence_ids():
+    assert split_occurrence_id("rule_001@2025-01-31") == ("rule_001", date(2025, 1, 31))
+    assert split_occurrence_id("txn_001") is None
+    assert split_occurrence_id("rule_001@2025-02-30") is None
+
+
+def test_end_date_before_start_is_rejected(ledger):
+    findata = FinancialData(ledger)
+    with pytest.raises(ValueError, match="End date"):
+        findata.add_rule("rule_001", 15.0, "gym", "food", None, "2025-03-01", end="2025-02-01")
+    with pytest.raises(ValueError, match="YYYY-MM-DD"):
+        findata.add_rule("rule_001", 15.0, "gym", "food", None, "2025-03-01", end="2025-02-30")
+    assert findata.get_all_rules() == []
+
+
+def _occurrences(findata, month):
+    return {t["id"]: t["amount"] for t in findata.get_transactions_by_date(2025, month) if t["id"].startswith("rule")}
+
+
+def test_removing_and_editing_occurrences_with_undo(ledger):
+    findata = FinancialData(ledger)
+    findata.add_rule("rule_001", 15.0, "gym", "food", None, "2025-01-31", end="2025-04-30")
+    assert _occurrences(findata, 2) == {"rule_001@2025-02-28": 15.0}
+
+    findata.remove_transaction("rule_001@2025-02-28")
+    assert _occurrences(findata, 2) == {}
+    assert findata.get_rule("rule_001")["skipped"] == ["2025-02-28"]
+
+    findata.edit_transaction("rule_001@2025-03-31", amount=20.0)
+    assert _occurrences(findata, 3) == {"rule_001@2025-03-31": 20.0}
+    # The edited occurrence is a stored transaction now, the rule skips its date
+    assert "recurring" not in findata.get_transaction("rule_001@2025-03-31")
+    assert findata.get_rule("rule_001")["skipped"] == ["2025-02-28", "2025-03-31"]
+    assert _occurrences(findata, 5) == {}
+
+    assert findata.undo()
+    assert _occurrences(findata, 3) == {"rule_001@2025-03-31": 15.0}
+    assert findata.undo()
+    assert _occurrences(findata, 2) == {"rule_001@2025-02-28": 15.0}
+    assert findata.get_rule("rule_001")["skipped"] == []
+    assert findata.undo()
+    assert findata.get_all_rules() == []
+
+
+def test_rules_survive_reload(ledger):
+    findata = FinancialData(ledger)
+    findata.add_rule("rule_001", 15.0, "gym", "food", None, "2025-01-31")
+    findata.remove_transaction("rule_001@2025-02-28")
+    FinancialData.close(ledger)
+    findata = FinancialData(ledger)
+    assert _occurrences(findata, 1) == {"rule_001@2025-01-31": 15.0}
+    assert _occurrences(findata, 2) == {}
+    # Without an end date every listed month repeats, up to the expansion horizon for all transactions
+    assert "rule_001@2025-12-31" in {t["id"] for t in findata.get_all_transactions()}
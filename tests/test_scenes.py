@@ -0,0 +1,143 @@
+import curses
+import re
+
+import pytest
+
+from finman.logic.financial_data import FinancialData
+from finman.logic.transaction_query import build_search_index, query_transactions
+from finman.ui.overview import Overview
+from finman.ui.scene import Scene, UNDO_KEY
+from finman.ui.transactions import Transactions
+from finman.util.tasks import TASKS
+from finman.util.virtual_screen import SceneDriver, virtual_terminal
+
+from tests.conftest import ledger_changes, transaction, write_ledger
+
+ENTER, ESC, CTRL_D, CTRL_F = 10, 27, 4, 6
+ROW = re.compile(r"\d{4}-\d{2}-\d{2} \|\s+\$[\d.]+ \| (.*?) #")
+
+
+@pytest.fixture
+def terminal(ledger):
+    """A virtual terminal on the ledger fixture, background jobs are stopped afterwards."""
+    with virtual_terminal(30, 120) as screen:
+        yield screen
+    TASKS.shutdown()
+
+
+@pytest.fixture
+def drive(terminal):
+    """Starts a SceneDriver on the terminal, closed after the test."""
+    drivers = []
+
+    def start(scene_class=None):
+        drivers.append(SceneDriver(terminal, scene_class))
+        return drivers[-1]
+    yield start
+    for driver in drivers:
+        driver.close()
+
+
+def listed(screen):
+    """Descriptions of the transactions shown by the Transactions scene."""
+    return [match.group(1) for match in map(ROW.search, screen.lines()) if match]
+
+
+def test_delete_and_undo(drive, terminal, ledger):
+    driver = drive(Transactions)
+    assert listed(terminal) == ["grocery store", "grocery store", "rent"]
+
+    driver.press(CTRL_D)
+    assert type(driver.scene).__name__ == "Dialog"
+    driver.press(ENTER)  # Yes
+    assert type(driver.scene) is Transactions
+    assert listed(terminal) == ["grocery store", "rent"]
+    assert FinancialData(ledger).get_transaction("txn_1") is None
+
+    driver.press(UNDO_KEY)
+    assert listed(terminal) == ["grocery store", "grocery store", "rent"]
+    assert FinancialData(ledger).get_transaction("txn_1") is not None
+
+
+def test_search_waits_for_typing_pause(drive, terminal):
+    driver = drive(Transactions)
+    driver.press("rent")
+    # The search bar echoes every key, the list follows once typing pauses
+    assert "Search: rent" in terminal.lines()[1]
+    assert len(listed(terminal)) == 3
+    driver.settle()
+    assert listed(terminal) == ["rent"]
+
+
+def test_enter_evaluates_pending_search(drive, terminal):
+    driver = drive(Transactions)
+    driver.press("rent", ENTER)
+    assert listed(terminal) == ["rent"]
+    # Enter only evaluated the search, it did not open the editor
+    assert type(driver.scene) is Transactions
+    assert not TASKS.busy()
+
+
+def test_search_without_delay(drive, terminal, monkeypatch):
+    monkeypatch.setattr(Scene, "search_delay", 0)
+    driver = drive(Transactions)
+    driver.press("rent")
+    assert not TASKS.busy()
+    assert listed(terminal) == ["rent"]
+
+
+def test_fuzzy_search_follows_ledger_changes(drive, terminal, ledger, monkeypatch):
+    monkeypatch.setattr(Scene, "search_delay", 0)
+    driver = drive(Transactions)
+    driver.press(CTRL_F, "grocey food")
+    findata = FinancialData(ledger)
+    for name, change in [("none", lambda: None)] + ledger_changes(findata):
+        change()
+        driver.frame(-1)
+        driver.settle()
+        transactions = findata.get_all_transactions()
+        matches, _ = query_transactions(transactions, 0, "grocey food", build_search_index(transactions))
+        # Same day transactions with equal scores may be listed in either order
+        assert sorted(listed(terminal)) == sorted(t["description"] for t in matches), name
+
+
+def test_consolidated_refreshes_saved_ledger(drive, terminal, ledger, tmp_path):
+    other = str(tmp_path / "other.json")
+    write_ledger(other, [transaction("txn_1", 3, 50.0)])
+    FinancialData.ledger_paths = [ledger, other]
+    try:
+        driver = drive()
+        driver.press(curses.KEY_DOWN, ENTER)
+        assert type(driver.scene).__name__ == "Consolidated"
+        driver.settle()
+        assert "$   1260.70" in "\n".join(terminal.lines())
+
+        driver.press(ESC)
+        FinancialData(ledger).add_transaction("txn_4", 2025, 1, 21, 1000.0, "rent", "rent")
+        driver.press(ENTER)
+        driver.settle()
+        assert "$   2260.70" in "\n".join(terminal.lines())
+    finally:
+        FinancialData.close(other)
+
+
+def test_overview_follows_projection_history(drive, ledger):
+    driver = drive(Overview)
+    driver.settle()
+    findata = FinancialData(ledger)
+    # Shows 2025-01, projected from January of the three years before
+    for number, (year, month, dirty) in enumerate([(2021, 1, False), (2024, 2, False), (2024, 1, True),
+                                                  (2022, 1, True), (2025, 2, False)]):
+        findata.add_transaction(f"old_{number}", year, month, 10, 5.0, "grocery store", "food", "groceries")
+        assert driver.scene.data_dirty == dirty, (year, month)
+        driver.frame(-1)
+
+
+def test_transactions_reload_after_archiving(drive, terminal, ledger):
+    driver = drive(Transactions)
+    assert not driver.scene.data_dirty
+    FinancialData(ledger).archive_year(2025)
+    assert driver.scene.data_dirty
+    driver.settle()
+    # Archived years stay listed, read-only
+    assert listed(terminal) == ["grocery store", "grocery store", "rent"]
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from finman.logic.financial_data import FinancialData
+from finman.logic.spend_index import ALL, FenwickTree, SpendIndex, day_ordinal
+
+TAGS = [("food", "groceries"), ("food", "dining"), ("food", None), ("rent", None)]
+
+
+def _transactions(count, seed, years=(2023, 2024, 2025)):
+    rng = random.Random(seed)
+    transactions = []
+    for number in range(count):
+        tag_id, subtag_id = rng.choice(TAGS)
+        transactions.append({"id": f"gen_{number}", "year": rng.choice(years), "month": rng.randint(1, 12),
+                             "day": rng.randint(1, 31), "amount": round(rng.uniform(1, 200), 2), "description": f"shop {number}",
+                             "tagId": tag_id, "subtagId": subtag_id})
+    return transactions
+
+
+def _brute_total(transactions, start, end, tag_id=ALL, subtag_id=ALL):
+    return sum(t["amount"] for t in transactions
+               if day_ordinal(*start) <= day_ordinal(t["year"], t["month"], t["day"]) <= day_ordinal(*end)
+               and tag_id in (ALL, t["tagId"]) and subtag_id in (ALL, t.get("subtagId") or None))
+
+
+def _ranges(seed, count=200):
+    rng = random.Random(seed)
+    for _ in range(count):
+        dates = sorted((rng.randint(2022, 2026), rng.randint(1, 12), rng.randint(1, 31)) for _ in range(2))
+        yield dates[0], dates[1]
+
+
+def _assert_matches(index, transactions, seed):
+    for start, end in _ranges(seed):
+        for tag_id, subtag_id in [(ALL, ALL), ("food", ALL), ("food", "groceries"), ("food", None), ("rent", None)]:
+            assert index.range_total(start, end, tag_id, subtag_id) == pytest.approx(
+                _brute_total(transactions, start, end, tag_id, subtag_id), abs=1e-6), (start, end, tag_id, subtag_id)
+
+
+def test_fenwick_prefix_sums_after_growing():
+    values = [float(v) for v in range(1, 20)]
+    tree = FenwickTree(values[:5])
+    tree.grow(12)
+    for i, value in enumerate(values[5:12], start=5):
+        tree.add(i, value)
+    tree.grow(19)
+    for i, value in enumerate(values[12:], start=12):
+        tree.add(i, value)
+    assert [tree.prefix(count) for count in range(20)] == [sum(values[:count]) for count in range(20)]
+
+
+def test_built_index_matches_brute_force():
+    transactions = _transactions(500, seed=1)
+    _assert_matches(SpendIndex(transactions), transactions, seed=2)
+
+
+def test_incremental_index_matches_brute_force():
+    # Out of date order, so the index both grows and moves its start back
+    transactions = _transactions(300, seed=3)
+    index = SpendIndex()
+    for transaction in transactions:
+        index.add(transaction)
+    removed = transactions[::4]
+    for transaction in removed:
+        index.add(transaction, -1)
+    kept = [t for t in transactions if t not in removed]
+    _assert_matches(index, kept, seed=4)
+
+
+def test_months_have_31_days():
+    transactions = [{"year": 2025, "month": 2, "day": 30, "amount": 5.0, "tagId": "food", "subtagId": None},
+                    {"year": 2024, "month": 12, "day": 31, "amount": 7.0, "tagId": "food", "subtagId": None},
+                    {"year": 2025, "month": 3, "day": 1, "amount": 11.0, "tagId": "food", "subtagId": None}]
+    index = SpendIndex(transactions)
+    assert index.range_total((2025, 2, 1), (2025, 2, 31)) == 5.0
+    assert index.range_total((2024, 12, 31), (2025, 1, 1)) == 7.0
+    assert index.range_total((2025, 2, 29), (2025, 3, 1)) == 16.0
+    assert index.range_total((2020, 1, 1), (2023, 12, 31)) == 0.0
+
+
+def test_ledger_totals_across_years_follow_changes(ledger):
+    findata = FinancialData(ledger)
+    transactions = _transactions(200, seed=5)
+    findata.add_transactions(transactions)
+    for transaction in transactions[:50]:
+        findata.edit_transaction(transaction["id"], year=2022, amount=transaction["amount"] + 1)
+    for transaction in transactions[50:80]:
+        findata.remove_transaction(transaction["id"])
+
+    index = findata.get_spend_index()
+    _assert_matches(index, findata.get_all_transactions(), seed=6)
+    assert findata.get_spend_total((2022, 6, 15), (2025, 3, 2), "food") == pytest.approx(
+        _brute_total(findata.get_all_transactions(), (2022, 6, 15), (2025, 3, 2), "food"), abs=1e-6)